@@ -1,6 +1,10 @@
 # Copyright 2025, Battelle Energy Alliance, LLC, ALL RIGHTS RESERVED
 
+from __future__ import annotations
+
 import os
+import re
+import json
 import sys
 import pandas as pd 
 import numpy as np
@@ -10,11 +14,10 @@ import argparse
 sys.path.append("../..")
 
 from datetime import datetime
-from tqdm import tqdm
 
 from kpi_calculator.printing.KPI_printer import KPIExcelWriter
 from kpi_calculator.log_parser.ocpp_2_0_1 import transaction_parser
-from kpi_calculator.utils import fraction, time_ops
+from kpi_calculator.utils import date_partitions, file_ops, fraction, parquet_ops, quantiles, time_ops
 
 KPI_CALC_REPO_PATH = 'insert/path/to/repo/here'
 
@@ -24,40 +27,271 @@ START_RANGE = '2024-05-01'
 END_RANGE = '2024-05-30'
 
 LOGGING = True
+
+PARSED_DATA_COLUMNS = ['device_ID', 'transaction_ID', 'event_type', 'event_code', 'trigger_reason', 
+                       'timestamp', 'response_timestamp']
+
+DUPLICATE_COLUMNS = ['device_ID', 'transaction_ID', 'event_type', 'event_code', 'timestamp']
+ORPHAN_TRANSACTION_IDS = [-1, -98, -99]
+
+DATE_ONLY_PATTERN = re.compile(r'^\s*\d{4}-\d{2}-\d{2}\s*$')
+
+TRANSACTION_MODES = ['cached_auth', 'request_start', 'pre_plugin', 'post_plugin']
+START_EQUATIONS = {'post_plugin' : [1, 12], 'cached_auth' : [5, 16]}
+POWER_DELIVERY_EQUATIONS = {'post_plugin' : 1, 'pre_plugin' : 3, 'request_start' : 4, 'cached_auth' : 5}
+VALID_STOP_EQUATIONS = {'post_plugin' : 12, 'pre_plugin' : 14, 'request_start' : 15, 'cached_auth' : 16}
+AUTHORIZE_EQUATIONS = [3, 14]
+REQUEST_START_EQUATIONS = [4, 15]
+FRACTION_EQUATIONS = [1, 3, 4, 5, 10, 12, 14, 15, 16]
+CHARGE_START_TIME_PERCENTILES = {'10th_percentile' : 10, '25th_percentile' : 25, '50th_percentile' : 50, '75th_percentile' : 75}
+TRANSACTION_SUMMARY_DTYPES = {'valid_stop' : bool, 'valid_start' : bool, 'valid_auth_start' : bool, 
+                              'power_delivery_attempt' : bool, 'authorizes' : 'int64', 'request_starts' : 'int64', 
+                              'charge_start_time' : float, 'last_timestamp' : 'datetime64[ns]'}
+STATE_VERSION = 3
+DEFAULT_SETTLE_AFTER_HOURS = 24
+ROLLING_PERIODS = {'daily' : pd.DateOffset(days=1), 'weekly' : pd.DateOffset(weeks=1), 'monthly' : pd.DateOffset(months=1)}
+WINDOW_LABEL_FORMAT = '%Y-%m-%dT%H%M%S'
     
-def create_windowed_df(df: pd.DataFrame, window_start: str, window_end: str) -> pd.DataFrame: 
-    windowed_df = df  
-    if window_start != '':
-        windowed_df = df[~(df['timestamp'].str.contains(window_start))]
+def window_bound(bound: str) -> pd.Timestamp: 
+    bound_timestamp = pd.Timestamp(bound)
+    if bound_timestamp.tzinfo is not None: 
+        bound_timestamp = bound_timestamp.tz_convert(None)
+    return bound_timestamp
+
+def window_bounds(window_start: str, window_end: str) -> tuple[pd.Timestamp | None, pd.Timestamp | None]: 
+    # [lower, upper) bounds of the window, None where it is open. A bare date excludes that whole (partial) day 
+    # as the dataset's start and end dates always have; a datetime is used exactly
+    lower_bound = None
+    upper_bound = None
+    if window_start != '': 
+        lower_bound = window_bound(window_start)
+        if DATE_ONLY_PATTERN.match(window_start): 
+            lower_bound += pd.Timedelta(days=1)
     if window_end != '': 
-        windowed_df = windowed_df[~(windowed_df['timestamp'].str.contains(window_end))]
-    return windowed_df
+        upper_bound = window_bound(window_end)
+    return lower_bound, upper_bound
+
+def parse_window(window: str) -> tuple[pd.Timestamp | None, pd.Timestamp | None]: 
+    # <start>/<end>, each side read like --start_date and --end_date and left empty for an open window
+    window_start, separator, window_end = window.partition('/')
+    if separator == '': 
+        raise ValueError(f"Window ({window}) is not given as <start>/<end>")
+    return window_bounds(window_start, window_end)
+
+def rolling_windows(rolling: str, window_end: str) -> list[tuple[pd.Timestamp, pd.Timestamp]]: 
+    # <period>:<count> consecutive windows of one period each, the last one ending where the window ends
+    period, _, window_count = rolling.partition(':')
+    if period not in ROLLING_PERIODS or not window_count.isdigit() or int(window_count) < 1: 
+        raise ValueError(f"Rolling windows ({rolling}) are not given as <{'|'.join(ROLLING_PERIODS)}>:<number of windows>")
+    _, upper_bound = window_bounds('', window_end)
+    if upper_bound is None: 
+        raise ValueError('Rolling windows need an end date to end at')
+    windows = []
+    for _ in range(int(window_count)): 
+        lower_bound = upper_bound - ROLLING_PERIODS[period]
+        windows.append((lower_bound, upper_bound))
+        upper_bound = lower_bound
+    return windows[::-1]
+
+def windows_span(windows: list[tuple[pd.Timestamp | None, pd.Timestamp | None]]) -> tuple[pd.Timestamp | None, pd.Timestamp | None]: 
+    lower_bounds = [lower_bound for lower_bound, _ in windows]
+    upper_bounds = [upper_bound for _, upper_bound in windows]
+    lower_bound = None if None in lower_bounds else min(lower_bounds)
+    upper_bound = None if None in upper_bounds else max(upper_bounds)
+    return lower_bound, upper_bound
+
+def window_label(lower_bound: pd.Timestamp | None, upper_bound: pd.Timestamp | None) -> str: 
+    return '_'.join('open' if bound is None else bound.strftime(WINDOW_LABEL_FORMAT) for bound in (lower_bound, upper_bound))
+
+def timestamp_text(timestamp: pd.Timestamp | None) -> str | None: 
+    if timestamp is None or pd.isna(timestamp): 
+        return None
+    return timestamp.isoformat()
+
+def state_timestamp(text: str | None) -> pd.Timestamp | None: 
+    if text is None: 
+        return None
+    return pd.Timestamp(text)
+
+def sort_by_timestamp(df: pd.DataFrame) -> pd.DataFrame: 
+    if df['timestamp'].is_monotonic_increasing: 
+        return df
+    return df.sort_values(by=['timestamp'], kind='stable')
+
+def window_positions(timestamps: np.ndarray, lower_bound: pd.Timestamp | None, 
+                     upper_bound: pd.Timestamp | None) -> tuple[int, int]: 
+    # timestamps are sorted with NaT last, so both ends of the window are found by binary search
+    window_start = 0
+    window_end = len(timestamps) - int(np.isnat(timestamps).sum())
+    if lower_bound is not None: 
+        window_start = int(np.searchsorted(timestamps, lower_bound.to_datetime64(), side='left'))
+    if upper_bound is not None: 
+        window_end = min(window_end, int(np.searchsorted(timestamps, upper_bound.to_datetime64(), side='left')))
+    return window_start, max(window_start, window_end)
+
+def create_windowed_df(df: pd.DataFrame, window_start: str, window_end: str) -> pd.DataFrame: 
+    sorted_df = sort_by_timestamp(df)
+    lower_bound, upper_bound = window_bounds(window_start, window_end)
+    window_start_position, window_end_position = window_positions(sorted_df['timestamp'].to_numpy(dtype='datetime64[ns]'), 
+                                                                  lower_bound, upper_bound)
+    return sorted_df.iloc[window_start_position:window_end_position]
+
+class ValueIntervals: 
+    
+    def __init__(self, df: pd.DataFrame, attribute_name: str): 
+        # first and last timestamp of every value of the attribute (e.g. every transaction) and the positions of 
+        # its rows, computed once so each window only compares the interval table
+        self._df = df
+        grouped_timestamps = df.groupby(attribute_name, sort=False)['timestamp']
+        self.first_timestamps = grouped_timestamps.min()
+        self.last_timestamps = grouped_timestamps.max()
+        self._row_positions = grouped_timestamps.indices
+        
+    def overlapping_values(self, lower_bound: pd.Timestamp | None, upper_bound: pd.Timestamp | None) -> list: 
+        overlaps = ~pd.isna(self.first_timestamps)
+        if lower_bound is not None: 
+            overlaps &= self.last_timestamps >= lower_bound
+        if upper_bound is not None: 
+            overlaps &= self.first_timestamps < upper_bound
+        return self.first_timestamps.index[overlaps.to_numpy()].tolist()
+    
+    def rows_for_values(self, values: list) -> pd.DataFrame: 
+        if len(values) == 0: 
+            return self._df.iloc[0:0]
+        return self._df.iloc[np.sort(np.concatenate([self._row_positions[value] for value in values]))]
 
 def create_overlapped_window(df: pd.DataFrame, attribute_name: str, window_start: str, window_end: str, 
-                             exclude_overlapping_values: list) -> pd.DataFrame:
-    windowed_df = create_windowed_df(df, window_start, window_end)
-    unique_overlapping_values = windowed_df[attribute_name].unique().tolist()
+                             exclude_overlapping_values: list, value_intervals: ValueIntervals | None = None) -> pd.DataFrame:
+    # every row of the values whose time span overlaps the window, including the rows outside of it
+    if value_intervals is None: 
+        value_intervals = ValueIntervals(sort_by_timestamp(df), attribute_name)
+    unique_overlapping_values = value_intervals.overlapping_values(*window_bounds(window_start, window_end))
     for value in exclude_overlapping_values:
         if value not in unique_overlapping_values:
             continue 
         unique_overlapping_values.remove(value)
-    overlapped_window = df[df[attribute_name].isin(unique_overlapping_values)]
-    return overlapped_window
+    return value_intervals.rows_for_values(unique_overlapping_values)
     
+def transaction_modes(summaries: pd.DataFrame) -> np.ndarray: 
+    # how each transaction was started, checked in the order tabulate_transactional_values always has: 
+    # an authorized start, then request starts, then Authorizes, then a plain plug-in start. None for no mode
+    return np.select([summaries['valid_auth_start'].to_numpy(dtype=bool), 
+                      (summaries['request_starts'] != 0).to_numpy(), 
+                      (summaries['authorizes'] != 0).to_numpy(), 
+                      summaries['valid_start'].to_numpy(dtype=bool)], 
+                     TRANSACTION_MODES, default=None)
+
+def transaction_equation_contributions(summaries: pd.DataFrame) -> tuple[pd.DataFrame, pd.DataFrame]: 
+    # numerator and denominator every transaction adds to each fraction equation (one column per equation), 
+    # as InterimKPIs.add_transaction_summaries counts them
+    modes = transaction_modes(summaries)
+    authorizes = summaries['authorizes'].to_numpy(dtype='int64')
+    request_starts = summaries['request_starts'].to_numpy(dtype='int64')
+    power_delivery_attempts = summaries['power_delivery_attempt'].to_numpy(dtype=bool)
+    valid_stops = summaries['valid_stop'].to_numpy(dtype=bool)
+    numerators = {equation_num : np.zeros(len(summaries.index), dtype='int64') for equation_num in FRACTION_EQUATIONS}
+    denominators = {equation_num : np.zeros(len(summaries.index), dtype='int64') for equation_num in FRACTION_EQUATIONS}
+    for mode in TRANSACTION_MODES: 
+        is_mode = modes == mode
+        for equation_num in START_EQUATIONS.get(mode, []): 
+            denominators[equation_num] += is_mode
+        if mode in ('request_start', 'pre_plugin'): 
+            for equation_num in AUTHORIZE_EQUATIONS: 
+                denominators[equation_num] += np.where(is_mode, authorizes, 0)
+        if mode == 'request_start': 
+            for equation_num in REQUEST_START_EQUATIONS: 
+                denominators[equation_num] += np.where(is_mode, request_starts, 0)
+        numerators[POWER_DELIVERY_EQUATIONS[mode]] += is_mode & power_delivery_attempts
+        denominators[10] += is_mode & power_delivery_attempts
+        numerators[VALID_STOP_EQUATIONS[mode]] += is_mode & valid_stops
+        numerators[10] += is_mode & valid_stops & power_delivery_attempts
+    return pd.DataFrame(numerators, index=summaries.index), pd.DataFrame(denominators, index=summaries.index)
+
+def orphan_authorize_rows(windowed_df: pd.DataFrame) -> pd.DataFrame: 
+    authorizes_df = transaction_parser.filter_authorizes(windowed_df)
+    return authorizes_df[authorizes_df['transaction_ID'].isin(ORPHAN_TRANSACTION_IDS)]
+
+def orphan_request_start_rows(windowed_df: pd.DataFrame) -> pd.DataFrame: 
+    request_starts_df = transaction_parser.filter_request_starts(windowed_df)
+    return request_starts_df[pd.isna(request_starts_df['transaction_ID'])]
+
+def load_site_map(site_map_path: str) -> pd.Series: 
+    # csv with a device_ID and a site column, devices that are not in it are reported under no site
+    site_map_df = pd.read_csv(site_map_path)
+    missing_columns = {'device_ID', 'site'} - set(site_map_df.columns)
+    if missing_columns: 
+        raise ValueError(f"Site map ({site_map_path}) has no {', '.join(sorted(missing_columns))} column")
+    return site_map_df.drop_duplicates(subset=['device_ID'], keep='last').set_index('device_ID')['site']
+
+def long_format_statistic(statistic: str, values: pd.Series, equation_num: int | None = None) -> pd.DataFrame: 
+    # values are indexed by group and equation, or only by group for the given equation
+    long_df = values.astype(object).rename('value').reset_index()
+    long_df.columns = ['group', 'equation', 'value'] if equation_num is None else ['group', 'value']
+    if equation_num is not None: 
+        long_df['equation'] = equation_num
+    long_df['statistic'] = statistic
+    return long_df
+
+def long_format_breakdown(level: str, numerators: pd.DataFrame, denominators: pd.DataFrame, 
+                          charge_start_times: pd.Series) -> pd.DataFrame: 
+    # one level, group, equation, statistic, value row per fraction equation numerator and denominator of every 
+    # group, then the equation 9 percentiles and sample count of the groups with charge start times
+    long_dfs = [long_format_statistic('numerator', numerators.stack()), 
+                long_format_statistic('denominator', denominators.stack())]
+    grouped_charge_start_times = charge_start_times.dropna().groupby(level=0, sort=True)
+    for statistic, percentile in CHARGE_START_TIME_PERCENTILES.items(): 
+        long_dfs.append(long_format_statistic(statistic, grouped_charge_start_times.quantile(percentile / 100), 9))
+    long_dfs.append(long_format_statistic('total_samples', grouped_charge_start_times.size(), 9))
+    long_df = pd.concat(long_dfs, ignore_index=True).sort_values(by=['group', 'equation'], kind='stable')
+    long_df.insert(0, 'level', level)
+    return long_df[['level', 'group', 'equation', 'statistic', 'value']].reset_index(drop=True)
+
+def load_parsed_data(input_data_path: str, window_start: str = '', window_end: str = '') -> pd.DataFrame: 
+    return load_parsed_data_in_bounds(input_data_path, *window_bounds(window_start, window_end))
+
+def load_parsed_data_in_bounds(input_data_path: str, lower_bound: pd.Timestamp | None, 
+                               upper_bound: pd.Timestamp | None) -> pd.DataFrame: 
+    # a date partitioned store (parse_messages.py --partition_by_date) only has the dates in the window read, 
+    # plus the rows on other dates of the transactions that overlap it, which is all the calculator looks at
+    if os.path.isdir(input_data_path): 
+        return date_partitions.read_window(input_data_path, lower_bound, upper_bound, columns=PARSED_DATA_COLUMNS)
+    # a parquet file is typed already and only the columns used here are read from it
+    if input_data_path.endswith('.parquet'): 
+        return parquet_ops.read_dataframe(input_data_path, columns=PARSED_DATA_COLUMNS)
+    df = pd.read_csv(input_data_path)
+    df['timestamp'] = time_ops.parse_timestamps(df['timestamp'])
+    df['response_timestamp'] = time_ops.parse_timestamps(df['response_timestamp'])
+    return df
+
+def empty_transaction_summaries() -> pd.DataFrame: 
+    return pd.DataFrame({column : pd.Series(dtype=dtype) for column, dtype in TRANSACTION_SUMMARY_DTYPES.items()}, 
+                        index=pd.Index([], name='transaction_ID', dtype=object))
+
 class InterimKPIs: 
     
-    def __init__(self): 
+    def __init__(self, percentile_backend: str = 'exact', sketch_k: int = quantiles.DEFAULT_SKETCH_K): 
+        # equation 9 holds the charge start time samples, all of them or a mergeable sketch of them
+        self._percentile_backend = percentile_backend
+        self._sketch_k = sketch_k
+        # hours without an event before the latest window's start after which a transaction is settled
+        self.settle_after = pd.Timedelta(hours=DEFAULT_SETTLE_AFTER_HOURS)
         self.equations = {  1 : fraction.AdditiveFraction(),
                             3 : fraction.AdditiveFraction(),
                             4 : fraction.AdditiveFraction(),
                             5 : fraction.AdditiveFraction(),
-                            9 : [],
+                            9 : quantiles.create_quantiles(percentile_backend, sketch_k),
                             10 : fraction.AdditiveFraction(),
                             12 : fraction.AdditiveFraction(),
                             14 : fraction.AdditiveFraction(),
                             15 : fraction.AdditiveFraction(),
                             16 : fraction.AdditiveFraction(),
         }
+        # the [lower, upper) windows counted, and the summaries of the transactions added with 
+        # add_transaction_summaries that could still change, kept so states of other windows can be merged 
+        # without counting a transaction twice. Their charge start times only go into equation 9 once they are 
+        # settled, so a replaced summary never has to be taken back out of the samples
+        self.transaction_summaries = empty_transaction_summaries()
+        self.windows = []
         
     def percentage_based_equation_registry(self, KPI_name: str) -> list[int]: 
         if KPI_name == 'session_success': 
@@ -70,12 +304,12 @@ class InterimKPIs:
             raise ValueError(f"KPI: {KPI_name} not a valid percentage-based KPI.")        
         
     def add_authorizes(self, num_authorizes: int) -> None: 
-        self.equations[3].add_to_denominator(num_authorizes)
-        self.equations[14].add_to_denominator(num_authorizes)
+        for equation_num in AUTHORIZE_EQUATIONS: 
+            self.equations[equation_num].add_to_denominator(num_authorizes)
         
     def add_request_starts(self, num_request_starts: int) -> None: 
-        self.equations[4].add_to_denominator(num_request_starts)
-        self.equations[15].add_to_denominator(num_request_starts)
+        for equation_num in REQUEST_START_EQUATIONS: 
+            self.equations[equation_num].add_to_denominator(num_request_starts)
     
     def add_start(self, start: bool, mode: str) -> None:
         if  start is False: 
@@ -123,6 +357,164 @@ class InterimKPIs:
         time_diff_seconds = time_ops.events_time_diff_seconds(start_timestamp, end_timestamp)
         self.equations[9].append(time_diff_seconds)
         
+    def add_transaction_summaries(self, summaries: pd.DataFrame, last_timestamps: pd.Series | None = None) -> None: 
+        # bulk version of the per-transaction add_* calls in KPICalculator, one row per transaction as returned 
+        # by transaction_parser.summarize_transactions. A transaction that was already added is only counted 
+        # once, from the summary that saw its latest event (a transaction still going on when it was first 
+        # summarized is replaced once more of it is known). Summaries are kept until they are settled
+        summaries = summaries.copy()
+        summaries['last_timestamp'] = pd.NaT if last_timestamps is None else last_timestamps.reindex(summaries.index)
+        summaries.index = pd.Index(parquet_ops.text_column(summaries.index.to_series()), name='transaction_ID')
+        summaries = summaries[~summaries.index.duplicated(keep='last')]
+        known_transaction_IDs = summaries.index.intersection(self.transaction_summaries.index)
+        replaces_known = (summaries.loc[known_transaction_IDs, 'last_timestamp'] > 
+                          self.transaction_summaries.loc[known_transaction_IDs, 'last_timestamp']).to_numpy(dtype=bool)
+        replaced_transaction_IDs = known_transaction_IDs[replaces_known]
+        kept_transaction_IDs = known_transaction_IDs[~replaces_known]
+        self._add_transaction_contributions(self.transaction_summaries.loc[replaced_transaction_IDs], -1, 
+                                            charge_start_times=False)
+        summaries = summaries.drop(index=kept_transaction_IDs)
+        self._add_transaction_contributions(summaries, 1, charge_start_times=False)
+        summaries = summaries[list(TRANSACTION_SUMMARY_DTYPES)].astype(TRANSACTION_SUMMARY_DTYPES)
+        known_summaries = self.transaction_summaries.drop(index=replaced_transaction_IDs)
+        if len(known_summaries.index) == 0: 
+            self.transaction_summaries = summaries
+        elif len(summaries.index) > 0: 
+            self.transaction_summaries = pd.concat([known_summaries, summaries])
+        else: 
+            self.transaction_summaries = known_summaries
+        self.settle_transactions()
+
+    def settled_before(self) -> pd.Timestamp | None: 
+        # a transaction with no event for settle_after before the latest window counted is taken to be over, 
+        # the windows merged later do not start before this window
+        lower_bounds = [lower_bound for lower_bound, _ in self.windows if lower_bound is not None]
+        if len(lower_bounds) == 0: 
+            return None
+        return max(lower_bounds) - self.settle_after
+
+    def settle_transactions(self) -> None: 
+        # the summaries of transactions that can no longer change are dropped, only their counts and charge 
+        # start times are kept, so the state holds about one window of transactions however long the rollup
+        boundary = self.settled_before()
+        if boundary is None: 
+            return
+        last_timestamps = self.transaction_summaries['last_timestamp']
+        is_settled = (pd.isna(last_timestamps) | (last_timestamps < boundary)).to_numpy(dtype=bool)
+        if not is_settled.any(): 
+            return
+        self.equations[9].extend(self.transaction_summaries.loc[is_settled, 'charge_start_time'].dropna().tolist())
+        self.transaction_summaries = self.transaction_summaries[~is_settled]
+
+    def add_finished_transaction_summaries(self, summaries: pd.DataFrame) -> None: 
+        # for transactions that are complete and never summarized again (e.g. by a live tracker), which are 
+        # counted without keeping their summaries, so memory does not grow with the number of transactions
+        self._add_transaction_contributions(summaries, 1)
+
+    def _add_transaction_contributions(self, summaries: pd.DataFrame, sign: int, charge_start_times: bool = True) -> None: 
+        # sign -1 takes back what the same summaries added, it is only used for summaries whose charge start 
+        # times were left out
+        modes = transaction_modes(summaries)
+        for mode in TRANSACTION_MODES: 
+            mode_summaries = summaries[modes == mode]
+            if mode in ('cached_auth', 'post_plugin'): 
+                self._add_to_equations(START_EQUATIONS[mode], 0, sign * len(mode_summaries))
+            if mode in ('request_start', 'pre_plugin'): 
+                self.add_authorizes(sign * int(mode_summaries['authorizes'].sum()))
+            if mode == 'request_start': 
+                self.add_request_starts(sign * int(mode_summaries['request_starts'].sum()))
+            power_delivery_attempts = sign * int(mode_summaries['power_delivery_attempt'].sum())
+            self._add_to_equations([POWER_DELIVERY_EQUATIONS[mode]], power_delivery_attempts, 0)
+            self.equations[10].add_to_denominator(power_delivery_attempts)
+            self._add_to_equations([VALID_STOP_EQUATIONS[mode]], sign * int(mode_summaries['valid_stop'].sum()), 0)
+            self.equations[10].add_to_numerator(sign * int((mode_summaries['valid_stop'] & 
+                                                            mode_summaries['power_delivery_attempt']).sum()))
+        if charge_start_times: 
+            self.equations[9].extend(summaries['charge_start_time'].dropna().tolist())
+
+    def add_window(self, lower_bound: pd.Timestamp | None, upper_bound: pd.Timestamp | None) -> None: 
+        for window_lower_bound, window_upper_bound in self.windows: 
+            if ((lower_bound is None or window_upper_bound is None or lower_bound < window_upper_bound) and 
+                (upper_bound is None or window_lower_bound is None or window_lower_bound < upper_bound)): 
+                raise ValueError(f"Window [{lower_bound}, {upper_bound}) overlaps the window "
+                                 f"[{window_lower_bound}, {window_upper_bound}) already counted")
+        self.windows.append((lower_bound, upper_bound))
+
+    def merge(self, other: InterimKPIs) -> None: 
+        # the windowed counts of disjoint windows add up; transactions that straddle the windows' boundary are 
+        # in both states and are counted once, see add_transaction_summaries
+        boundary = self.settled_before()
+        for lower_bound, upper_bound in other.windows: 
+            if boundary is not None and (lower_bound is None or lower_bound < boundary): 
+                raise ValueError(f"Window [{lower_bound}, {upper_bound}) starts before {boundary}, the transactions "
+                                 f"without an event since then are settled and could be counted twice")
+            self.add_window(lower_bound, upper_bound)
+        # everything other counted besides its unsettled transaction summaries is added as is, the summaries 
+        # are then added like any others
+        other_transaction_KPIs = InterimKPIs(self._percentile_backend, self._sketch_k)
+        other_transaction_KPIs._add_transaction_contributions(other.transaction_summaries, 1, charge_start_times=False)
+        for equation_num, equation in other.equations.items(): 
+            if equation_num == 9: 
+                continue
+            self.equations[equation_num].add_to_numerator(equation.numerator - 
+                                                          other_transaction_KPIs.equations[equation_num].numerator)
+            self.equations[equation_num].add_to_denominator(equation.denominator - 
+                                                            other_transaction_KPIs.equations[equation_num].denominator)
+        self.equations[9].merge(other.equations[9])
+        self.add_transaction_summaries(other.transaction_summaries.drop(columns=['last_timestamp']), 
+                                       other.transaction_summaries['last_timestamp'])
+
+    def to_state(self) -> dict: 
+        summaries = self.transaction_summaries
+        return {'version' : STATE_VERSION, 
+                'windows' : [[timestamp_text(lower_bound), timestamp_text(upper_bound)] 
+                             for lower_bound, upper_bound in self.windows], 
+                'settle_after_hours' : self.settle_after / pd.Timedelta(hours=1), 
+                'equations' : {str(equation_num) : [equation.numerator, equation.denominator] 
+                               for equation_num, equation in self.equations.items() if equation_num != 9}, 
+                'charge_start_times' : self.equations[9].to_state(), 
+                'transactions' : {'transaction_ID' : summaries.index.tolist(), 
+                                  **{column : [None if pd.isna(value) else value for value in summaries[column].tolist()] 
+                                     for column in TRANSACTION_SUMMARY_DTYPES if column != 'last_timestamp'}, 
+                                  'last_timestamp' : [timestamp_text(timestamp) for timestamp in summaries['last_timestamp']]}}
+
+    @classmethod
+    def from_state(cls, state: dict) -> InterimKPIs: 
+        if state.get('version') != STATE_VERSION: 
+            raise ValueError(f"KPI state version ({state.get('version')}) is not {STATE_VERSION}")
+        interim_KPIs = cls(state['charge_start_times']['backend'])
+        charge_start_times = quantiles.quantiles_from_state(state['charge_start_times'])
+        interim_KPIs.windows = [(state_timestamp(lower_bound), state_timestamp(upper_bound)) 
+                                for lower_bound, upper_bound in state['windows']]
+        interim_KPIs.settle_after = pd.Timedelta(hours=state['settle_after_hours'])
+        for equation_num, (numerator, denominator) in state['equations'].items(): 
+            interim_KPIs.equations[int(equation_num)] = fraction.AdditiveFraction(numerator, denominator)
+        interim_KPIs.equations[9] = charge_start_times
+        interim_KPIs._sketch_k = getattr(charge_start_times, 'k', interim_KPIs._sketch_k)
+        transactions = dict(state['transactions'])
+        summaries = pd.DataFrame({column : transactions[column] for column in TRANSACTION_SUMMARY_DTYPES}, 
+                                 index=pd.Index(transactions['transaction_ID'], name='transaction_ID', dtype=object))
+        summaries['charge_start_time'] = summaries['charge_start_time'].astype(float)
+        summaries['last_timestamp'] = time_ops.parse_timestamps(summaries['last_timestamp'])
+        interim_KPIs.transaction_summaries = summaries.astype(TRANSACTION_SUMMARY_DTYPES)
+        return interim_KPIs
+
+    def save(self, state_file_path: str) -> None: 
+        def write(file_path: str) -> None: 
+            with open(file_path, 'w', encoding='utf-8') as outfile: 
+                json.dump(self.to_state(), outfile, separators=(',', ':'))
+        file_ops.write_atomically(state_file_path, write)
+
+    @classmethod
+    def load(cls, state_file_path: str) -> InterimKPIs: 
+        with open(state_file_path, 'r', encoding='utf-8') as infile: 
+            return cls.from_state(json.load(infile))
+
+    def _add_to_equations(self, equation_nums: list[int], numerator: int, denominator: int) -> None: 
+        for equation_num in equation_nums: 
+            self.equations[equation_num].add_to_numerator(numerator)
+            self.equations[equation_num].add_to_denominator(denominator)
+
     def equation(self, equation_num: int) -> fraction.AdditiveFraction: 
         return self.equations[equation_num]
     
@@ -145,13 +537,26 @@ class InterimKPIs:
         return total_denominator 
     
     def x_percentile_charge_start_time(self, percentile: int) -> float: 
-        if self.num_charge_start_time_samples() == 0: 
-            return -1
-        charge_start_times = np.asarray(self.equations[9])
-        return np.percentile(charge_start_times, percentile)
+        return self.charge_start_time_percentiles([percentile])[0]
+
+    def charge_start_times(self) -> quantiles.ExactQuantiles | quantiles.SketchQuantiles: 
+        # the settled samples and those of the transactions that could still change
+        pending_charge_start_times = self.transaction_summaries['charge_start_time'].dropna().tolist()
+        if len(pending_charge_start_times) == 0: 
+            return self.equations[9]
+        charge_start_times = self.equations[9].copy()
+        charge_start_times.extend(pending_charge_start_times)
+        return charge_start_times
+
+    def charge_start_time_percentiles(self, percentiles: list[int]) -> list[float]: 
+        # every percentile of a report is read from a single pass over the samples
+        charge_start_times = self.charge_start_times()
+        if len(charge_start_times) == 0: 
+            return [-1] * len(percentiles)
+        return charge_start_times.percentiles(percentiles)
     
     def num_charge_start_time_samples(self) -> int: 
-        return len(self.equations[9])
+        return len(self.equations[9]) + int(self.transaction_summaries['charge_start_time'].notna().sum())
         
     def percent_contribution_for_x_KPI(self, equation_num: int, KPI_name: str) -> float: 
         percent_contribution_numerator = self.equations[equation_num].numerator
@@ -178,74 +583,176 @@ class InterimKPIs:
         xlsx_writer.write_session_success(self)
                  
     
+def orphan_authorizes(windowed_df: pd.DataFrame) -> int: 
+    return len(orphan_authorize_rows(windowed_df))
+
+def orphan_request_starts(windowed_df: pd.DataFrame) -> int: 
+    return len(orphan_request_start_rows(windowed_df))
+
+def print_interim_KPIs(interim_KPIs: InterimKPIs, output_xlsx_file: str) -> None: 
+    xlsx_writer = KPIExcelWriter(output_xlsx_file)
+    succession_success_equations = interim_KPIs.percentage_based_equation_registry('session_success')
+    xlsx_writer.write_percentage_based_KPI_sheet(interim_KPIs, 'completions', 'charge_attempts', 
+                                                 'session_success', succession_success_equations)
+    charge_start_success_equations = interim_KPIs.percentage_based_equation_registry('charge_start_success')
+    xlsx_writer.write_percentage_based_KPI_sheet(interim_KPIs, 'power_delivery_attempts', 'plug_in_attempts', 
+                                                 'charge_start_success', charge_start_success_equations)
+    charge_end_success_equations = interim_KPIs.percentage_based_equation_registry('charge_end_success')
+    xlsx_writer.write_percentage_based_KPI_sheet(interim_KPIs, 'completions', 'power_delivery_attempts', 
+                                                 'charge_end_success', charge_end_success_equations, True)
+    xlsx_writer.write_charge_start_time(interim_KPIs)
+    xlsx_writer.write_KPIs()
+
 class KPICalculator: 
 
-    def __init__(self, df: pd.DataFrame):
+    def __init__(self, df: pd.DataFrame, percentile_backend: str = 'exact', sketch_k: int = quantiles.DEFAULT_SKETCH_K):
+        # sorted once, both windows are then sliced by binary search on the timestamps
+        df = sort_by_timestamp(df)
+        self._df = df
         self._windowed_df = create_windowed_df(df, START_RANGE, END_RANGE)
-        self._overlapped_windowed_df = create_overlapped_window(df, 'transaction_ID', START_RANGE, END_RANGE, [-1])
-        self._interim_KPIs = InterimKPIs()
+        self._transaction_intervals = ValueIntervals(df, 'transaction_ID')
+        self._overlapped_windowed_df = create_overlapped_window(df, 'transaction_ID', START_RANGE, END_RANGE, [-1], 
+                                                                self._transaction_intervals)
+        self._percentile_backend = percentile_backend
+        self._sketch_k = sketch_k
+        self._interim_KPIs = InterimKPIs(percentile_backend, sketch_k)
+        self._interim_KPIs.add_window(*window_bounds(START_RANGE, END_RANGE))
         
     def tabulate_orphan_authorizes(self):
-        authorizes_df = transaction_parser.filter_authorizes(self._windowed_df)
-        orphaned_authorizes =  authorizes_df[authorizes_df['transaction_ID'] == -1]
-        orphaned_authorizes_1 = authorizes_df[authorizes_df['transaction_ID'] == -98]
-        orphaned_authorizes_2 =  authorizes_df[authorizes_df['transaction_ID'] == -99]
-        self._interim_KPIs.add_authorizes(len(orphaned_authorizes) + len(orphaned_authorizes_1) + len(orphaned_authorizes_2))
+        self._interim_KPIs.add_authorizes(orphan_authorizes(self._windowed_df))
     
     def tabulate_orphan_request_starts(self) -> None:
-        request_starts_df = transaction_parser.filter_request_starts(self._windowed_df)
-        orphaned_request_starts = len(request_starts_df[pd.isna(request_starts_df['transaction_ID'])])
-        self._interim_KPIs.add_request_starts(orphaned_request_starts)
+        self._interim_KPIs.add_request_starts(orphan_request_starts(self._windowed_df))
 
     def tabulate_transactional_values(self) -> None: 
-        unique_transaction_IDs = self._overlapped_windowed_df['transaction_ID'].unique().tolist()
         print('-------Tabulating Transaction Values------')
-        for transaction_ID in tqdm(unique_transaction_IDs):
-            transaction_df = self._overlapped_windowed_df[self._overlapped_windowed_df['transaction_ID'] == transaction_ID]
-            transaction_authorizes = len(transaction_parser.filter_authorizes_no_double_count(transaction_df))
-            transaction_request_starts = len(transaction_parser.filter_request_starts(transaction_df))
-            power_delivery_attempt = transaction_parser.power_delivery_attempt(transaction_df)
-            valid_start = transaction_parser.valid_start(transaction_df)
-            valid_stop = transaction_parser.valid_stop(transaction_df)
-            if transaction_parser.valid_auth_start(transaction_df):
-                self._interim_KPIs.add_start(True, 'cached_auth')
-                self._interim_KPIs.add_power_delivery_attempt(power_delivery_attempt, 'cached_auth')
-                self._interim_KPIs.add_valid_stop(valid_stop, 'cached_auth', power_delivery_attempt)
-            elif transaction_request_starts != 0: 
-                self._interim_KPIs.add_authorizes(transaction_authorizes)
-                self._interim_KPIs.add_request_starts(transaction_request_starts)
-                self._interim_KPIs.add_power_delivery_attempt(power_delivery_attempt, 'request_start')
-                self._interim_KPIs.add_valid_stop(valid_stop, 'request_start', power_delivery_attempt)
-            elif transaction_authorizes != 0: 
-                self._interim_KPIs.add_authorizes(transaction_authorizes)
-                self._interim_KPIs.add_power_delivery_attempt(power_delivery_attempt, 'pre_plugin')
-                self._interim_KPIs.add_valid_stop(valid_stop, 'pre_plugin', power_delivery_attempt)
-            elif valid_start: 
-                self._interim_KPIs.add_start(valid_start, 'post_plugin')
-                self._interim_KPIs.add_power_delivery_attempt(power_delivery_attempt, 'post_plugin')
-                self._interim_KPIs.add_valid_stop(valid_stop, 'post_plugin', power_delivery_attempt) 
-            self._interim_KPIs.add_charge_start_time(transaction_df)
+        # every transaction is classified from a single groupby over the overlapped window
+        transaction_summaries = transaction_parser.summarize_transactions(self._overlapped_windowed_df)
+        self._interim_KPIs.add_transaction_summaries(transaction_summaries, self._transaction_intervals.last_timestamps)
+
+    def tabulate_breakdown(self, site_map: pd.Series | None = None) -> pd.DataFrame: 
+        print('-------Tabulating KPI Breakdown------')
+        # the numerators, denominators and charge start times of every device in one pass over the window, the 
+        # same as a KPICalculator run on each device's rows alone, then summed over the devices of each site
+        device_transaction_intervals = ValueIntervals(self._df, ['device_ID', 'transaction_ID'])
+        device_transactions = [device_transaction for device_transaction in 
+                               device_transaction_intervals.overlapping_values(*window_bounds(START_RANGE, END_RANGE)) 
+                               if device_transaction[1] not in [-1]]
+        summaries = transaction_parser.summarize_transactions(device_transaction_intervals.rows_for_values(device_transactions), 
+                                                              ['device_ID', 'transaction_ID'])
+        transaction_numerators, transaction_denominators = transaction_equation_contributions(summaries)
+        device_IDs = summaries.index.get_level_values('device_ID')
+        numerators = transaction_numerators.groupby(device_IDs).sum()
+        denominators = transaction_denominators.groupby(device_IDs).sum()
+        # orphans have no transaction, they are counted on the device that sent them
+        orphan_authorize_counts = orphan_authorize_rows(self._windowed_df).groupby('device_ID').size()
+        orphan_request_start_counts = orphan_request_start_rows(self._windowed_df).groupby('device_ID').size()
+        device_index = numerators.index.union(orphan_authorize_counts.index).union(orphan_request_start_counts.index)
+        numerators = numerators.reindex(device_index, fill_value=0)
+        denominators = denominators.reindex(device_index, fill_value=0)
+        for equation_num in AUTHORIZE_EQUATIONS: 
+            denominators[equation_num] += orphan_authorize_counts.reindex(device_index, fill_value=0)
+        for equation_num in REQUEST_START_EQUATIONS: 
+            denominators[equation_num] += orphan_request_start_counts.reindex(device_index, fill_value=0)
+        charge_start_times = pd.Series(summaries['charge_start_time'].to_numpy(dtype=float), index=device_IDs)
+        breakdown_dfs = [long_format_breakdown('device', numerators, denominators, charge_start_times)]
+        if site_map is not None: 
+            device_sites = site_map.reindex(device_index).fillna('no site').to_numpy()
+            breakdown_dfs.append(long_format_breakdown('site', numerators.groupby(device_sites).sum(), 
+                                                       denominators.groupby(device_sites).sum(), 
+                                                       pd.Series(charge_start_times.to_numpy(), 
+                                                                 index=site_map.reindex(device_IDs).fillna('no site').to_numpy())))
+        return pd.concat(breakdown_dfs, ignore_index=True)
+
+    def roll_up(self, rollup_state_path: str, settle_after: pd.Timedelta = pd.Timedelta(hours=DEFAULT_SETTLE_AFTER_HOURS)) -> None: 
+        # this window's KPIs are merged into the stored rollup (e.g. month to date), which is saved and reported 
+        # from then on. The windows rolled up must not overlap and are merged in order
+        rollup_KPIs = InterimKPIs(self._percentile_backend, self._sketch_k)
+        if os.path.exists(rollup_state_path): 
+            rollup_KPIs = InterimKPIs.load(rollup_state_path)
+        rollup_KPIs.settle_after = settle_after
+        rollup_KPIs.merge(self._interim_KPIs)
+        rollup_KPIs.save(rollup_state_path)
+        self._interim_KPIs = rollup_KPIs
             
     def print_KPIs(self, output_xlsx_file: str) -> None: 
-        xlsx_writer = KPIExcelWriter(output_xlsx_file)
-        succession_success_equations = self._interim_KPIs.percentage_based_equation_registry('session_success')
-        xlsx_writer.write_percentage_based_KPI_sheet(self._interim_KPIs, 'completions', 'charge_attempts', 
-                                                     'session_success', succession_success_equations)
-        charge_start_success_equations = self._interim_KPIs.percentage_based_equation_registry('charge_start_success')
-        xlsx_writer.write_percentage_based_KPI_sheet(self._interim_KPIs, 'power_delivery_attempts', 'plug_in_attempts', 
-                                                     'charge_start_success', charge_start_success_equations)
-        charge_end_success_equations = self._interim_KPIs.percentage_based_equation_registry('charge_end_success')
-        xlsx_writer.write_percentage_based_KPI_sheet(self._interim_KPIs, 'completions', 'power_delivery_attempts', 
-                                                     'charge_end_success', charge_end_success_equations, True)
-        xlsx_writer.write_charge_start_time(self._interim_KPIs)
-        xlsx_writer.write_KPIs()
+        print_interim_KPIs(self._interim_KPIs, output_xlsx_file)
+
+class MultiWindowKPICalculator: 
+
+    def __init__(self, df: pd.DataFrame, windows: list[tuple[pd.Timestamp | None, pd.Timestamp | None]], 
+                 percentile_backend: str = 'exact', sketch_k: int = quantiles.DEFAULT_SKETCH_K): 
+        # the same KPIs as a KPICalculator per window, from one sort, one transaction interval table and one 
+        # classification of every transaction that overlaps any of the windows
+        self._df = sort_by_timestamp(df)
+        self._timestamps = self._df['timestamp'].to_numpy(dtype='datetime64[ns]')
+        self._transaction_intervals = ValueIntervals(self._df, 'transaction_ID')
+        self.windows = windows
+        self.interim_KPIs = []
+        for lower_bound, upper_bound in windows: 
+            interim_KPIs = InterimKPIs(percentile_backend, sketch_k)
+            interim_KPIs.add_window(lower_bound, upper_bound)
+            self.interim_KPIs.append(interim_KPIs)
+
+    def _overlapping_transaction_IDs(self, lower_bound: pd.Timestamp | None, upper_bound: pd.Timestamp | None) -> list: 
+        # excludes the same placeholder ID as KPICalculator's overlapped window
+        return [transaction_ID for transaction_ID in self._transaction_intervals.overlapping_values(lower_bound, upper_bound) 
+                if transaction_ID not in [-1]]
+
+    def tabulate(self) -> None: 
+        print('-------Tabulating Transaction Values------')
+        # a transaction's summary only depends on its own rows, so every window takes the summaries of the 
+        # transactions that overlap it from the one classification
+        span_transaction_IDs = self._overlapping_transaction_IDs(*windows_span(self.windows))
+        transaction_summaries = transaction_parser.summarize_transactions(
+                                    self._transaction_intervals.rows_for_values(span_transaction_IDs))
+        for (lower_bound, upper_bound), interim_KPIs in zip(self.windows, self.interim_KPIs): 
+            window_start_position, window_end_position = window_positions(self._timestamps, lower_bound, upper_bound)
+            windowed_df = self._df.iloc[window_start_position:window_end_position]
+            interim_KPIs.add_authorizes(orphan_authorizes(windowed_df))
+            interim_KPIs.add_request_starts(orphan_request_starts(windowed_df))
+            window_transaction_IDs = self._overlapping_transaction_IDs(lower_bound, upper_bound)
+            interim_KPIs.add_transaction_summaries(transaction_summaries[transaction_summaries.index.isin(window_transaction_IDs)], 
+                                                   self._transaction_intervals.last_timestamps)
+
+    def print_KPIs(self, output_data_dir: str, file_prefix: str) -> None: 
+        for (lower_bound, upper_bound), interim_KPIs in zip(self.windows, self.interim_KPIs): 
+            print_interim_KPIs(interim_KPIs, os.path.join(output_data_dir, 
+                                                          f"{file_prefix}_{window_label(lower_bound, upper_bound)}.xlsx"))
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(prog='interim-kpi-calculator')
-    parser.add_argument('--start_date', '-s', help='start date of the given dataset (this is used to truncate overlapping days)')
-    parser.add_argument('--end_date', '-e', help='end date of the given dataset (this is used to truncate overlapping days)')
-    parser.add_argument('--parsed_file', '-pf', help='parsed input file to analyze with the kpi calculator')
+    parser.add_argument('--start_date', '-s', help='start date of the given dataset (the KPIs start the day after it), or the datetime the window starts at; '
+                                                   'rows before the window are left out, not only the rows of the start date')
+    parser.add_argument('--end_date', '-e', help='end date of the given dataset (the KPIs end the day before it), or the datetime the window ends before; '
+                                                 'rows at or after the end of the window are left out, not only the rows of the end date')
+    parser.add_argument('--parsed_file', '-pf', help='parsed input file, or date partitioned directory, to analyze with the kpi calculator')
+    parser.add_argument('--rollup_state', help='KPI state file this window is merged into, the KPIs of the merged state are printed '
+                                               '(the file is created if it does not exist)')
+    parser.add_argument('--settle_after', type=float, default=DEFAULT_SETTLE_AFTER_HOURS, 
+                        help='hours without an event before the window after which a rolled up transaction is settled, '
+                             'only its counts are kept and a later window must not start before then')
+    parser.add_argument('--percentile_backend', choices=quantiles.QUANTILE_BACKENDS, default='exact', 
+                        help='keep every charge start time for exact percentiles, or a mergeable KLL sketch of them in bounded memory')
+    parser.add_argument('--sketch_k', type=int, default=quantiles.DEFAULT_SKETCH_K, 
+                        help='size of the KLL sketch, larger sketches give more accurate percentiles')
+    parser.add_argument('--windows', nargs='+', 
+                        help='calculate the KPIs of several <start>/<end> windows from one load instead of the --start_date '
+                             'and --end_date window, each side is read like those and may be left empty')
+    parser.add_argument('--rolling', 
+                        help='calculate the KPIs of <daily|weekly|monthly>:<count> consecutive windows ending at --end_date '
+                             'from one load, e.g. daily:90 for each of the last 90 days')
+    parser.add_argument('--breakdown', action='store_true', 
+                        help='also write the numerators, denominators and charge start time percentiles of every device '
+                             '(and site, with --site_map) to a long format csv next to the KPI workbook')
+    parser.add_argument('--site_map', help='csv with a device_ID and a site column to break the KPIs down by site with --breakdown')
     args = parser.parse_args()
+    if args.rollup_state is not None and (args.windows is not None or args.rolling is not None): 
+        parser.error('--rollup_state takes a single window, not --windows or --rolling')
+    if args.breakdown and (args.windows is not None or args.rolling is not None): 
+        parser.error('--breakdown takes a single window, not --windows or --rolling')
+    if args.site_map is not None and not args.breakdown: 
+        parser.error('--site_map is only used with --breakdown')
 
     if(args.parsed_file != None):
         PARSED_INPUT_FILE_NAME = args.parsed_file
@@ -261,14 +768,31 @@ if __name__ == "__main__":
 
     if not os.path.exists(output_data_dir):
         os.mkdir(output_data_dir)
-    df = pd.read_csv(input_data_path)
-    df = df.drop_duplicates(subset=['device_ID', 'transaction_ID', 'event_type', 'event_code', 'timestamp'], keep='first')
+    todays_date = datetime.today().strftime('%Y-%m-%d')
+    windows = []
+    if args.windows is not None: 
+        windows.extend(parse_window(window) for window in args.windows)
+    if args.rolling is not None: 
+        windows.extend(rolling_windows(args.rolling, END_RANGE))
+    if len(windows) == 0: 
+        windows = [window_bounds(START_RANGE, END_RANGE)]
+    df = load_parsed_data_in_bounds(input_data_path, *windows_span(windows))
+    df = df.drop_duplicates(subset=DUPLICATE_COLUMNS, keep='first')
     if len(df.index) == 0:
         raise ValueError('Formatted data is empty. Cannot perform calculations')
-    KPI_calculator = KPICalculator(df)
-    KPI_calculator.tabulate_orphan_authorizes()
-    KPI_calculator.tabulate_orphan_request_starts()
-    KPI_calculator.tabulate_transactional_values()
-    todays_date = datetime.today().strftime('%Y-%m-%d')
-    output_file_path = os.path.join(output_data_dir, f"dataset_KPIs_{todays_date}.xlsx")
-    KPI_calculator.print_KPIs(output_file_path)
\ No newline at end of file
+    if args.windows is not None or args.rolling is not None: 
+        multi_window_KPI_calculator = MultiWindowKPICalculator(df, windows, args.percentile_backend, args.sketch_k)
+        multi_window_KPI_calculator.tabulate()
+        multi_window_KPI_calculator.print_KPIs(output_data_dir, f"dataset_KPIs_{todays_date}")
+    else: 
+        KPI_calculator = KPICalculator(df, args.percentile_backend, args.sketch_k)
+        KPI_calculator.tabulate_orphan_authorizes()
+        KPI_calculator.tabulate_orphan_request_starts()
+        KPI_calculator.tabulate_transactional_values()
+        if args.breakdown: 
+            site_map = None if args.site_map is None else load_site_map(args.site_map)
+            breakdown_df = KPI_calculator.tabulate_breakdown(site_map)
+            breakdown_df.to_csv(os.path.join(output_data_dir, f"dataset_KPIs_{todays_date}_breakdown.csv"), index=False)
+        if args.rollup_state is not None: 
+            KPI_calculator.roll_up(args.rollup_state, pd.Timedelta(hours=args.settle_after))
+        KPI_calculator.print_KPIs(os.path.join(output_data_dir, f"dataset_KPIs_{todays_date}.xlsx"))
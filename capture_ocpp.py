@@ -0,0 +1,223 @@
+# Copyright 2025, Battelle Energy Alliance, LLC, ALL RIGHTS RESERVED
+
+from __future__ import annotations
+
+import os
+import time
+import signal
+import asyncio
+import argparse
+import contextlib
+import typing
+
+import pandas as pd
+
+import reader
+import follow_logs
+
+from kpi_calculator.capture import ocpp_proxy, simulator
+from kpi_calculator.log_parser.ocpp_2_0_1 import action_filter, parser
+from kpi_calculator.utils import json_ops, quantiles
+
+KPI_CALC_REPO_PATH = 'insert/path/to/repo/here'
+
+SINKS = ['cleaned', 'live']
+DEFAULT_HOST = '0.0.0.0'
+DEFAULT_PORT = 9000
+SIMULATION_HOST = '127.0.0.1'
+
+
+class StationMap:
+
+    def __init__(self, station_map_file: str, append: bool = False):
+        # charging station identities are numbered as device IDs in the order they are first recorded. The map
+        # is written out as stations show up, and with append a capture picks up the numbering where it stopped
+        self._station_map_file = station_map_file
+        self._device_IDs = {}
+        if append and os.path.exists(station_map_file):
+            station_map_df = pd.read_csv(station_map_file, dtype={'station_ID': str})
+            self._device_IDs = dict(zip(station_map_df['station_ID'], station_map_df['device_ID']))
+            return
+        with open(station_map_file, 'w', encoding='utf-8') as outfile:
+            outfile.write('device_ID,station_ID\n')
+
+    def device_ID(self, station_ID: str) -> int:
+        if station_ID not in self._device_IDs:
+            self._device_IDs[station_ID] = len(self._device_IDs)
+            with open(self._station_map_file, 'a', encoding='utf-8') as outfile:
+                outfile.write(f"{self._device_IDs[station_ID]},{station_ID}\n")
+        return self._device_IDs[station_ID]
+
+class RecordFilter:
+
+    def __init__(self, filter_actions: bool):
+        # the same action filter as reader.py, kept per station since a CALLRESULT is matched to its station's CALL
+        self._filter_actions = filter_actions
+        self._message_filters = {}
+
+    def keep(self, device_ID: int, message: str) -> bool:
+        if not self._filter_actions:
+            return True
+        if device_ID not in self._message_filters:
+            self._message_filters[device_ID] = action_filter.ActionFilter()
+        return self._message_filters[device_ID].keep(message)
+
+class CleanedLogSink:
+
+    def __init__(self, output_file_path: str, station_map: StationMap, filter_actions: bool = False,
+                 append: bool = False, flush_size: int = parser.DEFAULT_FLUSH_SIZE):
+        # records are written as the device_ID,message,timestamp lines reader.py writes, so the cleaned log goes
+        # through split_data_into_charger_files.py and parse_messages.py unchanged
+        if not append or not os.path.exists(output_file_path):
+            reader.create_log(output_file_path)
+        self._station_map = station_map
+        self._record_filter = RecordFilter(filter_actions)
+        self._writer = parser.ParsedLogWriter(output_file_path, flush_size)
+
+    def write_batch(self, records: list[ocpp_proxy.CaptureRecord]) -> None:
+        for record in records:
+            device_ID = self._station_map.device_ID(record.station_ID)
+            if self._record_filter.keep(device_ID, record.message):
+                self._writer.write(record.message, device_ID, record.timestamp)
+        # every batch is on disk before the next is taken, so the log can be read while the capture runs
+        self._writer.flush()
+
+    def close(self, finish: bool = False) -> None:
+        self._writer.close()
+
+class LiveKPISink:
+
+    def __init__(self, tracker: follow_logs.LiveKPITracker, output_xlsx_file: str, station_map: StationMap,
+                 filter_actions: bool = False, report_seconds: float = follow_logs.DEFAULT_REPORT_SECONDS):
+        # records go straight into the running KPIs of follow_logs.py, nothing but the KPI workbook is written
+        self._tracker = tracker
+        self._output_xlsx_file = output_xlsx_file
+        self._station_map = station_map
+        self._record_filter = RecordFilter(filter_actions)
+        self._report_seconds = report_seconds
+        self._last_report_time = time.monotonic()
+
+    def write_batch(self, records: list[ocpp_proxy.CaptureRecord]) -> None:
+        device_messages = {}
+        for record in records:
+            device_ID = self._station_map.device_ID(record.station_ID)
+            if self._record_filter.keep(device_ID, record.message):
+                messages, dates = device_messages.setdefault(device_ID, ([], []))
+                messages.append(record.message)
+                dates.append(record.timestamp)
+        for device_ID, (messages, dates) in device_messages.items():
+            self._tracker.add_messages(device_ID, messages, dates)
+        self._tracker.update()
+        if time.monotonic() - self._last_report_time >= self._report_seconds:
+            follow_logs.write_report(self._tracker.interim_KPIs, self._output_xlsx_file)
+            print(f"{self._tracker.in_flight_messages()} messages in flight, KPIs written to {self._output_xlsx_file}")
+            self._last_report_time = time.monotonic()
+
+    def close(self, finish: bool = False) -> None:
+        # with finish, every transaction still in flight is counted as it is
+        if finish:
+            self._tracker.finish()
+        follow_logs.write_report(self._tracker.interim_KPIs, self._output_xlsx_file)
+
+def stop_on_signals() -> asyncio.Event:
+    # SIGINT and SIGTERM stop the capture after what was received is written (where the loop supports it)
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for signal_number in [signal.SIGINT, signal.SIGTERM]:
+        with contextlib.suppress(NotImplementedError):
+            loop.add_signal_handler(signal_number, stop.set)
+    return stop
+
+async def capture(proxy: ocpp_proxy.CaptureProxy, host: str, port: int,
+                  write_batch: typing.Callable[[list[ocpp_proxy.CaptureRecord]], None],
+                  batch_size: int = ocpp_proxy.DEFAULT_BATCH_SIZE,
+                  until: typing.Awaitable | None = None) -> None:
+    # serves stations until the awaitable is done (or until stopped by a signal without one), then writes
+    # every record still queued. A failing write stops the capture rather than leaving the relays blocked
+    consumer = asyncio.create_task(ocpp_proxy.consume_records(proxy.records, write_batch, batch_size))
+    async with proxy.serve(host, port):
+        serving = asyncio.ensure_future(stop_on_signals().wait() if until is None else until)
+        await asyncio.wait([serving, consumer], return_when=asyncio.FIRST_COMPLETED)
+        if consumer.done():
+            serving.cancel()
+            consumer.result()
+        serving.result()
+    # a write failing while the queue drains ends the wait as well, since join() would never return
+    draining = asyncio.ensure_future(proxy.records.join())
+    await asyncio.wait([draining, consumer], return_when=asyncio.FIRST_COMPLETED)
+    if consumer.done():
+        draining.cancel()
+        consumer.result()
+    consumer.cancel()
+
+async def simulate_capture(port: int, write_batch: typing.Callable[[list[ocpp_proxy.CaptureRecord]], None],
+                           queue_size: int = ocpp_proxy.DEFAULT_QUEUE_SIZE,
+                           batch_size: int = ocpp_proxy.DEFAULT_BATCH_SIZE, stations: int = 2,
+                           sessions: int = 3) -> None:
+    # a simulated CSMS on a free local port and simulated stations that run their sessions through the proxy
+    async with simulator.SimulatedCSMS().serve(SIMULATION_HOST, 0) as csms:
+        csms_port = csms.sockets[0].getsockname()[1]
+        proxy = ocpp_proxy.CaptureProxy(f"ws://{SIMULATION_HOST}:{csms_port}", queue_size)
+        await capture(proxy, SIMULATION_HOST, port, write_batch, batch_size,
+                      until=simulator.simulate(f"ws://{SIMULATION_HOST}:{port}", stations, sessions))
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(prog='interim-kpi-capture')
+    arg_parser.add_argument('--upstream_url',
+                            help='websocket URL of the CSMS the charging stations are relayed to (e.g. ws://csms:9000/ocpp), '
+                                 'each station is connected to <upstream_url>/<station ID>')
+    arg_parser.add_argument('--host', default=DEFAULT_HOST, help='address the charging stations connect to')
+    arg_parser.add_argument('--port', type=int, default=DEFAULT_PORT, help='port the charging stations connect to')
+    arg_parser.add_argument('--sink', choices=SINKS, default='cleaned',
+                            help='write the captured messages to the cleaned log, or count them straight into live KPIs')
+    arg_parser.add_argument('--append', action='store_true',
+                            help='add to the cleaned log and station map of an earlier capture instead of starting them over')
+    arg_parser.add_argument('--filter_actions', action='store_true',
+                            help='only keep the CALLs and CALLRESULTs that can affect the KPIs')
+    arg_parser.add_argument('--queue_size', type=int, default=ocpp_proxy.DEFAULT_QUEUE_SIZE,
+                            help='number of captured messages held before relaying waits for them to be written')
+    arg_parser.add_argument('--batch_size', type=int, default=ocpp_proxy.DEFAULT_BATCH_SIZE,
+                            help='largest number of captured messages written at a time')
+    arg_parser.add_argument('--simulate', type=int, metavar='STATIONS',
+                            help='capture this many simulated charging stations and a simulated CSMS on this machine, then exit')
+    arg_parser.add_argument('--sessions', type=int, default=3,
+                            help='number of charging sessions each simulated charging station runs')
+    arg_parser.add_argument('--transaction_timeout', type=float, default=follow_logs.DEFAULT_TRANSACTION_TIMEOUT_HOURS,
+                            help='live sink: hours without an event after which a transaction that has not ended is counted as it is')
+    arg_parser.add_argument('--report_seconds', type=float, default=follow_logs.DEFAULT_REPORT_SECONDS,
+                            help='live sink: seconds between writes of the KPI workbook')
+    arg_parser.add_argument('--percentile_backend', choices=quantiles.QUANTILE_BACKENDS, default='kll',
+                            help='live sink: keep a mergeable KLL sketch of the charge start times in bounded memory, or every one of them')
+    arg_parser.add_argument('--sketch_k', type=int, default=quantiles.DEFAULT_SKETCH_K,
+                            help='live sink: size of the KLL sketch, larger sketches give more accurate percentiles')
+    arg_parser.add_argument('--json_backend', choices=json_ops.JSON_BACKENDS, default='auto',
+                            help='live sink: JSON decoder for the OCPP messages, auto uses orjson or pysimdjson when installed and the standard library otherwise')
+    args = arg_parser.parse_args()
+    if (args.upstream_url is None) == (args.simulate is None):
+        arg_parser.error('give either --upstream_url or --simulate')
+    if args.simulate is not None and args.simulate < 1:
+        arg_parser.error(f"Number of simulated stations ({args.simulate}) must be at least 1")
+
+    data_dir = KPI_CALC_REPO_PATH + '/interim-kpi-calculator/data'
+    station_map = StationMap(os.path.join(data_dir, 'station_map.csv'), args.append)
+    if args.sink == 'cleaned':
+        sink = CleanedLogSink(os.path.join(data_dir, 'cleaned_logs', 'cleaned_format.csv'), station_map,
+                              args.filter_actions, args.append)
+    else:
+        output_data_dir = os.path.join(data_dir, 'KPIs')
+        if not os.path.exists(output_data_dir):
+            os.mkdir(output_data_dir)
+        tracker = follow_logs.LiveKPITracker(args.percentile_backend, args.sketch_k,
+                                             pd.Timedelta(hours=args.transaction_timeout), args.json_backend)
+        sink = LiveKPISink(tracker, os.path.join(output_data_dir, 'live_KPIs.xlsx'), station_map, args.filter_actions,
+                           args.report_seconds)
+    try:
+        if args.simulate is not None:
+            asyncio.run(simulate_capture(args.port, sink.write_batch, args.queue_size, args.batch_size, args.simulate,
+                                         args.sessions))
+        else:
+            asyncio.run(capture(ocpp_proxy.CaptureProxy(args.upstream_url, args.queue_size), args.host, args.port,
+                                sink.write_batch, args.batch_size))
+    finally:
+        # a simulation has run to its end, so its transactions still in flight are counted like follow_logs.py --once
+        sink.close(finish=args.simulate is not None)
@@ -0,0 +1,306 @@
+# Copyright 2025, Battelle Energy Alliance, LLC, ALL RIGHTS RESERVED
+
+from __future__ import annotations
+
+import os
+import time
+import argparse
+import warnings
+
+import numpy as np
+import pandas as pd
+
+import calculator
+import parse_messages
+
+from kpi_calculator.log_parser.ocpp_2_0_1 import action_filter, parser, transaction_parser
+from kpi_calculator.log_parser.ocpp_2_0_1.standard import STANDARD_ERROR, identify_standard, registered_standard
+from kpi_calculator.log_parser.ocpp_2_0_1.status_event import code
+from kpi_calculator.utils import file_ops, json_ops, log_tail, quantiles, time_ops
+
+KPI_CALC_REPO_PATH = 'insert/path/to/repo/here'
+
+DEFAULT_TRANSACTION_TIMEOUT_HOURS = 24
+DEFAULT_POLL_SECONDS = 1.0
+DEFAULT_REPORT_SECONDS = 60.0
+# an Authorize is matched to a transaction that starts up to this long after it
+SETTLE_TIME = pd.Timedelta(seconds=parse_messages.AUTHORIZE_TIME_THRESHOLD_SECONDS)
+UNKNOWN_STANDARD_WARNING = 'is skipped: ' + STANDARD_ERROR
+
+
+class LiveDevice:
+
+    def __init__(self, device_ID: int):
+        # the raw messages of this device that can still change a KPI: every message of a transaction that has
+        # not been counted or had an event within the last SETTLE_TIME, the other half of their CALLs and
+        # CALLRESULTs, and the last SETTLE_TIME of everything else. All older messages are evicted
+        self.device_ID = device_ID
+        self.last_timestamp = None
+        self.changed = False
+        # nothing the device holds changes until the clock passes the first of these, unless messages are added
+        self._timeout_deadline = pd.Timestamp.max
+        self._eviction_deadline = pd.Timestamp.max
+        self._messages = []
+        self._dates = []
+        self._row_timestamps = np.array([], dtype='datetime64[ns]')
+        self._counted_transaction_IDs = set()
+
+    def __len__(self) -> int:
+        return len(self._messages)
+
+    def add_messages(self, messages: list[str], dates: list[str]) -> None:
+        if len(messages) == 0:
+            return
+        timestamps = time_ops.parse_timestamps(dates).to_numpy(dtype='datetime64[ns]')
+        if not np.isnat(timestamps).all():
+            latest_timestamp = pd.Timestamp(np.nanmax(timestamps))
+            if self.last_timestamp is None or latest_timestamp > self.last_timestamp:
+                self.last_timestamp = latest_timestamp
+        # messages without a timestamp are evicted as if they were logged at the device's latest timestamp
+        fallback_timestamp = np.datetime64('NaT') if self.last_timestamp is None else self.last_timestamp.to_datetime64()
+        self._messages.extend(messages)
+        self._dates.extend(dates)
+        self._row_timestamps = np.concatenate([self._row_timestamps, np.where(np.isnat(timestamps), fallback_timestamp,
+                                                                              timestamps)])
+        self.changed = True
+
+    def needs_update(self, clock: pd.Timestamp) -> bool:
+        # the messages are only parsed again when they changed, a transaction timed out or a message is due to be
+        # evicted, not on every poll
+        if self.changed:
+            return True
+        if len(self._messages) == 0:
+            return False
+        device_clock = clock if self.last_timestamp is None else min(clock, self.last_timestamp)
+        return clock > self._timeout_deadline or device_clock > self._eviction_deadline
+
+    def update(self, clock: pd.Timestamp, transaction_timeout: pd.Timedelta, interim_KPIs: calculator.InterimKPIs,
+               decoder: json_ops.JSONDecoder, project: bool = False, finish: bool = False) -> None:
+        # the in-flight messages are parsed like a split device log. Transactions that ended, or had no event for
+        # transaction_timeout by the clock, are counted once. Their messages are evicted SETTLE_TIME after their
+        # last event by the device's own clock, so messages that arrive late for the others are still matched
+        self.changed = False
+        if len(self._messages) == 0:
+            return
+        raw_df = pd.DataFrame({'device_ID': self.device_ID, 'message': self._messages, 'timestamp': self._dates})
+        parsed_df = parse_messages.parse_device_log(raw_df, decoder, project, keep_row_index=True)
+        parsed_df = parsed_df.drop_duplicates(subset=calculator.DUPLICATE_COLUMNS, keep='first')
+        transaction_IDs = parsed_df['transaction_ID']
+        transaction_df = parsed_df[transaction_IDs.notna().to_numpy(dtype=bool) &
+                                   ~transaction_IDs.isin(calculator.ORPHAN_TRANSACTION_IDS).to_numpy(dtype=bool)]
+        last_timestamps = transaction_df.groupby('transaction_ID', sort=False)['timestamp'].max()
+        last_timestamps = last_timestamps[last_timestamps.notna()]
+        has_ended = (transaction_df['event_code'] == code.ENDED).groupby(transaction_df['transaction_ID'], sort=False).any()
+        is_finished = has_ended.reindex(last_timestamps.index, fill_value=False) | \
+                      (last_timestamps < clock - transaction_timeout)
+        finished_transaction_IDs = [transaction_ID for transaction_ID in last_timestamps.index[is_finished.to_numpy(dtype=bool)]
+                                    if transaction_ID not in self._counted_transaction_IDs]
+        if len(finished_transaction_IDs) > 0:
+            interim_KPIs.add_finished_transaction_summaries(transaction_parser.summarize_transactions(
+                transaction_df[transaction_df['transaction_ID'].isin(finished_transaction_IDs)]))
+            self._counted_transaction_IDs.update(finished_transaction_IDs)
+        in_flight_last_timestamps = last_timestamps[~is_finished.to_numpy(dtype=bool) &
+                                                    ~last_timestamps.index.isin(list(self._counted_transaction_IDs))]
+        self._timeout_deadline = pd.Timestamp.max if len(in_flight_last_timestamps) == 0 else \
+                                 in_flight_last_timestamps.min() + transaction_timeout
+        device_clock = clock if self.last_timestamp is None else min(clock, self.last_timestamp)
+        horizon = pd.Timestamp.max if finish else device_clock - SETTLE_TIME
+        self._evict(horizon, raw_df, parsed_df, transaction_df, last_timestamps, interim_KPIs)
+
+    def _evict(self, horizon: pd.Timestamp, raw_df: pd.DataFrame, parsed_df: pd.DataFrame, transaction_df: pd.DataFrame,
+               last_timestamps: pd.Series, interim_KPIs: calculator.InterimKPIs) -> None:
+        kept_transaction_IDs = [transaction_ID for transaction_ID, last_timestamp in last_timestamps.items()
+                                if transaction_ID not in self._counted_transaction_IDs or last_timestamp >= horizon]
+        keep = self._row_timestamps >= horizon.to_datetime64()
+        # the rows kept for their own timestamp and the counted transactions kept for their last event are 
+        # evicted SETTLE_TIME after it, the rest only go once their transaction is counted
+        eviction_timestamps = [pd.Timestamp(self._row_timestamps[keep].min())] if keep.any() else []
+        eviction_timestamps.extend(last_timestamp for transaction_ID, last_timestamp in last_timestamps.items()
+                                   if transaction_ID in self._counted_transaction_IDs and last_timestamp >= horizon)
+        self._eviction_deadline = pd.Timestamp.max if len(eviction_timestamps) == 0 else \
+                                  min(eviction_timestamps) + SETTLE_TIME
+        keep[transaction_df.index[transaction_df['transaction_ID'].isin(kept_transaction_IDs)].to_numpy()] = True
+        # a kept CALL keeps its CALLRESULT, and the other way around, so it is parsed the same way next time
+        kept_message_IDs = set(raw_df['message_ID'][keep].dropna())
+        keep |= raw_df['message_ID'].isin(kept_message_IDs).to_numpy(dtype=bool)
+        # Authorizes and RequestStartTransactions that never joined a transaction are counted as they leave,
+        # like the orphans KPICalculator counts in its window
+        evicted_df = parsed_df[~keep[parsed_df.index.to_numpy()]]
+        interim_KPIs.add_authorizes(calculator.orphan_authorizes(evicted_df))
+        interim_KPIs.add_request_starts(calculator.orphan_request_starts(evicted_df))
+        kept_positions = np.flatnonzero(keep)
+        self._messages = [self._messages[position] for position in kept_positions]
+        self._dates = [self._dates[position] for position in kept_positions]
+        self._row_timestamps = self._row_timestamps[kept_positions]
+        kept_parsed_transaction_IDs = set(parsed_df['transaction_ID'][keep[parsed_df.index.to_numpy()]].dropna())
+        self._counted_transaction_IDs &= kept_parsed_transaction_IDs
+
+class LiveKPITracker:
+
+    def __init__(self, percentile_backend: str = 'kll', sketch_k: int = quantiles.DEFAULT_SKETCH_K,
+                 transaction_timeout: pd.Timedelta = pd.Timedelta(hours=DEFAULT_TRANSACTION_TIMEOUT_HOURS),
+                 json_backend: str = 'auto', project: bool = False):
+        # running KPIs of messages that arrive device by device. Only in-flight transactions are held in memory,
+        # a finished one is counted into interim_KPIs and forgotten (the kll percentile backend keeps the charge
+        # start times bounded as well). The clock is the latest timestamp logged, not the wall clock
+        self.interim_KPIs = calculator.InterimKPIs(percentile_backend, sketch_k)
+        self._transaction_timeout = transaction_timeout
+        self._decoder = json_ops.get_decoder(json_backend)
+        self._project = project
+        self._devices = {}
+
+    def add_messages(self, device_ID: int, messages: list[str], dates: list[str]) -> None:
+        if device_ID not in self._devices:
+            self._devices[device_ID] = LiveDevice(device_ID)
+        self._devices[device_ID].add_messages(messages, dates)
+
+    def clock(self) -> pd.Timestamp | None:
+        last_timestamps = [device.last_timestamp for device in self._devices.values() if device.last_timestamp is not None]
+        return max(last_timestamps, default=None)
+
+    def update(self, catching_up_device_IDs: set[int] | None = None) -> None:
+        # a device still catching up on its backlog is only moved to its own latest timestamp, the others are
+        # moved to the latest timestamp of any device, so the transactions of a device that went quiet time out
+        clock = self.clock()
+        if clock is None:
+            return
+        for device_ID, device in self._devices.items():
+            device_clock = clock
+            if catching_up_device_IDs is not None and device_ID in catching_up_device_IDs:
+                device_clock = device.last_timestamp
+            if device_clock is None or not device.needs_update(device_clock):
+                continue
+            device.update(device_clock, self._transaction_timeout, self.interim_KPIs, self._decoder, self._project)
+
+    def finish(self) -> None:
+        # every transaction still in flight is counted as it is and every message is evicted
+        for device in self._devices.values():
+            device.update(pd.Timestamp.max, self._transaction_timeout, self.interim_KPIs, self._decoder, self._project,
+                          finish=True)
+
+    def in_flight_messages(self) -> int:
+        return sum(len(device) for device in self._devices.values())
+
+class FollowedLog:
+
+    def __init__(self, log_file_path: str, device_ID: int, preselected_standard: str | None, number_sample_lines: int,
+                 filter_actions: bool):
+        # without a preselected standard, lines are held back until the log's standard can be inferred from them.
+        # A log whose standard cannot be inferred is skipped with a warning, the other logs are still followed
+        self.log_file_path = log_file_path
+        self.device_ID = device_ID
+        self.skipped = False
+        self._number_sample_lines = number_sample_lines
+        self._sample_lines = []
+        self._line_parser = None if preselected_standard is None else parser.LineParser(preselected_standard)
+        self._message_filter = action_filter.ActionFilter() if filter_actions else None
+
+    def _identify_standard(self, lines: list[str]) -> list[str]:
+        self._sample_lines.extend(lines)
+        try:
+            line_standard = identify_standard(self._sample_lines[:self._number_sample_lines])
+        except IOError:
+            if len(self._sample_lines) >= self._number_sample_lines:
+                warnings.warn(f"{self.log_file_path} {UNKNOWN_STANDARD_WARNING}", UserWarning)
+                self.skipped = True
+                self._sample_lines = []
+            return []
+        self._line_parser = parser.LineParser(line_standard)
+        lines, self._sample_lines = self._sample_lines, []
+        return lines
+
+    def parse_lines(self, lines: list[str]) -> tuple[list[str], list[str]]:
+        if self.skipped:
+            return [], []
+        if self._line_parser is None:
+            lines = self._identify_standard(lines)
+        messages = []
+        dates = []
+        for line in lines:
+            parsed_line = self._line_parser.parse_line(line)
+            if parsed_line is None:
+                continue
+            if self._message_filter is not None and not self._message_filter.keep(parsed_line[0]):
+                continue
+            messages.append(parsed_line[0])
+            dates.append(parsed_line[1])
+        return messages, dates
+
+def write_report(interim_KPIs: calculator.InterimKPIs, output_xlsx_file: str) -> None:
+    # a dashboard reading the workbook never sees it half written
+    file_ops.write_atomically(output_xlsx_file, lambda file_path: calculator.print_interim_KPIs(interim_KPIs, file_path))
+
+def follow_logs(log_dir_path: str, output_xlsx_file: str, tracker: LiveKPITracker, preselected_standard: str | None = None,
+                number_sample_lines: int = parser.DEFAULT_NUMBER_SAMPLE_LINES, filter_actions: bool = False,
+                from_end: bool = False, poll_seconds: float = DEFAULT_POLL_SECONDS,
+                report_seconds: float = DEFAULT_REPORT_SECONDS, max_lines: int = log_tail.DEFAULT_MAX_LINES,
+                once: bool = False) -> None:
+    # device IDs are handed out in the order the logs are first seen, which for the logs already there is the
+    # directory order reader.py numbers them in. With once, the logs are read to their end, every transaction
+    # still in flight is counted and the report is written a last time
+    if preselected_standard is not None:
+        registered_standard(preselected_standard)
+    tailer = log_tail.LogTailer(log_dir_path, from_end)
+    followed_logs = {}
+    last_report_time = time.monotonic()
+    try:
+        while True:
+            catching_up_device_IDs = set()
+            for log_file_path in tailer.log_file_paths():
+                if log_file_path not in followed_logs:
+                    followed_logs[log_file_path] = FollowedLog(log_file_path, len(followed_logs), preselected_standard,
+                                                               number_sample_lines, filter_actions)
+                followed_log = followed_logs[log_file_path]
+                lines, at_end = tailer.read_lines(log_file_path, max_lines)
+                tracker.add_messages(followed_log.device_ID, *followed_log.parse_lines(lines))
+                if not at_end:
+                    catching_up_device_IDs.add(followed_log.device_ID)
+            tracker.update(catching_up_device_IDs)
+            if once and len(catching_up_device_IDs) == 0:
+                break
+            if time.monotonic() - last_report_time >= report_seconds:
+                write_report(tracker.interim_KPIs, output_xlsx_file)
+                print(f"{tracker.in_flight_messages()} messages in flight, KPIs written to {output_xlsx_file}")
+                last_report_time = time.monotonic()
+            if len(catching_up_device_IDs) == 0:
+                time.sleep(poll_seconds)
+    except KeyboardInterrupt:
+        pass
+    if once:
+        tracker.finish()
+    write_report(tracker.interim_KPIs, output_xlsx_file)
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(prog='interim-kpi-follower')
+    arg_parser.add_argument('--standard', help='registered log standard to use for every file instead of inferring it per file (e.g. explicit or verbose)')
+    arg_parser.add_argument('--filter_actions', action='store_true',
+                            help='only keep the CALLs and CALLRESULTs that can affect the KPIs')
+    arg_parser.add_argument('--from_end', action='store_true',
+                            help='skip what the logs already hold and only follow what is appended to them from now on')
+    arg_parser.add_argument('--once', action='store_true',
+                            help='read the logs to their end, count every transaction still in flight and exit')
+    arg_parser.add_argument('--transaction_timeout', type=float, default=DEFAULT_TRANSACTION_TIMEOUT_HOURS,
+                            help='hours without an event after which a transaction that has not ended is counted as it is')
+    arg_parser.add_argument('--poll_seconds', type=float, default=DEFAULT_POLL_SECONDS,
+                            help='seconds between checks of the logs for new lines')
+    arg_parser.add_argument('--report_seconds', type=float, default=DEFAULT_REPORT_SECONDS,
+                            help='seconds between writes of the KPI workbook')
+    arg_parser.add_argument('--max_lines', type=int, default=log_tail.DEFAULT_MAX_LINES,
+                            help='number of lines read from a log at a time, which bounds memory while catching up on a backlog')
+    arg_parser.add_argument('--percentile_backend', choices=quantiles.QUANTILE_BACKENDS, default='kll',
+                            help='keep a mergeable KLL sketch of the charge start times in bounded memory, or every one of them')
+    arg_parser.add_argument('--sketch_k', type=int, default=quantiles.DEFAULT_SKETCH_K,
+                            help='size of the KLL sketch, larger sketches give more accurate percentiles')
+    arg_parser.add_argument('--json_backend', choices=json_ops.JSON_BACKENDS, default='auto',
+                            help='JSON decoder for the OCPP messages, auto uses orjson or pysimdjson when installed and the standard library otherwise')
+    args = arg_parser.parse_args()
+
+    log_dir_path = KPI_CALC_REPO_PATH + '/interim-kpi-calculator/data/raw_ocpp_logs'
+    output_data_dir = KPI_CALC_REPO_PATH + '/interim-kpi-calculator/data/KPIs'
+    if not os.path.exists(output_data_dir):
+        os.mkdir(output_data_dir)
+    tracker = LiveKPITracker(args.percentile_backend, args.sketch_k, pd.Timedelta(hours=args.transaction_timeout),
+                             args.json_backend)
+    follow_logs(log_dir_path, os.path.join(output_data_dir, 'live_KPIs.xlsx'), tracker, args.standard,
+                filter_actions=args.filter_actions, from_end=args.from_end, poll_seconds=args.poll_seconds,
+                report_seconds=args.report_seconds, max_lines=args.max_lines, once=args.once)
@@ -0,0 +1,115 @@
+# Copyright 2025, Battelle Energy Alliance, LLC, ALL RIGHTS RESERVED
+
+from __future__ import annotations
+
+import json
+import asyncio
+import typing
+
+from dataclasses import dataclass
+from datetime import datetime, timezone
+
+from kpi_calculator.log_parser.ocpp_2_0_1 import message as message_structure
+
+OCPP_SUBPROTOCOL = 'ocpp2.0.1'
+RECORDED_MESSAGE_TYPE_IDS = [message_structure.CALL_MESSAGE_TYPE_ID, message_structure.CALLRESULT_MESSAGE_TYPE_ID]
+DEFAULT_QUEUE_SIZE = 10000
+DEFAULT_BATCH_SIZE = 1000
+# receive timestamps are written in UTC like the 'Z' timestamps of the logs
+CAPTURE_DATE_FORMAT = '%Y-%m-%dT%H:%M:%S.%fZ'
+
+
+def import_websockets() -> tuple[typing.Any, typing.Any, typing.Any]:
+    try:
+        import websockets.asyncio.client
+        import websockets.asyncio.server
+        import websockets.exceptions
+    except ImportError as error:
+        raise ImportError("Capturing OCPP traffic requires the websockets package, version 15 or later "
+                          "(pip install websockets)") from error
+    return websockets.asyncio.server, websockets.asyncio.client, websockets.exceptions
+
+@dataclass
+class CaptureRecord:
+
+    station_ID: str
+    message: str
+    timestamp: str
+
+def receive_timestamp() -> str:
+    return datetime.now(timezone.utc).strftime(CAPTURE_DATE_FORMAT)
+
+def station_ID_from_path(path: str) -> str | None:
+    # OCPP-J puts the charging station's identity in the last segment of the connection URL
+    station_ID = path.split('?')[0].rstrip('/').rsplit('/', 1)[-1]
+    return station_ID if station_ID else None
+
+def recorded_message(frame: str | bytes) -> str | None:
+    # the frame as one line of text when it is a CALL or a CALLRESULT, None for CALLERRORs and anything else
+    if isinstance(frame, bytes):
+        frame = frame.decode('utf-8', errors='replace')
+    try:
+        message = json.loads(frame)
+    except ValueError:
+        return None
+    if type(message) is not list or len(message) < 3 or message[0] not in RECORDED_MESSAGE_TYPE_IDS:
+        return None
+    # JSON allows line breaks between values, the cleaned log holds one message per line
+    return frame.replace('\r', ' ').replace('\n', ' ')
+
+class CaptureProxy:
+
+    def __init__(self, upstream_url: str, queue_size: int = DEFAULT_QUEUE_SIZE):
+        # relays every charging station that connects to the CSMS at upstream_url/<station ID> and records the
+        # CALLs and CALLRESULTs going either way as they are received. Records go through a bounded queue: when
+        # the consumer falls behind, relaying waits for room in the queue instead of buffering without limit
+        if queue_size < 1:
+            raise ValueError(f"Queue size ({queue_size}) must be at least 1")
+        self._server_module, self._client_module, self._exceptions_module = import_websockets()
+        self._upstream_url = upstream_url.rstrip('/')
+        self.records = asyncio.Queue(maxsize=queue_size)
+
+    async def _relay(self, source: typing.Any, destination: typing.Any, station_ID: str) -> None:
+        # a frame is recorded before it is passed on, so a CALL is always recorded before its CALLRESULT
+        try:
+            async for frame in source:
+                message = recorded_message(frame)
+                if message is not None:
+                    await self.records.put(CaptureRecord(station_ID, message, receive_timestamp()))
+                await destination.send(frame)
+        except self._exceptions_module.ConnectionClosed:
+            return
+
+    async def handle_station(self, station_connection: typing.Any) -> None:
+        station_ID = station_ID_from_path(station_connection.request.path)
+        if station_ID is None:
+            await station_connection.close(code=1008, reason='No charging station identity in the URL')
+            return
+        subprotocols = [station_connection.subprotocol] if station_connection.subprotocol else None
+        async with self._client_module.connect(f"{self._upstream_url}/{station_ID}", subprotocols=subprotocols,
+                                               proxy=None) as csms_connection:
+            relays = [asyncio.create_task(self._relay(station_connection, csms_connection, station_ID)),
+                      asyncio.create_task(self._relay(csms_connection, station_connection, station_ID))]
+            # either side closing ends the session on both
+            done, pending = await asyncio.wait(relays, return_when=asyncio.FIRST_COMPLETED)
+            for relay in pending:
+                relay.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+        await station_connection.close()
+
+    def serve(self, host: str, port: int) -> typing.Any:
+        # an async context manager of the listening server, as returned by websockets' serve
+        return self._server_module.serve(self.handle_station, host, port, subprotocols=[OCPP_SUBPROTOCOL])
+
+async def consume_records(records: asyncio.Queue, write_batch: typing.Callable[[list[CaptureRecord]], None],
+                          batch_size: int = DEFAULT_BATCH_SIZE) -> None:
+    # records are handed to write_batch in the order they were received, up to batch_size at a time. The batch is
+    # written in a worker thread so the relays keep running, and only marked done once it is written, so
+    # records.join() returns when everything received so far is written
+    while True:
+        batch = [await records.get()]
+        while len(batch) < batch_size and not records.empty():
+            batch.append(records.get_nowait())
+        await asyncio.to_thread(write_batch, batch)
+        for _ in batch:
+            records.task_done()
@@ -0,0 +1,159 @@
+# Copyright 2025, Battelle Energy Alliance, LLC, ALL RIGHTS RESERVED
+
+from __future__ import annotations
+
+import json
+import uuid
+import random
+import asyncio
+import typing
+
+from datetime import datetime, timezone
+
+from kpi_calculator.capture.ocpp_proxy import OCPP_SUBPROTOCOL, import_websockets
+from kpi_calculator.log_parser.ocpp_2_0_1 import message as message_structure
+from kpi_calculator.log_parser.ocpp_2_0_1.status_event import code, type as event_type
+
+# a local CSMS and charging stations that run charging sessions against it, for trying the capture proxy
+# without real hardware. Every session is one of the ways the KPIs tell transactions apart: authorized after
+# plug-in, before plug-in, or started remotely by the CSMS
+SESSION_KINDS = ['post_plugin', 'pre_plugin']
+
+
+def call(action: str, payload: dict) -> tuple[str, str]:
+    message_ID = str(uuid.uuid4())
+    return message_ID, json.dumps([message_structure.CALL_MESSAGE_TYPE_ID, message_ID, action, payload])
+
+def call_result(message_ID: str, payload: dict) -> str:
+    return json.dumps([message_structure.CALLRESULT_MESSAGE_TYPE_ID, message_ID, payload])
+
+def id_token(token_type: str) -> dict:
+    # sessions follow each other within seconds, so every one has its own token for its Authorize to be bound to
+    return {'idToken': uuid.uuid4().hex[:8].upper(), 'type': token_type}
+
+def now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+class SimulatedCSMS:
+
+    def __init__(self, request_start_probability: float = 0.5, seed: int = 0):
+        # answers every CALL a station sends, and now and then asks a station that has just become available to
+        # start its next session remotely
+        self._server_module, _, self._exceptions_module = import_websockets()
+        self._request_start_probability = request_start_probability
+        self._random = random.Random(seed)
+
+    def _result_payload(self, action: str, payload: dict) -> dict:
+        if action == 'BootNotification':
+            return {'currentTime': now(), 'interval': 300, 'status': 'Accepted'}
+        if action == 'Heartbeat':
+            return {'currentTime': now()}
+        if action == event_type.AUTHORIZE_RESPONSE:
+            return {'idTokenInfo': {'status': code.ACCEPTED}}
+        if action == event_type.TRANSACTION_EVENT_REQUEST and payload.get('triggerReason') == 'Authorized':
+            return {'idTokenInfo': {'status': code.ACCEPTED}}
+        return {}
+
+    async def handle_station(self, connection: typing.Any) -> None:
+        try:
+            async for frame in connection:
+                message = json.loads(frame)
+                if message[0] != message_structure.CALL_MESSAGE_TYPE_ID:
+                    continue
+                _, message_ID, action, payload = message
+                await connection.send(call_result(message_ID, self._result_payload(action, payload)))
+                is_available = action == 'BootNotification' or payload.get('connectorStatus') == code.AVAILABLE
+                if is_available and self._random.random() < self._request_start_probability:
+                    _, request = call(event_type.REQUEST_START_TRANSACTION_RESPONSE,
+                                      {'idToken': id_token('Central'), 'remoteStartId': self._random.randint(1, 1000)})
+                    await connection.send(request)
+        except self._exceptions_module.ConnectionClosed:
+            return
+
+    def serve(self, host: str, port: int) -> typing.Any:
+        return self._server_module.serve(self.handle_station, host, port, subprotocols=[OCPP_SUBPROTOCOL])
+
+class SimulatedStation:
+
+    def __init__(self, station_ID: str, sessions: int = 3, step_seconds: float = 0.01, seed: int = 0):
+        self.station_ID = station_ID
+        self._sessions = sessions
+        self._step_seconds = step_seconds
+        self._random = random.Random(seed)
+        _, self._client_module, _ = import_websockets()
+        self._connection = None
+        self._results = {}
+        self._remote_start = None
+
+    async def _receive(self) -> None:
+        # CALLRESULTs are handed to the CALL waiting on them; a RequestStartTransaction is accepted and
+        # answered with the transaction it starts
+        async for frame in self._connection:
+            message = json.loads(frame)
+            if message[0] == message_structure.CALLRESULT_MESSAGE_TYPE_ID and message[1] in self._results:
+                self._results.pop(message[1]).set_result(message[2])
+            elif message[0] == message_structure.CALL_MESSAGE_TYPE_ID and \
+                 message[2] == event_type.REQUEST_START_TRANSACTION_RESPONSE:
+                transaction_ID = str(uuid.uuid4())
+                self._remote_start = (transaction_ID, message[3]['idToken'])
+                await self._connection.send(call_result(message[1], {'status': code.ACCEPTED,
+                                                                     'transactionId': transaction_ID}))
+
+    async def _call(self, action: str, payload: dict) -> dict:
+        message_ID, request = call(action, payload)
+        self._results[message_ID] = asyncio.get_running_loop().create_future()
+        await self._connection.send(request)
+        result = await self._results[message_ID]
+        await asyncio.sleep(self._step_seconds)
+        return result
+
+    async def _transaction_event(self, event: str, trigger_reason: str, transaction_info: dict,
+                                 token: dict | None = None) -> None:
+        payload = {'eventType': event, 'timestamp': now(), 'triggerReason': trigger_reason, 'seqNo': 0,
+                   'transactionInfo': transaction_info}
+        if token is not None:
+            payload['idToken'] = token
+        await self._call(event_type.TRANSACTION_EVENT_REQUEST, payload)
+
+    async def _status(self, connector_status: str) -> None:
+        await self._call(event_type.STATUS_NOTIFICATION_REQUEST, {'timestamp': now(), 'connectorStatus': connector_status,
+                                                                  'evseId': 1, 'connectorId': 1})
+
+    async def _session(self, kind: str) -> None:
+        transaction_ID = str(uuid.uuid4())
+        session_id_token = id_token('ISO14443')
+        if kind == 'request_start':
+            (transaction_ID, session_id_token), self._remote_start = self._remote_start, None
+        await self._status(code.OCCUPIED)
+        if kind == 'post_plugin':
+            # the token is on the Started event as well, which is what the Authorize that follows is bound to
+            await self._transaction_event(code.STARTED, code.CABLE_PLUGGED_IN, {'transactionId': transaction_ID},
+                                          session_id_token)
+            await self._call(event_type.AUTHORIZE_RESPONSE, {'idToken': session_id_token})
+        else:
+            if kind == 'pre_plugin':
+                await self._call(event_type.AUTHORIZE_RESPONSE, {'idToken': session_id_token})
+            await self._transaction_event(code.STARTED, 'Authorized', {'transactionId': transaction_ID}, session_id_token)
+        await self._transaction_event('Updated', code.CHARGING_STATE_CHANGED,
+                                      {'transactionId': transaction_ID, 'chargingState': code.CHARGING})
+        stopped_reason = self._random.choice([code.LOCAL, code.REMOTE, code.ENERGY_LIMIT_REACHED, 'PowerLoss'])
+        await self._transaction_event(code.ENDED, stopped_reason, {'transactionId': transaction_ID,
+                                                                   'stoppedReason': stopped_reason})
+        await self._status(code.AVAILABLE)
+
+    async def run(self, url: str) -> None:
+        async with self._client_module.connect(f"{url.rstrip('/')}/{self.station_ID}", subprotocols=[OCPP_SUBPROTOCOL],
+                                               proxy=None) as self._connection:
+            receiver = asyncio.create_task(self._receive())
+            await self._call('BootNotification', {'reason': 'PowerUp',
+                                                  'chargingStation': {'model': 'Simulated', 'vendorName': 'Simulated'}})
+            for _ in range(self._sessions):
+                # a remote start the station accepted is the session it runs next
+                await self._session('request_start' if self._remote_start is not None else
+                                    self._random.choice(SESSION_KINDS))
+            receiver.cancel()
+
+async def simulate(proxy_url: str, stations: int = 2, sessions: int = 3, step_seconds: float = 0.01) -> None:
+    # every station runs its sessions through the proxy at proxy_url at the same time
+    await asyncio.gather(*(SimulatedStation(f"SIM{station:03d}", sessions, step_seconds, seed=station).run(proxy_url)
+                           for station in range(stations)))
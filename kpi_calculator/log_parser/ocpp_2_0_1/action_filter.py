@@ -0,0 +1,60 @@
+# Copyright 2025, Battelle Energy Alliance, LLC, ALL RIGHTS RESERVED
+
+from __future__ import annotations
+
+import re
+
+from kpi_calculator.log_parser.ocpp_2_0_1 import message as message_structure
+from kpi_calculator.log_parser.ocpp_2_0_1.status_event import type as event_type
+
+# [<message type ID>, "<message ID>"(, "<action>")
+MESSAGE_HEADER_PATTERN = re.compile(r'\[\s*(\d+)\s*,\s*"((?:[^"\\]|\\.)*)"\s*(?:,\s*"((?:[^"\\]|\\.)*)")?')
+
+KPI_ACTIONS = event_type.GENERAL_EVENT_TYPES + [event_type.METER_VALUES]
+# actions whose CALLRESULT is looked up when the messages are parsed
+RESPONSE_ACTIONS = [event_type.AUTHORIZE_RESPONSE, event_type.REQUEST_START_TRANSACTION_RESPONSE]
+
+
+def is_response_needed(action: str, message: str) -> bool: 
+    if action in RESPONSE_ACTIONS: 
+        return True
+    # the response to a TransactionEvent is only read for transactions started with an authorization
+    return action == event_type.TRANSACTION_EVENT_REQUEST and '"Authorized"' in message
+
+def is_kpi_message(header: re.Match | None, message: str) -> bool: 
+    # stateless part of the filter: drops CALLs of actions that cannot affect the KPIs, CALLERRORs
+    # and anything that is not an OCPP-J frame; every CALLRESULT is kept
+    if header is None: 
+        return False
+    message_type_ID = int(header.group(1))
+    if message_type_ID == message_structure.CALLRESULT_MESSAGE_TYPE_ID: 
+        return True
+    if message_type_ID != message_structure.CALL_MESSAGE_TYPE_ID: 
+        return False
+    action = header.group(3)
+    if action not in KPI_ACTIONS: 
+        return False
+    if action == event_type.METER_VALUES and '"chargingState"' not in message: 
+        return False
+    return True
+
+def prefilter(message: str) -> bool: 
+    return is_kpi_message(MESSAGE_HEADER_PATTERN.match(message), message)
+
+class ActionFilter: 
+    
+    def __init__(self): 
+        self._response_needed_message_IDs = set()
+        
+    def keep(self, message: str) -> bool: 
+        # a CALLRESULT is kept only when an earlier kept CALL in the same log is waiting on it 
+        # (a CALL is always sent, and logged, before its CALLRESULT)
+        header = MESSAGE_HEADER_PATTERN.match(message)
+        if not is_kpi_message(header, message): 
+            return False
+        message_ID = header.group(2)
+        if int(header.group(1)) == message_structure.CALLRESULT_MESSAGE_TYPE_ID: 
+            return message_ID in self._response_needed_message_IDs
+        if is_response_needed(header.group(3), message): 
+            self._response_needed_message_IDs.add(message_ID)
+        return True
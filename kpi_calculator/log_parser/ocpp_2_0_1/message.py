@@ -3,4 +3,7 @@
 RESPONSE_INTERIOR_MESSAGE_INDEX = 2
 EVENT_TYPE_INDEX = 2
 INTERIOR_MESSAGE_INDEX = 3
-MESSAGE_ID_INDEX = 1
\ No newline at end of file
+MESSAGE_ID_INDEX = 1
+
+CALL_MESSAGE_TYPE_ID = 2
+CALLRESULT_MESSAGE_TYPE_ID = 3
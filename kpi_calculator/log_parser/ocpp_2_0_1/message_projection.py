@@ -0,0 +1,73 @@
+# Copyright 2025, Battelle Energy Alliance, LLC, ALL RIGHTS RESERVED
+
+import typing
+
+from kpi_calculator.log_parser.ocpp_2_0_1 import message as message_structure
+from kpi_calculator.log_parser.ocpp_2_0_1.action_filter import KPI_ACTIONS, MESSAGE_HEADER_PATTERN
+from kpi_calculator.log_parser.ocpp_2_0_1.status_event import type as event_type
+from kpi_calculator.utils import json_ops
+
+# fields read from a CALL payload and from a CALLRESULT payload when the messages are parsed, 
+# a nested dict lists the fields kept inside that attribute and None keeps the whole value
+CALL_PAYLOAD_FIELDS = {
+                        'eventType' : None, 
+                        'triggerReason' : None, 
+                        'connectorStatus' : None, 
+                        'chargingState' : None, 
+                        'idToken' : {'idToken' : None}, 
+                        'transactionInfo' : {'transactionId' : None, 'stoppedReason' : None, 'chargingState' : None}
+                      }
+
+CALLRESULT_PAYLOAD_FIELDS = {
+                        'idTokenInfo' : {'status' : None}, 
+                        'status' : None, 
+                        'transactionId' : None, 
+                        'statusInfo' : {'reasonCode' : None}
+                      }
+
+RESPONSE_KEYS = ['"idTokenInfo"', '"transactionId"', '"statusInfo"']
+
+
+def project_fields(value: typing.Any, fields: dict | None) -> typing.Any: 
+    if fields is None or not json_ops.is_JSON_object(value): 
+        return json_ops.materialize(value)
+    return {field: project_fields(value[field], nested_fields) for field, nested_fields in fields.items() 
+            if field in value}
+
+def project_message(message: typing.Any) -> typing.Any: 
+    if not json_ops.is_JSON_array(message): 
+        return json_ops.materialize(message)
+    message = [message[index] for index in range(len(message))]
+    if len(message) > message_structure.INTERIOR_MESSAGE_INDEX and \
+       message[0] == message_structure.CALL_MESSAGE_TYPE_ID: 
+        message[message_structure.INTERIOR_MESSAGE_INDEX] = project_fields(
+            message[message_structure.INTERIOR_MESSAGE_INDEX], CALL_PAYLOAD_FIELDS)
+    elif len(message) > message_structure.RESPONSE_INTERIOR_MESSAGE_INDEX and \
+         message[0] == message_structure.CALLRESULT_MESSAGE_TYPE_ID: 
+        message[message_structure.RESPONSE_INTERIOR_MESSAGE_INDEX] = project_fields(
+            message[message_structure.RESPONSE_INTERIOR_MESSAGE_INDEX], CALLRESULT_PAYLOAD_FIELDS)
+    return [json_ops.materialize(value) for value in message]
+
+def skipped_message(string: str) -> list | None: 
+    # messages whose payload cannot matter are rebuilt from their header alone without being decoded: 
+    # CALLs of other actions, MeterValues without a chargingState and CALLRESULTs that are not responses
+    header = MESSAGE_HEADER_PATTERN.match(string)
+    if header is None or '\\' in header.group(0): 
+        return None
+    message_type_ID = int(header.group(1))
+    message_ID = header.group(2)
+    action = header.group(3)
+    if message_type_ID == message_structure.CALL_MESSAGE_TYPE_ID and action is not None: 
+        if action not in KPI_ACTIONS or \
+           (action == event_type.METER_VALUES and '"chargingState"' not in string): 
+            return [message_type_ID, message_ID, action, {}]
+    if message_type_ID == message_structure.CALLRESULT_MESSAGE_TYPE_ID and \
+       not any(response_key in string for response_key in RESPONSE_KEYS): 
+        return [message_type_ID, message_ID, {}]
+    return None
+
+def loads_projected(string: str, decoder: json_ops.JSONDecoder) -> typing.Any: 
+    message = skipped_message(string)
+    if message is not None: 
+        return message
+    return decoder.loads_projected(string, project_message)
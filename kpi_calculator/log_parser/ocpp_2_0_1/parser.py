@@ -1,70 +1,292 @@
 # Copyright 2025, Battelle Energy Alliance, LLC, ALL RIGHTS RESERVED
 
-from dataclasses import dataclass
-        
-def write_parsed_log_line(output_file_path: str, message: str, device_ID: int, date: str) -> None:
-    message = message.replace("\"", "\"\"")
-        
-    with open(output_file_path, 'a+', encoding='utf-8') as outfile: 
-        outfile.write(str(device_ID) + ',' + "\"" + message + "\"" + ',' + date + '\n')
+from __future__ import annotations
 
-@dataclass
-class StandardSubstrings: 
-    
-    message_in_substring: str
-    message_out_substring: str
-    
-@dataclass 
-class StandardDateStringPos:
+import io
+import os
+import mmap
+
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from kpi_calculator.log_parser.ocpp_2_0_1 import action_filter
+from kpi_calculator.log_parser.ocpp_2_0_1.standard import alternation_pattern, identify_standard, registered_standard
+from kpi_calculator.utils import file_ops, parquet_ops
+
+OUTPUT_FORMATS = ['csv', 'parquet']
+DEFAULT_FLUSH_SIZE = 10000
+DEFAULT_NUMBER_SAMPLE_LINES = 100
+DEFAULT_CHUNK_SIZE_BYTES = 64 * 1024 * 1024
+PARALLEL_SCAN_THRESHOLD_BYTES = 1024 * 1024 * 1024
+
+def format_parsed_log_lines(messages: list[str], device_IDs: list[int], dates: list[str]) -> str:
+    # messages never contain a newline (they are sliced from a single line), so the
+    # quote escaping can be done once over the joined block and split back apart
+    escaped_messages = '\n'.join(messages).replace("\"", "\"\"").split('\n')
+    return ''.join([str(device_ID) + ',' + "\"" + message + "\"" + ',' + date + '\n'
+                    for device_ID, message, date in zip(device_IDs, escaped_messages, dates)])
+
+class ParsedLogWriter:
+
+    def __init__(self, output_file_path: str, flush_size: int = DEFAULT_FLUSH_SIZE):
+        if flush_size < 1:
+            raise ValueError(f"Flush size ({flush_size}) must be a positive number of lines")
+        self.output_file_path = output_file_path
+        self._flush_size = flush_size
+        self._messages = []
+        self._device_IDs = []
+        self._dates = []
+        self._open()
+
+    def _open(self) -> None:
+        self._outfile = open(self.output_file_path, 'a+', encoding='utf-8')
+
+    def __enter__(self) -> ParsedLogWriter:
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def write(self, message: str, device_ID: int, date: str) -> None:
+        self._messages.append(message)
+        self._device_IDs.append(device_ID)
+        self._dates.append(date)
+        if len(self._messages) >= self._flush_size:
+            self.flush()
+
+    def write_many(self, messages: list[str], device_ID: int, dates: list[str]) -> None:
+        self._messages.extend(messages)
+        self._device_IDs.extend([device_ID] * len(messages))
+        self._dates.extend(dates)
+        if len(self._messages) >= self._flush_size:
+            self.flush()
+
+    def flush(self) -> None:
+        if self._messages:
+            self._outfile.write(format_parsed_log_lines(self._messages, self._device_IDs, self._dates))
+            self._messages = []
+            self._device_IDs = []
+            self._dates = []
+        self._outfile.flush()
+
+    def close(self) -> None:
+        if self._outfile.closed:
+            return
+        self.flush()
+        self._outfile.close()
+
+class ParquetLogWriter(ParsedLogWriter):
 
-    date_pos_start: int
-    date_pos_end: int
+    def _open(self) -> None:
+        # output_file_path is a dataset directory with one device_ID=<ID> partition per device; every flush adds
+        # a numbered part to the partitions of the devices it holds. The directory is created by the caller
+        self._schema = parquet_ops.cleaned_log_schema()
+        self._part_number = 0
+        self._closed = False
+
+    def flush(self) -> None:
+        device_positions = {}
+        for position, device_ID in enumerate(self._device_IDs):
+            device_positions.setdefault(device_ID, []).append(position)
+        for device_ID, positions in device_positions.items():
+            parquet_ops.write_partition_part(self.output_file_path, device_ID, self._part_number,
+                                             {'device_ID': [device_ID] * len(positions),
+                                              'message': [self._messages[position] for position in positions],
+                                              'timestamp': [self._dates[position] for position in positions]},
+                                             self._schema)
+            self._part_number += 1
+        self._messages = []
+        self._device_IDs = []
+        self._dates = []
+
+    def close(self) -> None:
+        if self._closed:
+            return
+        self.flush()
+        self._closed = True
+
+PARSED_LOG_WRITERS = {'csv': ParsedLogWriter, 'parquet': ParquetLogWriter}
 
 class LineParser:
     
     def __init__(self, standard: str):
-        self._standard_substrings = STANDARD_SUBSTRINGS[standard]
-        self._standard_date_string_pos = STANDARD_DATE_STRING_POS[standard]
+        log_standard = registered_standard(standard)
+        self.standard = standard
+        self._standard_substrings = log_standard.substrings
+        self._standard_date_string_pos = log_standard.date_string_pos
+        # both message indicators are found with a single scan of the line
+        self._message_pattern = alternation_pattern([self._standard_substrings.message_in_substring, 
+                                                     self._standard_substrings.message_out_substring])
         
     def relevant_substring(self, line: str) -> str | None: 
-        if self._standard_substrings.message_in_substring in line: 
-            return self._standard_substrings.message_in_substring
-        elif self._standard_substrings.message_out_substring in line: 
-            return self._standard_substrings.message_out_substring
-        return None
+        indicator_match = self._message_pattern.search(line)
+        if indicator_match is None: 
+            return None
+        return indicator_match.group(0)
     
     def parse_message(self, line: str) -> str | None: 
-        indicator = self.relevant_substring(line)
-        if indicator is None: 
+        indicator_match = self._message_pattern.search(line)
+        if indicator_match is None: 
             return None
-        index_of_message_start = line.find(indicator) + (len(indicator) - 1)
-        message = line[index_of_message_start:]
-        return message    
+        return line[indicator_match.end() - 1:]
 
     def parse_date(self, line: str) -> str:
         return line[self._standard_date_string_pos.date_pos_start: self._standard_date_string_pos.date_pos_end]   
-    
-STANDARD_SUBSTRINGS = {
-                        'explicit' : StandardSubstrings('[msg-in] [', '[msg-out] ['), 
-                        'verbose' : StandardSubstrings('>>> [', '<<< [') 
-                        } 
 
-STANDARD_DATE_STRING_POS = {
-                        'explicit' : StandardDateStringPos(1, 20),
-                        'verbose' : StandardDateStringPos(0, 24)
-                    }
+    def parse_line(self, line: str) -> tuple[str, str] | None: 
+        # message (without the line terminator) and date of a relevant line, None for any other line
+        indicator_match = self._message_pattern.search(line)
+        if indicator_match is None: 
+            return None
+        return line[indicator_match.end() - 1:-1], self.parse_date(line)
+
+def newline_aligned_byte_ranges(log_file_path: str, chunk_size_bytes: int) -> list[tuple[int, int]]:
+    if chunk_size_bytes < 1:
+        raise ValueError(f"Chunk size ({chunk_size_bytes}) must be a positive number of bytes")
+    if os.path.getsize(log_file_path) == 0:
+        return []
+    byte_ranges = []
+    with open(log_file_path, 'rb') as infile, mmap.mmap(infile.fileno(), 0, access=mmap.ACCESS_READ) as log_map:
+        file_size = len(log_map)
+        range_start = 0
+        while range_start < file_size:
+            range_end = min(range_start + chunk_size_bytes, file_size)
+            if range_end < file_size:
+                # extend the range to just past the next newline so no line is split between two ranges
+                newline_index = log_map.find(b'\n', range_end - 1)
+                range_end = file_size if newline_index == -1 else newline_index + 1
+            byte_ranges.append((range_start, range_end))
+            range_start = range_end
+    return byte_ranges
+
+def scan_byte_range(log_file_path: str, standard: str, range_start: int, range_end: int, 
+                    filter_actions: bool = False) -> tuple[list[str], list[str]]:
+    line_parser = LineParser(standard)
+    with open(log_file_path, 'rb') as infile, mmap.mmap(infile.fileno(), 0, access=mmap.ACCESS_READ) as log_map:
+        text = log_map[range_start:range_end].decode('utf-8')
+    messages = []
+    dates = []
+    # newline=None gives the same universal newline handling as reading the file in text mode
+    for line in io.StringIO(text, newline=None):
+        parsed_line = line_parser.parse_line(line)
+        if parsed_line is None:
+            continue
+        # only the stateless part of the action filter can run on a range on its own
+        if filter_actions and not action_filter.prefilter(parsed_line[0]):
+            continue
+        messages.append(parsed_line[0])
+        dates.append(parsed_line[1])
+    return messages, dates
 
 class LogParser :
     
-    def __init__(self, standard: str): 
-        self._line_parser = LineParser(standard)
+    def __init__(self, standard: str | None, flush_size: int = DEFAULT_FLUSH_SIZE, scan_workers: int = 1, 
+                 chunk_size_bytes: int = DEFAULT_CHUNK_SIZE_BYTES, 
+                 parallel_scan_threshold_bytes: int = PARALLEL_SCAN_THRESHOLD_BYTES, 
+                 number_sample_lines: int = DEFAULT_NUMBER_SAMPLE_LINES, filter_actions: bool = False, 
+                 output_format: str = 'csv'): 
+        # with no standard given, the standard is inferred separately for every parsed file
+        if scan_workers < 1:
+            raise ValueError(f"Number of scan workers ({scan_workers}) must be at least 1")
+        if output_format not in PARSED_LOG_WRITERS:
+            raise ValueError(f"Output format ({output_format}) is not one of {OUTPUT_FORMATS}")
+        self._output_format = output_format
+        self._line_parsers = {}
+        self._standard = standard
+        if standard is not None:
+            self._line_parsers[standard] = LineParser(standard)
+        self._number_sample_lines = number_sample_lines
+        # drop messages that cannot affect the KPIs before they are written to the cleaned log
+        self._filter_actions = filter_actions
+        self._flush_size = flush_size
+        self._scan_workers = scan_workers
+        self._chunk_size_bytes = chunk_size_bytes
+        self._parallel_scan_threshold_bytes = parallel_scan_threshold_bytes
+        self._writer = None
+
+    def __enter__(self) -> LogParser:
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def _output_writer(self, output_file_path: str) -> ParsedLogWriter:
+        # one buffered handle is kept open for the whole run instead of one per parsed line
+        if self._writer is not None and self._writer.output_file_path != output_file_path:
+            self._writer.close()
+            self._writer = None
+        if self._writer is None:
+            self._writer = PARSED_LOG_WRITERS[self._output_format](output_file_path, self._flush_size)
+        return self._writer
+
+    def _use_parallel_scan(self, log_file_path: str) -> bool:
+        if self._scan_workers == 1:
+            return False
+        # compressed logs cannot be split into byte ranges, they are streamed instead
+        if file_ops.is_compressed(log_file_path):
+            return False
+        return os.path.getsize(log_file_path) >= self._parallel_scan_threshold_bytes
+
+    def _sample_lines(self, log_file_path: str) -> list[str]:
+        sample_lines = []
+        with file_ops.open_text(log_file_path) as infile:
+            for line_number, line in enumerate(infile):
+                if line_number == self._number_sample_lines:
+                    break
+                sample_lines.append(line)
+        return sample_lines
+
+    def _line_parser_for(self, log_file_path: str) -> LineParser | None:
+        if self._standard is not None:
+            return self._line_parsers[self._standard]
+        sample_lines = self._sample_lines(log_file_path)
+        if len(sample_lines) == 0:
+            return None
+        line_standard = identify_standard(sample_lines)
+        if line_standard not in self._line_parsers:
+            self._line_parsers[line_standard] = LineParser(line_standard)
+        return self._line_parsers[line_standard]
+
+    def _parse_log_in_parallel(self, log_file_path: str, line_parser: LineParser, writer: ParsedLogWriter, device_ID: int, 
+                               message_filter: action_filter.ActionFilter | None) -> None:
+        byte_ranges = deque(newline_aligned_byte_ranges(log_file_path, self._chunk_size_bytes))
+        # only a bounded number of ranges are in flight so finished chunks waiting on an earlier,
+        # slower chunk do not pile up in memory; chunks are written back in their original order
+        max_pending_ranges = 2 * self._scan_workers
+        pending_chunks = deque()
+        with ProcessPoolExecutor(max_workers=self._scan_workers) as executor:
+            while byte_ranges or pending_chunks:
+                while byte_ranges and len(pending_chunks) < max_pending_ranges:
+                    range_start, range_end = byte_ranges.popleft()
+                    pending_chunks.append(executor.submit(scan_byte_range, log_file_path, line_parser.standard, 
+                                                          range_start, range_end, self._filter_actions))
+                messages, dates = pending_chunks.popleft().result()
+                if message_filter is not None:
+                    kept_lines = [(message, date) for message, date in zip(messages, dates) if message_filter.keep(message)]
+                    messages = [message for message, _ in kept_lines]
+                    dates = [date for _, date in kept_lines]
+                writer.write_many(messages, device_ID, dates)
 
     def parse_log(self, log_file_path: str, output_file_path: str, device_ID: int) -> None:
-        with open(log_file_path, 'r', encoding='utf-8') as infile: 
+        writer = self._output_writer(output_file_path)
+        line_parser = self._line_parser_for(log_file_path)
+        if line_parser is None:
+            return
+        # CALLRESULTs are matched to the CALLs of the same log, so every log gets a fresh filter
+        message_filter = action_filter.ActionFilter() if self._filter_actions else None
+        if self._use_parallel_scan(log_file_path):
+            self._parse_log_in_parallel(log_file_path, line_parser, writer, device_ID, message_filter)
+            return
+        with file_ops.open_text(log_file_path) as infile: 
             for line in infile: 
-                if self._line_parser.relevant_substring(line) is None:
+                parsed_line = line_parser.parse_line(line)
+                if parsed_line is None:
                     continue
-                message = self._line_parser.parse_message(line)
-                message = message[:-1]
-                date = self._line_parser.parse_date(line)
-                write_parsed_log_line(output_file_path, message, device_ID, date)
+                if message_filter is not None and not message_filter.keep(parsed_line[0]):
+                    continue
+                writer.write(parsed_line[0], device_ID, parsed_line[1])
+
+    def close(self) -> None:
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
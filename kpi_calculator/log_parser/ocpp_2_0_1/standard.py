@@ -1,21 +1,98 @@
 # Copyright 2025, Battelle Energy Alliance, LLC, ALL RIGHTS RESERVED
 
+from __future__ import annotations
+
+import re
+
+from dataclasses import dataclass
+
 from kpi_calculator.utils import fraction
 
 STANDARD_THRESHOLD = 0.2
-STANDARD_SUB_STRINGS = { 
-                        'verbose': ['.cpp:', 'm INFO', 'mTRACE' 'm WARN'], 
-                        'explicit':  ['[info]', '[REQUEST]', '[msg-out]', '[msg-in]', 
-                                     '[verdict]', '[prompt]', '[api-dismissed]']
-                       }
-
-def is_standard(sample_lines: list[str], standard: str) -> str | None: 
-    fraction_standard_lines = fraction.AdditiveFraction()
-    for line in sample_lines: 
-        for sub_string in STANDARD_SUB_STRINGS[standard]: 
-            if sub_string in line: 
-                fraction_standard_lines.add_to_numerator(1)
-        fraction_standard_lines.add_to_denominator(1)   
-    if fraction_standard_lines.calculate_fraction() > STANDARD_THRESHOLD:
+STANDARD_ERROR = 'Standard is ambiguous and cannot be inferred from the data provided'
+
+@dataclass
+class StandardSubstrings:
+
+    message_in_substring: str
+    message_out_substring: str
+
+@dataclass
+class StandardDateStringPos:
+
+    date_pos_start: int
+    date_pos_end: int
+
+@dataclass
+class LogStandard:
+
+    name: str
+    detection_substrings: list[str]
+    substrings: StandardSubstrings
+    date_string_pos: StandardDateStringPos
+
+STANDARD_REGISTRY: dict[str, LogStandard] = {}
+
+def register_standard(log_standard: LogStandard) -> None:
+    STANDARD_REGISTRY[log_standard.name] = log_standard
+    StandardDetector.compiled = None
+
+def registered_standard(standard: str) -> LogStandard:
+    if standard not in STANDARD_REGISTRY:
+        raise ValueError(f"Standard ({standard}) is not a supported standard")
+    return STANDARD_REGISTRY[standard]
+
+def alternation_pattern(substrings: list[str]) -> re.Pattern:
+    # longest first so a substring that contains another one is the one reported
+    ordered_substrings = sorted(set(substrings), key=len, reverse=True)
+    return re.compile('|'.join(re.escape(substring) for substring in ordered_substrings))
+
+class StandardDetector:
+
+    compiled = None
+
+    def __init__(self, log_standards: list[LogStandard]):
+        # every standard keeps its own substrings, so a line is credited to each standard it matches no matter
+        # how the substrings of different standards overlap or in which order the standards were registered
+        self._detection_substrings = {log_standard.name: list(dict.fromkeys(log_standard.detection_substrings))
+                                      for log_standard in log_standards}
+
+    @classmethod
+    def from_registry(cls) -> StandardDetector:
+        if cls.compiled is None:
+            cls.compiled = cls(list(STANDARD_REGISTRY.values()))
+        return cls.compiled
+
+    def standard_fractions(self, sample_lines: list[str]) -> dict[str, fraction.AdditiveFraction]:
+        # each standard is credited once for every one of its substrings present in a line
+        fractions = {standard: fraction.AdditiveFraction() for standard in self._detection_substrings}
+        for standard, substrings in self._detection_substrings.items():
+            fractions[standard].add_to_numerator(sum(substring in line for line in sample_lines
+                                                     for substring in substrings))
+            fractions[standard].add_to_denominator(len(sample_lines))
+        return fractions
+
+    def matching_standards(self, sample_lines: list[str]) -> list[str]:
+        if len(sample_lines) == 0:
+            return []
+        fractions = self.standard_fractions(sample_lines)
+        return [standard for standard, standard_fraction in fractions.items()
+                if standard_fraction.calculate_fraction() > STANDARD_THRESHOLD]
+
+def is_standard(sample_lines: list[str], standard: str) -> str | None:
+    registered_standard(standard)
+    if standard in StandardDetector.from_registry().matching_standards(sample_lines):
         return standard
-    return None 
+    return None
+
+def identify_standard(sample_lines: list[str]) -> str:
+    matching_standards = StandardDetector.from_registry().matching_standards(sample_lines)
+    if len(matching_standards) != 1:
+        raise IOError(STANDARD_ERROR)
+    return matching_standards[0]
+
+register_standard(LogStandard('verbose', ['.cpp:', 'm INFO', 'mTRACE' 'm WARN'],
+                              StandardSubstrings('>>> [', '<<< ['), StandardDateStringPos(0, 24)))
+register_standard(LogStandard('explicit', ['[info]', '[REQUEST]', '[msg-out]', '[msg-in]',
+                                           '[verdict]', '[prompt]', '[api-dismissed]'],
+                              StandardSubstrings('[msg-in] [', '[msg-out] ['), StandardDateStringPos(1, 20)))
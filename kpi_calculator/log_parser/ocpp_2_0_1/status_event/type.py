@@ -5,3 +5,7 @@ TRANSACTION_EVENT_REQUEST = 'TransactionEvent'
 AUTHORIZE_RESPONSE = 'Authorize'
 REQUEST_START_TRANSACTION_RESPONSE = 'RequestStartTransaction'
 METER_VALUES = 'MeterValues'
+
+
+GENERAL_EVENT_TYPES = [AUTHORIZE_RESPONSE, REQUEST_START_TRANSACTION_RESPONSE, 
+                       STATUS_NOTIFICATION_REQUEST, TRANSACTION_EVENT_REQUEST]
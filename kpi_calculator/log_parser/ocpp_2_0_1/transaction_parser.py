@@ -1,25 +1,23 @@
 # Copyright 2025, Battelle Energy Alliance, LLC, ALL RIGHTS RESERVED
 
+import numpy as np
 import pandas as pd
 
 from kpi_calculator.log_parser.ocpp_2_0_1.status_event import code, type as event_type 
+from kpi_calculator.utils import time_ops
+
+VALID_STOP_REASONS = ['EnergyLimitReached', 'SOCLimitReached', 'Local', 'Remote', 'StoppedByEV', 
+                      'LocalOutofCredit', 'TimeLimitReached', 'EVDisconnected']
    
    
 def valid_stop(df: pd.DataFrame) -> bool: 
-    valid_stop_df = df[(df['trigger_reason'] == 'EnergyLimitReached') |
-                        (df['trigger_reason'] == 'SOCLimitReached') | 
-                        (df['trigger_reason'] == 'Local') |
-                        (df['trigger_reason'] == 'Remote') | 
-                        (df['trigger_reason'] == 'StoppedByEV') | 
-                        (df['trigger_reason'] == 'LocalOutofCredit') |
-                        (df['trigger_reason'] == 'TimeLimitReached') | 
-                        (df['trigger_reason'] == 'EVDisconnected')]
+    valid_stop_df = df[valid_stop_rows(df)]
     if not valid_stop_df.empty:
         return True
     return False
 
 def get_valid_starts(df: pd.DataFrame) -> pd.DataFrame: 
-    return df[(df['event_code'] == code.STARTED) & (df['trigger_reason'] == code.CABLE_PLUGGED_IN)]
+    return df[valid_start_rows(df)]
     
 def valid_start(df: pd.DataFrame) -> bool: 
     valid_start_df = get_valid_starts(df)
@@ -28,16 +26,13 @@ def valid_start(df: pd.DataFrame) -> bool:
     return False
     
 def valid_auth_start(df: pd.DataFrame) -> bool: 
-    valid_auth_start = df[(df['event_code'] == code.STARTED) & 
-                            ((df['trigger_reason'] == code.ACCEPTED) | 
-                            (df['trigger_reason'] == code.REJECTED))]
+    valid_auth_start = df[valid_auth_start_rows(df)]
     if not valid_auth_start.empty:
         return True
     return False   
 
 def get_power_delivery_attempts(df: pd.DataFrame) -> bool: 
-    power_delivery_attempt = df[((df['event_code'] == code.CHARGING) & 
-                        (df['trigger_reason'] == code.CHARGING_STATE_CHANGED))]   
+    power_delivery_attempt = df[power_delivery_attempt_rows(df)]
     return power_delivery_attempt
 
 def power_delivery_attempt(df: pd.DataFrame) -> bool: 
@@ -62,10 +57,7 @@ def after_auth_timestamps(df: pd.DataFrame) -> tuple[str, str] | tuple[None, Non
     return valid_starts.iloc[0]['timestamp'], power_delivery_attempts.iloc[0]['timestamp']
 
 def filter_request_starts(df: pd.DataFrame) -> pd.DataFrame: 
-    request_starts_df = df[(df['event_type'] == \
-                                    event_type.REQUEST_START_TRANSACTION_RESPONSE) & 
-                            ((df['event_code'] == code.ACCEPTED) | 
-                            (df['event_code'] == code.REJECTED))]
+    request_starts_df = df[request_start_rows(df)]
     return request_starts_df
     
 def filter_authorizes(df: pd.DataFrame) -> pd.DataFrame: 
@@ -83,4 +75,92 @@ def filter_authorizes_no_double_count(df: pd.DataFrame) -> pd.DataFrame:
     if event_type.AUTHORIZE_RESPONSE in unique_event_types and \
         code.ACCEPTED in unique_trigger_reasons:
         authorizes_df = authorizes_df[authorizes_df['event_type'] != event_type.AUTHORIZE_RESPONSE]
-    return authorizes_df
\ No newline at end of file
+    return authorizes_df
+
+# row masks shared by the predicates above and by summarize_transactions, which evaluates them once for all transactions
+
+def valid_stop_rows(df: pd.DataFrame) -> pd.Series: 
+    return df['trigger_reason'].isin(VALID_STOP_REASONS)
+
+def valid_start_rows(df: pd.DataFrame) -> pd.Series: 
+    return (df['event_code'] == code.STARTED) & (df['trigger_reason'] == code.CABLE_PLUGGED_IN)
+
+def valid_auth_start_rows(df: pd.DataFrame) -> pd.Series: 
+    return (df['event_code'] == code.STARTED) & \
+           ((df['trigger_reason'] == code.ACCEPTED) | (df['trigger_reason'] == code.REJECTED))
+
+def power_delivery_attempt_rows(df: pd.DataFrame) -> pd.Series: 
+    return (df['event_code'] == code.CHARGING) & (df['trigger_reason'] == code.CHARGING_STATE_CHANGED)
+
+def request_start_rows(df: pd.DataFrame) -> pd.Series: 
+    return (df['event_type'] == event_type.REQUEST_START_TRANSACTION_RESPONSE) & \
+           ((df['event_code'] == code.ACCEPTED) | (df['event_code'] == code.REJECTED))
+
+def authorize_response_rows(df: pd.DataFrame) -> pd.Series: 
+    return df['event_type'] == event_type.AUTHORIZE_RESPONSE
+
+def summarize_transactions(df: pd.DataFrame, group_columns: list[str] | None = None) -> pd.DataFrame: 
+    # one row per transaction_ID (in order of first appearance) with the same values the predicates above give 
+    # for that transaction's rows: valid_stop, valid_start, valid_auth_start, power_delivery_attempt, the 
+    # filter_authorizes_no_double_count and filter_request_starts counts and the charge start time in seconds. 
+    # group_columns (e.g. device_ID and transaction_ID) summarize each combination of their values instead
+    if group_columns is None: 
+        group_columns = ['transaction_ID']
+    is_authorize_response = authorize_response_rows(df)
+    is_valid_auth_start = valid_auth_start_rows(df)
+    is_power_delivery_attempt = power_delivery_attempt_rows(df)
+    is_valid_start = valid_start_rows(df)
+    has_response_timestamp = ~pd.isna(df['response_timestamp'])
+    flags = pd.DataFrame({**{group_column: df[group_column] for group_column in group_columns}, 
+                          'valid_stop': valid_stop_rows(df), 
+                          'valid_start': is_valid_start, 
+                          'valid_auth_start': is_valid_auth_start, 
+                          'power_delivery_attempt': is_power_delivery_attempt, 
+                          'authorize_responses': is_authorize_response, 
+                          'auth_starts': is_valid_auth_start, 
+                          'accepted': df['trigger_reason'] == code.ACCEPTED, 
+                          'request_starts': request_start_rows(df)}, index=df.index)
+    # positions of the first rows the charge start time is read from, NaN when a transaction has none
+    positions = pd.Series(np.arange(len(df)), index=df.index, dtype=float)
+    flags['first_power_delivery_attempt'] = positions.where(is_power_delivery_attempt)
+    flags['first_valid_start'] = positions.where(is_valid_start)
+    flags['first_response'] = positions.where(has_response_timestamp)
+    summaries = flags.groupby(group_columns, sort=False).agg(
+                          valid_stop=('valid_stop', 'any'), 
+                          valid_start=('valid_start', 'any'), 
+                          valid_auth_start=('valid_auth_start', 'any'), 
+                          power_delivery_attempt=('power_delivery_attempt', 'any'), 
+                          authorize_responses=('authorize_responses', 'sum'), 
+                          auth_starts=('auth_starts', 'sum'), 
+                          accepted=('accepted', 'any'), 
+                          request_starts=('request_starts', 'sum'), 
+                          first_power_delivery_attempt=('first_power_delivery_attempt', 'first'), 
+                          first_valid_start=('first_valid_start', 'first'), 
+                          first_response=('first_response', 'first'))
+    # an Authorize next to an accepted authorized start is the same authorization, so only the start is counted
+    double_counted = (summaries['authorize_responses'] > 0) & summaries['accepted']
+    summaries['authorizes'] = summaries['auth_starts'] + summaries['authorize_responses'].where(~double_counted, 0)
+    summaries['charge_start_time'] = charge_start_times(df, summaries)
+    return summaries[['valid_stop', 'valid_start', 'valid_auth_start', 'power_delivery_attempt', 
+                      'authorizes', 'request_starts', 'charge_start_time']]
+
+def values_at_positions(column: pd.Series, positions: pd.Series) -> pd.Series: 
+    values = pd.Series(pd.NaT, index=positions.index, dtype=column.dtype)
+    has_position = ~pd.isna(positions)
+    values[has_position] = column.to_numpy()[positions[has_position].astype(int).to_numpy()]
+    return values
+
+def charge_start_times(df: pd.DataFrame, summaries: pd.DataFrame) -> pd.Series: 
+    # same choice as before_auth_timestamps then after_auth_timestamps: from the first response when there is 
+    # one, otherwise from the first valid start, to the first power delivery attempt. NaN when neither applies
+    power_delivery_timestamps = values_at_positions(df['timestamp'], summaries['first_power_delivery_attempt'])
+    response_timestamps = values_at_positions(df['response_timestamp'], summaries['first_response'])
+    valid_start_timestamps = values_at_positions(df['timestamp'], summaries['first_valid_start'])
+    has_power_delivery_attempt = ~pd.isna(summaries['first_power_delivery_attempt'])
+    before_auth = has_power_delivery_attempt & ~pd.isna(summaries['first_response'])
+    after_auth = has_power_delivery_attempt & ~before_auth & ~pd.isna(summaries['first_valid_start'])
+    start_timestamps = response_timestamps.where(before_auth, valid_start_timestamps)
+    charge_start_times = pd.Series(time_ops.events_time_diffs_seconds(start_timestamps.to_numpy(), 
+                                                                      power_delivery_timestamps.to_numpy()), 
+                                   index=summaries.index)
+    return charge_start_times.where(before_auth | after_auth)
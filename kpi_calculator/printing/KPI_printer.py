@@ -2,6 +2,8 @@
 
 from __future__ import annotations
 
+import warnings
+
 import xlsxwriter
 import xlsxwriter.worksheet 
 
@@ -52,10 +54,11 @@ class KPIExcelWriter:
         sheet.write('D1', '50th_percentile')
         sheet.write('E1', '75th_percentile')
         sheet.write('F1', 'total_samples')
-        sheet.write('B2', interim_KPIs.x_percentile_charge_start_time(10))
-        sheet.write('C2', interim_KPIs.x_percentile_charge_start_time(25))
-        sheet.write('D2', interim_KPIs.x_percentile_charge_start_time(50))
-        sheet.write('E2', interim_KPIs.x_percentile_charge_start_time(75))
+        percentile_10, percentile_25, percentile_50, percentile_75 = interim_KPIs.charge_start_time_percentiles([10, 25, 50, 75])
+        sheet.write('B2', percentile_10)
+        sheet.write('C2', percentile_25)
+        sheet.write('D2', percentile_50)
+        sheet.write('E2', percentile_75)
         sheet.write('F2', interim_KPIs.num_charge_start_time_samples())
         
     def write_KPIs(self): 
@@ -0,0 +1,118 @@
+# Copyright 2025, Battelle Energy Alliance, LLC, ALL RIGHTS RESERVED
+
+import os
+
+import pandas as pd
+
+from kpi_calculator.utils import parquet_ops, time_ops
+
+PARTITION_KEY = 'date'
+MISSING_DATE = 'none'
+INTERVAL_INDEX_NAME = 'transaction_intervals'
+PART_FILE_FORMAT = 'part-{:06d}.{}'
+DATE_FORMAT = '%Y-%m-%d'
+TEXT_COLUMNS = ['ID_token', 'transaction_ID', 'event_type', 'event_code', 'trigger_reason']
+TIMESTAMP_COLUMNS = ['timestamp', 'response_timestamp']
+
+# a store is a directory with one date=<YYYY-MM-DD> partition per event date (date=none for rows without a
+# timestamp) and an index of the first and last timestamp of every transaction on every date it has rows on
+
+
+def row_dates(timestamps: pd.Series) -> pd.Series:
+    # csv rows hold the timestamps as they were logged
+    return time_ops.parse_timestamps(timestamps).dt.strftime(DATE_FORMAT).fillna(MISSING_DATE)
+
+def partition_dir(store_dir: str, date: str) -> str:
+    return os.path.join(store_dir, f"{PARTITION_KEY}={date}")
+
+def write_frame(df: pd.DataFrame, file_path: str, output_format: str) -> None:
+    if output_format == 'parquet':
+        parquet_ops.write_dataframe(df, file_path, parquet_ops.parsed_log_schema())
+        return
+    df.to_csv(file_path, index=False, date_format=time_ops.OUTPUT_DATE_FORMAT)
+
+def read_frame(file_path: str, columns: list[str] | None = None) -> pd.DataFrame:
+    if file_path.endswith('.parquet'):
+        return parquet_ops.read_dataframe(file_path, columns=columns)
+    # read as text, like the parquet columns, so every partition gets the same types whatever values it holds
+    df = pd.read_csv(file_path, usecols=columns, dtype={column: str for column in TEXT_COLUMNS})
+    for column in TIMESTAMP_COLUMNS:
+        if column in df.columns:
+            df[column] = time_ops.parse_timestamps(df[column])
+    return df
+
+def transaction_date_intervals(df: pd.DataFrame, dates: pd.Series) -> pd.DataFrame:
+    intervals = pd.DataFrame({'transaction_ID': parquet_ops.text_column(df['transaction_ID']),
+                              PARTITION_KEY: dates.to_numpy(),
+                              'timestamp': time_ops.parse_timestamps(df['timestamp']).to_numpy()})
+    return intervals.groupby(['transaction_ID', PARTITION_KEY], sort=False).agg(
+                                first_timestamp=('timestamp', 'min'),
+                                last_timestamp=('timestamp', 'max')).reset_index()
+
+def interval_index_path(store_dir: str) -> str:
+    return os.path.join(store_dir, INTERVAL_INDEX_NAME + '.csv')
+
+def read_interval_index(store_dir: str) -> pd.DataFrame:
+    interval_index = pd.read_csv(interval_index_path(store_dir), dtype=str)
+    interval_index['first_timestamp'] = time_ops.parse_timestamps(interval_index['first_timestamp'])
+    interval_index['last_timestamp'] = time_ops.parse_timestamps(interval_index['last_timestamp'])
+    return interval_index
+
+def store_dates(store_dir: str) -> list[str]:
+    dates = []
+    for entry in os.listdir(store_dir):
+        key, _, date = entry.partition('=')
+        if key == PARTITION_KEY and os.path.isdir(os.path.join(store_dir, entry)):
+            dates.append(date)
+    # dated partitions in date order, rows without a timestamp last
+    return sorted(dates, key=lambda date: (date == MISSING_DATE, date))
+
+def part_file_number(part_file: str) -> int:
+    return int(part_file[len('part-'):].split('.')[0])
+
+def read_partition(store_dir: str, date: str, columns: list[str] | None = None) -> pd.DataFrame:
+    # parts are numbered in write order, so reading them by number gives back the rows in order
+    part_files = sorted((part_file for part_file in os.listdir(partition_dir(store_dir, date)) 
+                         if part_file.startswith('part-')), key=part_file_number)
+    return pd.concat([read_frame(os.path.join(partition_dir(store_dir, date), part_file), columns)
+                      for part_file in part_files], ignore_index=True)
+
+def date_in_window(date: str, lower_bound: pd.Timestamp | None, upper_bound: pd.Timestamp | None) -> bool:
+    if date == MISSING_DATE:
+        return False
+    day_start = pd.Timestamp(date)
+    if lower_bound is not None and day_start + pd.Timedelta(days=1) <= lower_bound:
+        return False
+    if upper_bound is not None and day_start >= upper_bound:
+        return False
+    return True
+
+def overlapping_transaction_dates(interval_index: pd.DataFrame, lower_bound: pd.Timestamp | None,
+                                  upper_bound: pd.Timestamp | None) -> pd.DataFrame:
+    # (transaction_ID, date) rows of every transaction whose first to last timestamp overlaps the window
+    transaction_intervals = interval_index.groupby('transaction_ID', sort=False).agg(
+                                first_timestamp=('first_timestamp', 'min'), last_timestamp=('last_timestamp', 'max'))
+    overlaps = ~pd.isna(transaction_intervals['first_timestamp'])
+    if lower_bound is not None:
+        overlaps &= transaction_intervals['last_timestamp'] >= lower_bound
+    if upper_bound is not None:
+        overlaps &= transaction_intervals['first_timestamp'] < upper_bound
+    overlapping_transaction_IDs = transaction_intervals.index[overlaps.to_numpy()]
+    return interval_index[interval_index['transaction_ID'].isin(overlapping_transaction_IDs)]
+
+def read_window(store_dir: str, lower_bound: pd.Timestamp | None, upper_bound: pd.Timestamp | None,
+                columns: list[str] | None = None) -> pd.DataFrame:
+    # partitions inside the window are read whole; any other partition is only read for the rows of the
+    # transactions that overlap the window, so their rows outside of the window are still all there
+    transaction_dates = overlapping_transaction_dates(read_interval_index(store_dir), lower_bound, upper_bound)
+    transaction_IDs_by_date = transaction_dates.groupby(PARTITION_KEY)['transaction_ID'].apply(set).to_dict()
+    partition_dfs = []
+    for date in store_dates(store_dir):
+        if date_in_window(date, lower_bound, upper_bound):
+            partition_dfs.append(read_partition(store_dir, date, columns))
+        elif date in transaction_IDs_by_date:
+            partition_df = read_partition(store_dir, date, columns)
+            partition_dfs.append(partition_df[partition_df['transaction_ID'].isin(transaction_IDs_by_date[date])])
+    if len(partition_dfs) == 0:
+        return pd.DataFrame(columns=columns)
+    return pd.concat(partition_dfs, ignore_index=True)
@@ -0,0 +1,135 @@
+# Copyright 2025, Battelle Energy Alliance, LLC, ALL RIGHTS RESERVED
+
+import os
+import json
+import hashlib
+
+import pandas as pd
+
+from kpi_calculator.utils import file_ops
+
+MANIFEST_FILE_NAME = 'manifest.json'
+JOURNAL_FILE_NAME = 'manifest.journal'
+CACHE_FILE_FORMAT = '{}.pkl'
+HASH_CHUNK_SIZE = 1 << 20
+
+
+def source_files(source: str) -> list[str]:
+    # a device log is a split csv file or a parquet partition directory of part files
+    if os.path.isdir(source):
+        return [os.path.join(source, part_file) for part_file in sorted(os.listdir(source))]
+    return [source]
+
+def source_stat(source: str) -> dict[str, int]:
+    stats = [os.stat(file_path) for file_path in source_files(source)]
+    return {'size' : sum(stat.st_size for stat in stats),
+            'mtime_ns' : max((stat.st_mtime_ns for stat in stats), default=0)}
+
+def source_hash(source: str) -> str:
+    sha256 = hashlib.sha256()
+    for file_path in source_files(source):
+        sha256.update(os.path.basename(file_path).encode('utf-8'))
+        with open(file_path, 'rb') as infile:
+            for chunk in iter(lambda: infile.read(HASH_CHUNK_SIZE), b''):
+                sha256.update(chunk)
+    return sha256.hexdigest()
+
+def source_key(source: str) -> str:
+    return os.path.basename(os.path.normpath(source))
+
+class DeviceCache:
+
+    def __init__(self, cache_dir: str, input_format: str):
+        # the manifest records the size, modification time and content hash of every device log next to its
+        # cached parsed dataframe. Every stored device is appended to a journal, so an interrupted run resumes
+        # from the last device it finished; the journal is folded into the manifest when the cache is opened
+        # and when it is compacted at the end of a run
+        self._cache_dir = cache_dir
+        self._input_format = input_format
+        self._fingerprints = {}
+        os.makedirs(cache_dir, exist_ok=True)
+        self._devices = self._read_manifest()
+        self.compact()
+
+    def _manifest_path(self) -> str:
+        return os.path.join(self._cache_dir, MANIFEST_FILE_NAME)
+
+    def _journal_path(self) -> str:
+        return os.path.join(self._cache_dir, JOURNAL_FILE_NAME)
+
+    def _cache_path(self, key: str) -> str:
+        return os.path.join(self._cache_dir, CACHE_FILE_FORMAT.format(key))
+
+    def _read_manifest(self) -> dict[str, dict]:
+        if not os.path.exists(self._manifest_path()):
+            return {}
+        with open(self._manifest_path(), 'r', encoding='utf-8') as infile:
+            manifest = json.load(infile)
+        # the cached outputs of another input format are of other sources and are all stale, journal included
+        if manifest.get('input_format') != self._input_format:
+            return {}
+        devices = manifest['devices']
+        devices.update(self._read_journal())
+        return devices
+
+    def _read_journal(self) -> dict[str, dict]:
+        devices = {}
+        if not os.path.exists(self._journal_path()):
+            return devices
+        with open(self._journal_path(), 'r', encoding='utf-8') as infile:
+            for line in infile:
+                # a line cut off by an interruption is a device that was not finished
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    break
+                devices[entry['key']] = entry['fingerprint']
+        return devices
+
+    def compact(self) -> None:
+        # the manifest is rewritten once with every device and the journal starts over
+        def write(file_path: str) -> None:
+            with open(file_path, 'w', encoding='utf-8') as outfile:
+                json.dump({'input_format' : self._input_format, 'devices' : self._devices}, outfile, indent=1)
+        file_ops.write_atomically(self._manifest_path(), write)
+        if os.path.exists(self._journal_path()):
+            os.remove(self._journal_path())
+
+    def _fingerprint(self, source: str) -> dict:
+        # the hash is only computed when the size or modification time changed, a rewritten but
+        # unchanged file (e.g. split again) then still matches its recorded hash
+        stat = source_stat(source)
+        entry = self._devices.get(source_key(source))
+        if entry is not None and entry['size'] == stat['size'] and entry['mtime_ns'] == stat['mtime_ns']:
+            return {**stat, 'sha256' : entry['sha256']}
+        return {**stat, 'sha256' : source_hash(source)}
+
+    def is_current(self, source: str) -> bool:
+        fingerprint = self._fingerprint(source)
+        self._fingerprints[source] = fingerprint
+        entry = self._devices.get(source_key(source))
+        return (entry is not None and entry['sha256'] == fingerprint['sha256']
+                and os.path.exists(self._cache_path(source_key(source))))
+
+    def store(self, source: str, parsed_df: pd.DataFrame) -> None:
+        # the fingerprint taken before parsing is recorded, a log that changed in the meantime is parsed again
+        key = source_key(source)
+        fingerprint = self._fingerprints.pop(source, None) or self._fingerprint(source)
+        file_ops.write_atomically(self._cache_path(key), lambda file_path: parsed_df.to_pickle(file_path, compression=None))
+        self._devices[key] = fingerprint
+        with open(self._journal_path(), 'a', encoding='utf-8') as outfile:
+            outfile.write(json.dumps({'key' : key, 'fingerprint' : fingerprint}) + '\n')
+
+    def load(self, source: str) -> pd.DataFrame:
+        return pd.read_pickle(self._cache_path(source_key(source)), compression=None)
+
+    def prune(self, sources: list[str]) -> None:
+        # devices whose logs are gone are dropped from the manifest and the cache
+        keys = {source_key(source) for source in sources}
+        removed_keys = [key for key in self._devices if key not in keys]
+        for key in removed_keys:
+            del self._devices[key]
+            if os.path.exists(self._cache_path(key)):
+                os.remove(self._cache_path(key))
+        if removed_keys:
+            self.compact()
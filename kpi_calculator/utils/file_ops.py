@@ -0,0 +1,117 @@
+# Copyright 2025, Battelle Energy Alliance, LLC, ALL RIGHTS RESERVED
+
+from __future__ import annotations
+
+import io
+import os
+import bz2
+import gzip
+import lzma
+import typing
+
+from collections import OrderedDict
+
+DEFAULT_MAX_OPEN_FILES = 128
+
+COMPRESSION_EXTENSIONS = {
+                        '.gz' : 'gzip',
+                        '.gzip' : 'gzip',
+                        '.bz2' : 'bz2',
+                        '.xz' : 'xz',
+                        '.lzma' : 'xz',
+                        '.zst' : 'zstd',
+                        '.zstd' : 'zstd'
+                        }
+
+COMPRESSION_MAGIC_BYTES = {
+                        b'\x1f\x8b' : 'gzip',
+                        b'BZh' : 'bz2',
+                        b'\xfd7zXZ\x00' : 'xz',
+                        b'\x28\xb5\x2f\xfd' : 'zstd'
+                        }
+
+
+def compression_codec(file_path: str) -> str | None:
+    extension = os.path.splitext(file_path)[1].lower()
+    if extension in COMPRESSION_EXTENSIONS:
+        return COMPRESSION_EXTENSIONS[extension]
+    with open(file_path, 'rb') as infile:
+        leading_bytes = infile.read(max(len(magic_bytes) for magic_bytes in COMPRESSION_MAGIC_BYTES))
+    for magic_bytes, codec in COMPRESSION_MAGIC_BYTES.items():
+        if leading_bytes.startswith(magic_bytes):
+            return codec
+    return None
+
+def is_compressed(file_path: str) -> bool:
+    return compression_codec(file_path) is not None
+
+def open_zstd_binary(file_path: str) -> typing.BinaryIO:
+    try:
+        import zstandard
+    except ImportError as error:
+        raise ImportError(f"Reading the zstd compressed log {file_path} requires the zstandard package "
+                          "(pip install zstandard)") from error
+    return zstandard.ZstdDecompressor().stream_reader(open(file_path, 'rb'), read_across_frames=True, closefd=True)
+
+def open_binary(file_path: str) -> typing.BinaryIO:
+    codec = compression_codec(file_path)
+    if codec == 'gzip':
+        return gzip.open(file_path, 'rb')
+    if codec == 'bz2':
+        return bz2.open(file_path, 'rb')
+    if codec == 'xz':
+        return lzma.open(file_path, 'rb')
+    if codec == 'zstd':
+        return open_zstd_binary(file_path)
+    return open(file_path, 'rb')
+
+def open_text(file_path: str, encoding: str = 'utf-8') -> typing.TextIO:
+    # compressed files are decompressed as they are read, nothing is written back to disk
+    if not is_compressed(file_path):
+        return open(file_path, 'r', encoding=encoding)
+    return io.TextIOWrapper(open_binary(file_path), encoding=encoding)
+
+def write_atomically(file_path: str, write: typing.Callable[[str], None]) -> None:
+    # written next to the target and renamed over it, so a crash never leaves a partial file behind
+    temporary_file_path = file_path + '.tmp'
+    write(temporary_file_path)
+    os.replace(temporary_file_path, file_path)
+
+class FileHandlePool:
+
+    def __init__(self, max_open_files: int = DEFAULT_MAX_OPEN_FILES, encoding: str = 'utf-8'):
+        # at most max_open_files handles are kept open, the least recently used one is closed to make room.
+        # A file is truncated the first time the pool opens it and appended to when it is reopened
+        if max_open_files < 1:
+            raise ValueError(f"Maximum number of open files ({max_open_files}) must be at least 1")
+        self._max_open_files = max_open_files
+        self._encoding = encoding
+        self._handles = OrderedDict()
+        self._opened_file_paths = set()
+
+    def __enter__(self) -> FileHandlePool:
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def was_opened(self, file_path: str) -> bool:
+        return file_path in self._opened_file_paths
+
+    def handle(self, file_path: str) -> typing.TextIO:
+        if file_path in self._handles:
+            self._handles.move_to_end(file_path)
+            return self._handles[file_path]
+        if len(self._handles) >= self._max_open_files:
+            _, least_recent_handle = self._handles.popitem(last=False)
+            least_recent_handle.close()
+        mode = 'a' if file_path in self._opened_file_paths else 'w'
+        # newline='' leaves the line terminators to the writer, as open() does for pandas.to_csv
+        self._handles[file_path] = open(file_path, mode, encoding=self._encoding, newline='')
+        self._opened_file_paths.add(file_path)
+        return self._handles[file_path]
+
+    def close(self) -> None:
+        while self._handles:
+            _, handle = self._handles.popitem(last=False)
+            handle.close()
@@ -1,6 +1,9 @@
 # Copyright 2025, Battelle Energy Alliance, LLC, ALL RIGHTS RESERVED
 
 import json
+import typing
+
+JSON_BACKENDS = ['auto', 'orjson', 'simdjson', 'stdlib']
 
 # function assumes only one, nested braced group in a string
 
@@ -15,4 +18,85 @@ def string_to_JSON(string: str) -> dict | None:
     if json_str == '{}': 
         return None
     json_object = json.loads(json_str)
-    return json_object
\ No newline at end of file
+    return json_object
+
+class JSONDecoder: 
+    
+    name = 'stdlib'
+    
+    def loads(self, string: str) -> typing.Any: 
+        return json.loads(string)
+    
+    def loads_projected(self, string: str, projection: typing.Callable) -> typing.Any: 
+        # projection is handed the decoded document and returns only the parts that are kept
+        return projection(self.loads(string))
+
+class OrjsonDecoder(JSONDecoder): 
+    
+    name = 'orjson'
+    
+    def __init__(self): 
+        try: 
+            import orjson
+        except ImportError as error: 
+            raise ImportError("The orjson JSON backend requires the orjson package (pip install orjson)") from error
+        self._orjson = orjson
+        
+    def loads(self, string: str) -> typing.Any: 
+        # orjson.JSONDecodeError is a ValueError, like the stdlib error
+        return self._orjson.loads(string)
+
+class SimdjsonDecoder(JSONDecoder): 
+    
+    name = 'simdjson'
+    
+    def __init__(self): 
+        try: 
+            import simdjson
+        except ImportError as error: 
+            raise ImportError("The simdjson JSON backend requires the pysimdjson package (pip install pysimdjson)") from error
+        self._parser = simdjson.Parser()
+        
+    def _parse(self, string: str) -> typing.Any: 
+        try: 
+            return self._parser.parse(string.encode('utf-8'))
+        except (RuntimeError, ValueError) as error: 
+            raise ValueError(str(error)) from error
+    
+    def loads(self, string: str) -> typing.Any: 
+        return materialize(self._parse(string))
+    
+    def loads_projected(self, string: str, projection: typing.Callable) -> typing.Any: 
+        # the parsed document is lazy, so only the values the projection reads are built as python objects. 
+        # The document is only valid until the parser's next parse, hence the projection runs right away
+        return projection(self._parse(string))
+
+def materialize(value: typing.Any) -> typing.Any: 
+    if hasattr(value, 'as_dict'): 
+        return value.as_dict()
+    if hasattr(value, 'as_list'): 
+        return value.as_list()
+    return value
+
+def is_JSON_object(value: typing.Any) -> bool: 
+    return isinstance(value, dict) or hasattr(value, 'as_dict')
+
+def is_JSON_array(value: typing.Any) -> bool: 
+    return isinstance(value, list) or hasattr(value, 'as_list')
+
+def get_decoder(backend: str = 'auto') -> JSONDecoder: 
+    if backend not in JSON_BACKENDS: 
+        raise ValueError(f"JSON backend ({backend}) is not one of {JSON_BACKENDS}")
+    if backend == 'stdlib': 
+        return JSONDecoder()
+    if backend == 'orjson': 
+        return OrjsonDecoder()
+    if backend == 'simdjson': 
+        return SimdjsonDecoder()
+    # auto picks the fastest installed decoder and falls back to the standard library
+    for decoder_type in (OrjsonDecoder, SimdjsonDecoder): 
+        try: 
+            return decoder_type()
+        except ImportError: 
+            continue
+    return JSONDecoder()
@@ -0,0 +1,67 @@
+# Copyright 2025, Battelle Energy Alliance, LLC, ALL RIGHTS RESERVED
+
+from __future__ import annotations
+
+import os
+
+from dataclasses import dataclass
+
+DEFAULT_MAX_LINES = 10000
+
+
+@dataclass
+class TailedFile:
+
+    offset: int
+    inode: int
+    partial_line: bytes
+
+class LogTailer:
+
+    def __init__(self, log_dir: str, from_end: bool = False):
+        # every plain text file in log_dir is followed from the offset it was last read up to, files that show up
+        # later are followed as well. A file that shrinks or is replaced (e.g. rotated) is read again from its start
+        self._log_dir = log_dir
+        self._files = {}
+        # files present when following starts can be skipped up to their end, later files are read whole
+        if from_end:
+            for log_file_path in self.log_file_paths():
+                stat = os.stat(log_file_path)
+                self._files[log_file_path] = TailedFile(stat.st_size, stat.st_ino, b'')
+
+    def log_file_paths(self) -> list[str]:
+        return [os.path.join(self._log_dir, log_file) for log_file in os.listdir(self._log_dir)
+                if os.path.isfile(os.path.join(self._log_dir, log_file))]
+
+    def _tailed_file(self, log_file_path: str, stat: os.stat_result) -> TailedFile:
+        tailed_file = self._files.get(log_file_path)
+        if tailed_file is None:
+            tailed_file = TailedFile(0, stat.st_ino, b'')
+            self._files[log_file_path] = tailed_file
+        elif tailed_file.inode != stat.st_ino or stat.st_size < tailed_file.offset:
+            tailed_file.offset, tailed_file.inode, tailed_file.partial_line = 0, stat.st_ino, b''
+        return tailed_file
+
+    def read_lines(self, log_file_path: str, max_lines: int = DEFAULT_MAX_LINES) -> tuple[list[str], bool]:
+        # complete lines appended since the last read, at most max_lines of them, and whether the file was read
+        # to its end. A line still being written is held back until its newline arrives
+        if max_lines < 1:
+            raise ValueError(f"Number of lines ({max_lines}) must be at least 1")
+        stat = os.stat(log_file_path)
+        tailed_file = self._tailed_file(log_file_path, stat)
+        lines = []
+        with open(log_file_path, 'rb') as infile:
+            infile.seek(tailed_file.offset)
+            while len(lines) < max_lines:
+                line = infile.readline()
+                if len(line) == 0:
+                    break
+                tailed_file.offset += len(line)
+                if not line.endswith(b'\n'):
+                    tailed_file.partial_line += line
+                    break
+                # the same universal newlines as reading the log in text mode
+                lines.append((tailed_file.partial_line + line).decode('utf-8', errors='replace').replace('\r\n', '\n'))
+                tailed_file.partial_line = b''
+            at_end = tailed_file.offset >= os.fstat(infile.fileno()).st_size
+        return lines, at_end
@@ -0,0 +1,124 @@
+# Copyright 2025, Battelle Energy Alliance, LLC, ALL RIGHTS RESERVED
+
+from __future__ import annotations
+
+import os
+
+import pandas as pd
+
+from kpi_calculator.utils import date_partitions, parquet_ops, time_ops
+
+DEFAULT_FLUSH_ROWS = 100000
+
+
+class ParsedMessageWriter:
+
+    def __init__(self, output_file_path: str, flush_rows: int = DEFAULT_FLUSH_ROWS):
+        # parsed devices are buffered until they hold flush_rows rows and then appended to the output, so at
+        # most flush_rows rows plus one device are in memory. The header is written with the first rows
+        if flush_rows < 1:
+            raise ValueError(f"Flush size ({flush_rows}) must be a positive number of rows")
+        self.output_file_path = output_file_path
+        self._flush_rows = flush_rows
+        self._buffered_dfs = []
+        self._buffered_rows = 0
+        self._closed = False
+        self._open()
+
+    def _open(self) -> None:
+        self._write_header = True
+        self._outfile = open(self.output_file_path, 'w', encoding='utf-8', newline='')
+
+    def __enter__(self) -> ParsedMessageWriter:
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def write(self, parsed_df: pd.DataFrame) -> None:
+        self._buffered_dfs.append(parsed_df)
+        self._buffered_rows += len(parsed_df.index)
+        if self._buffered_rows >= self._flush_rows:
+            self.flush()
+
+    def _buffered_df(self) -> pd.DataFrame | None:
+        if len(self._buffered_dfs) == 0:
+            return None
+        buffered_df = pd.concat(self._buffered_dfs)
+        self._buffered_dfs = []
+        self._buffered_rows = 0
+        return buffered_df
+
+    def flush(self) -> None:
+        buffered_df = self._buffered_df()
+        if buffered_df is not None:
+            buffered_df.to_csv(self._outfile, header=self._write_header, index=False,
+                               date_format=time_ops.OUTPUT_DATE_FORMAT)
+            self._write_header = False
+        self._outfile.flush()
+
+    def close(self) -> None:
+        if self._closed:
+            return
+        self.flush()
+        self._outfile.close()
+        self._closed = True
+
+class ParquetMessageWriter(ParsedMessageWriter):
+
+    def _open(self) -> None:
+        # every flush is appended to the file as one row group
+        _, parquet = parquet_ops.import_pyarrow()
+        self._schema = parquet_ops.parsed_log_schema()
+        self._outfile = parquet.ParquetWriter(self.output_file_path, self._schema)
+
+    def flush(self) -> None:
+        buffered_df = self._buffered_df()
+        if buffered_df is not None:
+            self._outfile.write_table(parquet_ops.table_from_dataframe(buffered_df, self._schema))
+
+class DatePartitionedMessageWriter(ParsedMessageWriter):
+
+    def __init__(self, output_file_path: str, flush_rows: int = DEFAULT_FLUSH_ROWS, output_format: str = 'csv'):
+        self._output_format = output_format
+        super().__init__(output_file_path, flush_rows)
+
+    def _open(self) -> None:
+        # output_file_path is a date partitioned store (see date_partitions). Every flush adds a numbered part to
+        # the partitions of the dates it holds, the transaction interval index is written when the writer closes
+        self._part_number = 0
+        self._interval_dfs = []
+        parquet_ops.create_dataset(self.output_file_path)
+
+    def flush(self) -> None:
+        buffered_df = self._buffered_df()
+        if buffered_df is None:
+            return
+        dates = date_partitions.row_dates(buffered_df['timestamp'])
+        for date, date_df in buffered_df.groupby(dates.to_numpy(), sort=True):
+            date_partition_dir = date_partitions.partition_dir(self.output_file_path, date)
+            os.makedirs(date_partition_dir, exist_ok=True)
+            part_file = date_partitions.PART_FILE_FORMAT.format(self._part_number, self._output_format)
+            date_partitions.write_frame(date_df, os.path.join(date_partition_dir, part_file), self._output_format)
+            self._part_number += 1
+        self._interval_dfs.append(date_partitions.transaction_date_intervals(buffered_df, dates))
+
+    def close(self) -> None:
+        if self._closed:
+            return
+        self.flush()
+        interval_index = pd.concat(self._interval_dfs) if self._interval_dfs else pd.DataFrame(
+                             columns=['transaction_ID', date_partitions.PARTITION_KEY, 'first_timestamp', 'last_timestamp'])
+        interval_index.to_csv(date_partitions.interval_index_path(self.output_file_path), index=False,
+                              date_format=time_ops.OUTPUT_DATE_FORMAT)
+        self._closed = True
+
+PARSED_MESSAGE_WRITERS = {'csv': ParsedMessageWriter, 'parquet': ParquetMessageWriter}
+
+def create_parsed_message_writer(output_file_path: str, output_format: str, flush_rows: int = DEFAULT_FLUSH_ROWS, 
+                                 partition_by_date: bool = False) -> ParsedMessageWriter:
+    if output_format not in PARSED_MESSAGE_WRITERS:
+        raise ValueError(f"Output format ({output_format}) is not one of {list(PARSED_MESSAGE_WRITERS)}")
+    if partition_by_date:
+        return DatePartitionedMessageWriter(output_file_path, flush_rows, output_format)
+    return PARSED_MESSAGE_WRITERS[output_format](output_file_path, flush_rows)
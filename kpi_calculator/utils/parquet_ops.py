@@ -0,0 +1,101 @@
+# Copyright 2025, Battelle Energy Alliance, LLC, ALL RIGHTS RESERVED
+
+import os
+import shutil
+import typing
+
+import pandas as pd
+
+PARTITION_KEY = 'device_ID'
+PART_FILE_FORMAT = 'part-{:06d}.parquet'
+
+
+def import_pyarrow() -> tuple[typing.Any, typing.Any]:
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError as error:
+        raise ImportError("The parquet format requires the pyarrow package (pip install pyarrow)") from error
+    return pyarrow, pyarrow.parquet
+
+def cleaned_log_schema() -> typing.Any:
+    pyarrow, _ = import_pyarrow()
+    return pyarrow.schema([('device_ID', pyarrow.int64()), ('message', pyarrow.string()), ('timestamp', pyarrow.string())])
+
+def parsed_log_schema() -> typing.Any:
+    pyarrow, _ = import_pyarrow()
+    return pyarrow.schema([('device_ID', pyarrow.int64()), ('ID_token', pyarrow.string()),
+                           ('transaction_ID', pyarrow.string()), ('event_type', pyarrow.string()),
+                           ('event_code', pyarrow.string()), ('trigger_reason', pyarrow.string()),
+                           ('timestamp', pyarrow.timestamp('ns')), ('response_timestamp', pyarrow.timestamp('ns'))])
+
+def create_dataset(dataset_dir: str) -> None:
+    if os.path.isdir(dataset_dir):
+        shutil.rmtree(dataset_dir)
+    elif os.path.exists(dataset_dir):
+        os.remove(dataset_dir)
+    os.makedirs(dataset_dir)
+
+def partition_dir(dataset_dir: str, device_ID: int) -> str:
+    return os.path.join(dataset_dir, f"{PARTITION_KEY}={device_ID}")
+
+def device_partitions(dataset_dir: str) -> list[tuple[int, str]]:
+    # (device ID, partition directory) of every device in the dataset, in device ID order
+    partitions = []
+    for entry in os.listdir(dataset_dir):
+        key, _, value = entry.partition('=')
+        if key != PARTITION_KEY or not os.path.isdir(os.path.join(dataset_dir, entry)):
+            continue
+        partitions.append((int(value), os.path.join(dataset_dir, entry)))
+    return sorted(partitions)
+
+def text_column(column: pd.Series) -> list[str | None]:
+    # values as the text a CSV would hold, None where missing
+    return [None if pd.isna(value) else str(value) for value in column]
+
+def table_from_columns(columns: dict[str, list], schema: typing.Any) -> typing.Any:
+    pyarrow, _ = import_pyarrow()
+    return pyarrow.Table.from_pydict(columns, schema=schema)
+
+def write_partition_part(dataset_dir: str, device_ID: int, part_number: int, columns: dict[str, list],
+                         schema: typing.Any) -> None:
+    # parts are numbered in write order, so reading a partition's parts by number gives back the rows in order
+    _, parquet = import_pyarrow()
+    device_partition_dir = partition_dir(dataset_dir, device_ID)
+    os.makedirs(device_partition_dir, exist_ok=True)
+    parquet.write_table(table_from_columns(columns, schema),
+                        os.path.join(device_partition_dir, PART_FILE_FORMAT.format(part_number)))
+
+def part_file_number(part_file: str) -> int:
+    return int(part_file[len('part-'):-len('.parquet')])
+
+def read_partition(device_partition_dir: str, columns: list[str] | None = None) -> pd.DataFrame:
+    _, parquet = import_pyarrow()
+    part_files = sorted((part_file for part_file in os.listdir(device_partition_dir) 
+                         if part_file.startswith('part-') and part_file.endswith('.parquet')), 
+                        key=part_file_number)
+    part_file_paths = [os.path.join(device_partition_dir, part_file) for part_file in part_files]
+    if len(part_file_paths) == 0:
+        return pd.DataFrame(columns=columns)
+    tables = [parquet.read_table(part_file_path, columns=columns) for part_file_path in part_file_paths]
+    return pd.concat([table.to_pandas() for table in tables], ignore_index=True)
+
+def table_from_dataframe(df: pd.DataFrame, schema: typing.Any) -> typing.Any:
+    columns = {}
+    for field in schema:
+        if str(field.type).startswith('timestamp'):
+            columns[field.name] = df[field.name].to_numpy(dtype='datetime64[ns]')
+        elif str(field.type) == 'string':
+            columns[field.name] = text_column(df[field.name])
+        else:
+            columns[field.name] = df[field.name].tolist()
+    return table_from_columns(columns, schema)
+
+def write_dataframe(df: pd.DataFrame, file_path: str, schema: typing.Any) -> None:
+    _, parquet = import_pyarrow()
+    parquet.write_table(table_from_dataframe(df, schema), file_path)
+
+def read_dataframe(file_path: str, columns: list[str] | None = None) -> pd.DataFrame:
+    # only the requested columns are read from the file
+    _, parquet = import_pyarrow()
+    return parquet.read_table(file_path, columns=columns).to_pandas()
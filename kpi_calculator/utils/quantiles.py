@@ -0,0 +1,181 @@
+# Copyright 2025, Battelle Energy Alliance, LLC, ALL RIGHTS RESERVED
+
+from __future__ import annotations
+
+import math
+import random
+
+import numpy as np
+
+QUANTILE_BACKENDS = ['exact', 'kll']
+DEFAULT_SKETCH_K = 200
+SKETCH_CAPACITY_DECAY = 2 / 3
+
+
+class ExactQuantiles:
+
+    def __init__(self, values: list[float] | None = None):
+        # every sample is kept, percentiles are the same as numpy's over all of them
+        self._values = [] if values is None else list(values)
+
+    def __len__(self) -> int:
+        return len(self._values)
+
+    def __iter__(self):
+        return iter(self._values)
+
+    def append(self, value: float) -> None:
+        self._values.append(value)
+
+    def extend(self, values: list[float]) -> None:
+        self._values.extend(values)
+
+    def merge(self, other: ExactQuantiles) -> None:
+        if not isinstance(other, ExactQuantiles):
+            raise ValueError(f"Cannot merge {type(other).__name__} samples into exact samples")
+        self._values.extend(other._values)
+
+    def copy(self) -> ExactQuantiles:
+        return ExactQuantiles(self._values)
+
+    def percentiles(self, percentiles: list[float]) -> list[float]:
+        # the samples are turned into an array once for all of the percentiles
+        return np.percentile(np.asarray(self._values), percentiles).tolist()
+
+    def to_state(self) -> dict:
+        return {'backend' : 'exact', 'values' : list(self._values)}
+
+    @classmethod
+    def from_state(cls, state: dict) -> ExactQuantiles:
+        return cls(state['values'])
+
+class KLLSketch:
+
+    def __init__(self, k: int = DEFAULT_SKETCH_K, seed: int = 0):
+        # KLL sketch (Karnin, Lang and Liberty): compactor h holds items of weight 2**h, and a full compactor
+        # sorts its items and promotes every other one to the next level. Memory stays around 3k items and
+        # the rank error shrinks with 1/k, whatever the number of samples
+        if k < 2:
+            raise ValueError(f"Sketch size ({k}) must be at least 2")
+        self.k = k
+        self.count = 0
+        self.compactors = [[]]
+        self._random = random.Random(seed)
+
+    def _capacity(self, level: int) -> int:
+        depth = len(self.compactors) - level - 1
+        return max(2, int(math.ceil(self.k * SKETCH_CAPACITY_DECAY ** depth)))
+
+    def _size(self) -> int:
+        return sum(len(compactor) for compactor in self.compactors)
+
+    def _max_size(self) -> int:
+        return sum(self._capacity(level) for level in range(len(self.compactors)))
+
+    def _compact(self, level: int) -> None:
+        if level + 1 == len(self.compactors):
+            self.compactors.append([])
+        compactor = sorted(self.compactors[level])
+        kept = [compactor.pop()] if len(compactor) % 2 == 1 else []
+        offset = self._random.randint(0, 1)
+        self.compactors[level + 1].extend(compactor[offset::2])
+        self.compactors[level] = kept
+
+    def _compress(self) -> None:
+        while self._size() >= self._max_size():
+            for level in range(len(self.compactors)):
+                if len(self.compactors[level]) >= self._capacity(level):
+                    self._compact(level)
+                    break
+
+    def append(self, value: float) -> None:
+        # only the lowest compactor grows between compressions, so it is the only one checked per sample
+        self.compactors[0].append(value)
+        self.count += 1
+        if len(self.compactors[0]) >= self._capacity(0):
+            self._compress()
+
+    def extend(self, values: list[float]) -> None:
+        for value in values:
+            self.append(value)
+
+    def merge(self, other: KLLSketch) -> None:
+        while len(self.compactors) < len(other.compactors):
+            self.compactors.append([])
+        for level, compactor in enumerate(other.compactors):
+            self.compactors[level].extend(compactor)
+        self.count += other.count
+        self._compress()
+
+    def weighted_items(self) -> tuple[np.ndarray, np.ndarray]:
+        values = [value for compactor in self.compactors for value in compactor]
+        weights = [2 ** level for level, compactor in enumerate(self.compactors) for _ in compactor]
+        return np.asarray(values, dtype=float), np.asarray(weights, dtype=float)
+
+    def to_state(self) -> dict:
+        return {'k' : self.k, 'count' : self.count, 'compactors' : [list(compactor) for compactor in self.compactors]}
+
+    @classmethod
+    def from_state(cls, state: dict) -> KLLSketch:
+        sketch = cls(state['k'])
+        sketch.count = state['count']
+        sketch.compactors = [list(compactor) for compactor in state['compactors']]
+        return sketch
+
+class SketchQuantiles:
+
+    def __init__(self, k: int = DEFAULT_SKETCH_K):
+        # approximate percentiles in bounded memory. Samples are only ever added, so the sketch's rank error
+        # stays that of a single KLL sketch however often it is merged
+        self.k = k
+        self.sketch = KLLSketch(k)
+
+    def __len__(self) -> int:
+        return self.sketch.count
+
+    def append(self, value: float) -> None:
+        self.sketch.append(value)
+
+    def extend(self, values: list[float]) -> None:
+        self.sketch.extend(values)
+
+    def merge(self, other: SketchQuantiles) -> None:
+        if not isinstance(other, SketchQuantiles):
+            raise ValueError(f"Cannot merge {type(other).__name__} samples into sketched samples")
+        self.sketch.merge(other.sketch)
+
+    def copy(self) -> SketchQuantiles:
+        return SketchQuantiles.from_state(self.to_state())
+
+    def percentiles(self, percentiles: list[float]) -> list[float]:
+        # the smallest retained value whose estimated rank reaches each percentile of the samples
+        values, weights = self.sketch.weighted_items()
+        order = np.argsort(values, kind='stable')
+        values = values[order]
+        ranks = np.cumsum(weights[order])
+        quantile_values = []
+        for percentile in percentiles:
+            position = int(np.argmax(ranks >= percentile / 100 * len(self)))
+            quantile_values.append(float(values[position]))
+        return quantile_values
+
+    def to_state(self) -> dict:
+        return {'backend' : 'kll', 'sketch' : self.sketch.to_state()}
+
+    @classmethod
+    def from_state(cls, state: dict) -> SketchQuantiles:
+        quantiles = cls(state['sketch']['k'])
+        quantiles.sketch = KLLSketch.from_state(state['sketch'])
+        return quantiles
+
+def create_quantiles(backend: str = 'exact', k: int = DEFAULT_SKETCH_K) -> ExactQuantiles | SketchQuantiles:
+    if backend not in QUANTILE_BACKENDS:
+        raise ValueError(f"Percentile backend ({backend}) is not one of {QUANTILE_BACKENDS}")
+    if backend == 'kll':
+        return SketchQuantiles(k)
+    return ExactQuantiles()
+
+def quantiles_from_state(state: dict) -> ExactQuantiles | SketchQuantiles:
+    if state['backend'] == 'kll':
+        return SketchQuantiles.from_state(state)
+    return ExactQuantiles.from_state(state)
@@ -1,30 +1,71 @@
 # Copyright 2025, Battelle Energy Alliance, LLC, ALL RIGHTS RESERVED
 
-from datetime import datetime, timedelta
-
-DATETIME_FORMAT = '%Y-%m-%dT%H:%M:%S'
-TIME_ONLY_FORMAT = '%H:%M:%S'
-
-
-def truncate_date(datetime: str) -> str:
-    if '.' in datetime: 
-        return datetime[:-5]
-    elif len(datetime)==11:
-        return datetime[:-3]
-    else: 
-        return datetime[:-1]
-    
-def events_time_diff_seconds(start_timestamp: str, end_timestamp: str) -> timedelta: 
-    datetime_1 = truncate_date(start_timestamp)
-    datetime_2 = truncate_date(end_timestamp)
-    if(len(datetime_1)>8):
-        time_1 = datetime.strptime(datetime_1, DATETIME_FORMAT)
-        time_2 = datetime.strptime(datetime_2, DATETIME_FORMAT)
-    else:
-        time_1 = datetime.strptime(datetime_1, TIME_ONLY_FORMAT)
-        time_2 = datetime.strptime(datetime_2, TIME_ONLY_FORMAT)
-
-    time_diff_seconds = (time_2 - time_1).total_seconds()
-    if time_diff_seconds < 0: 
-        time_diff_seconds *= -1
-    return time_diff_seconds
\ No newline at end of file
+import typing
+
+import numpy as np
+import pandas as pd
+
+# date and time of day, fractional seconds after a '.' (or a ':' as some loggers write milliseconds) and
+# a 'Z' or numeric UTC offset. Timestamps without a date (time-only logs) are put on TIME_ONLY_DATE
+TIMESTAMP_PATTERN = r'^\s*(?:(?P<date>\d{4}-\d{2}-\d{2})[T ])?(?P<time>\d{2}:\d{2}:\d{2})(?:[.:](?P<fraction>\d{1,9}))?' \
+                    r'(?P<zone>Z|[+-]\d{2}:?\d{2})?\s*$'
+TIME_ONLY_DATE = '1900-01-01'
+NORMALIZED_FORMAT = '%Y-%m-%dT%H:%M:%S.%f'
+# format timestamps without a source text (e.g. the transaction interval index) are written out in
+OUTPUT_DATE_FORMAT = NORMALIZED_FORMAT
+ONE_SECOND = np.timedelta64(1, 's')
+
+
+def utc_offsets(zones: pd.Series) -> pd.Series:
+    # 'Z' and missing zones are already UTC
+    offsets = zones.str.replace(':', '', regex=False).fillna('Z')
+    is_numeric_offset = offsets != 'Z'
+    signs = np.where(offsets.str[0] == '-', -1, 1)
+    hours = pd.to_numeric(offsets.where(is_numeric_offset).str[1:3], errors='coerce').fillna(0)
+    minutes = pd.to_numeric(offsets.where(is_numeric_offset).str[3:5], errors='coerce').fillna(0)
+    return pd.to_timedelta(signs * (hours * 60 + minutes), unit='m')
+
+def parse_timestamps(timestamps: typing.Iterable) -> pd.Series:
+    # log timestamps as naive UTC datetime64[ns], NaT for anything that is not a timestamp
+    if isinstance(timestamps, pd.Series) and pd.api.types.is_datetime64_any_dtype(timestamps):
+        return timestamps
+    timestamps = pd.Series(timestamps, dtype=object)
+    is_present = timestamps.notna()
+    timestamp_strings = timestamps[is_present].astype(str)
+    # each distinct timestamp is parsed once and mapped back onto the column
+    unique_timestamps = pd.Series(timestamp_strings.unique(), dtype=object)
+    parts = unique_timestamps.str.extract(TIMESTAMP_PATTERN)
+    normalized_timestamps = parts['date'].fillna(TIME_ONLY_DATE) + 'T' + parts['time'] + '.' + parts['fraction'].fillna('0')
+    parsed_timestamps = pd.to_datetime(normalized_timestamps, format=NORMALIZED_FORMAT, errors='coerce') - \
+                        utc_offsets(parts['zone'])
+    lookup = pd.Series(parsed_timestamps.to_numpy(), index=unique_timestamps.to_numpy())
+    parsed_column = pd.Series(pd.NaT, index=timestamps.index, dtype='datetime64[ns]')
+    parsed_column[is_present] = timestamp_strings.map(lookup).to_numpy(dtype='datetime64[ns]')
+    return parsed_column
+
+def source_text_lookup(source_timestamps: pd.Series, timestamps: pd.Series) -> pd.Series:
+    # the text every parsed timestamp was logged as (the first one, should a log write one instant two ways)
+    is_parsed = timestamps.notna().to_numpy()
+    lookup = pd.Series(source_timestamps.to_numpy(dtype=object)[is_parsed],
+                       index=timestamps.to_numpy(dtype='datetime64[ns]')[is_parsed])
+    return lookup[~lookup.index.duplicated(keep='first')]
+
+def as_source_text(timestamps: pd.Series, lookup: pd.Series) -> pd.Series:
+    return timestamps.map(lookup)
+
+def parse_timestamp(timestamp: typing.Any) -> pd.Timestamp:
+    return parse_timestamps([timestamp]).iloc[0]
+
+def events_time_diff_seconds(start_timestamp: typing.Any, end_timestamp: typing.Any) -> float:
+    if isinstance(start_timestamp, str):
+        start_timestamp = parse_timestamp(start_timestamp)
+    if isinstance(end_timestamp, str):
+        end_timestamp = parse_timestamp(end_timestamp)
+    if pd.isna(start_timestamp) or pd.isna(end_timestamp):
+        return np.nan
+    # nanosecond differences divided by one second, the same arithmetic as events_time_diffs_seconds
+    return abs(pd.Timestamp(end_timestamp) - pd.Timestamp(start_timestamp)) / ONE_SECOND
+
+def events_time_diffs_seconds(start_timestamps: np.ndarray, end_timestamps: np.ndarray) -> np.ndarray:
+    time_diffs = np.asarray(end_timestamps, dtype='datetime64[ns]') - np.asarray(start_timestamps, dtype='datetime64[ns]')
+    return np.abs(time_diffs) / ONE_SECOND
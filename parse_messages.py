@@ -2,25 +2,31 @@
 
 import os
 import sys
+import bisect
+import argparse
 import pandas as pd 
-import json
+import numpy as np
 import warnings
 
 sys.path.append("..")
 
 from datetime import datetime, timedelta
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterator
 from tqdm import tqdm
 
-from kpi_calculator.log_parser.ocpp_2_0_1 import message as message_structure
+from kpi_calculator.log_parser.ocpp_2_0_1 import message as message_structure, message_projection
 from kpi_calculator.log_parser.ocpp_2_0_1.status_event import type as event_type, code
-from kpi_calculator.utils import time_ops
+from kpi_calculator.utils import device_cache, json_ops, message_writers, parquet_ops, time_ops
 
 KPI_CALC_REPO_PATH = 'insert/path/to/repo/here'
 
 AUTHORIZE_TIME_THRESHOLD_SECONDS = timedelta(minutes=5).total_seconds()
 
-GENERAL_EVENT_TYPES = [event_type.AUTHORIZE_RESPONSE, event_type.REQUEST_START_TRANSACTION_RESPONSE, 
-                        event_type.STATUS_NOTIFICATION_REQUEST, event_type.TRANSACTION_EVENT_REQUEST]
+GENERAL_EVENT_TYPES = event_type.GENERAL_EVENT_TYPES
+
+FORMATS = ['csv', 'parquet']
 
 def has_relevant_event(message: list) -> bool:
     #print(message[0])
@@ -37,16 +43,15 @@ def has_relevant_event(message: list) -> bool:
         return True
     return False
     
-def message_formatted_as_response(row: pd.Series) -> bool:
-    if type(row['message']) is not list:
+def formatted_as_response(message: list) -> bool:
+    if type(message) is not list:
         return False   
-    if len(row['message']) < message_structure.RESPONSE_INTERIOR_MESSAGE_INDEX + 1:
+    if len(message) < message_structure.RESPONSE_INTERIOR_MESSAGE_INDEX + 1:
         return False
-    message = row['message'][message_structure.RESPONSE_INTERIOR_MESSAGE_INDEX]
-    if type(message) is not dict: 
+    if type(message[message_structure.RESPONSE_INTERIOR_MESSAGE_INDEX]) is not dict: 
         return False 
     return True 
-    
+
 def is_valid_non_request_response(message: dict) -> bool: 
     if 'idTokenInfo' in message.keys():
         return True
@@ -68,105 +73,188 @@ def is_request_start_response_rejected(message: dict) -> bool:
         return True
     return False
        
-def get_response(message_ID: int, timestamp: str, original_df: pd.DataFrame) -> tuple[str, str, str]:
-    df_with_message_ID = original_df[original_df['message_ID'] == message_ID]
-    df_with_message_ID = df_with_message_ID.sort_values(by=['timestamp'])
-    # removing all records with timestamps before the message will make it so
-    # the transaction IDs for Request Starts pair correctly (i.e. chronologically)
-    no_events_before_timestamp_df = df_with_message_ID[df_with_message_ID['timestamp'] >= timestamp]
-    for _, row in no_events_before_timestamp_df.iterrows(): 
-        if not message_formatted_as_response(row):
+def response_info(message: list) -> tuple[str, str] | None: 
+    if not formatted_as_response(message):
+        return None
+    message = message[message_structure.RESPONSE_INTERIOR_MESSAGE_INDEX]
+    if is_valid_non_request_response(message):
+        return message['idTokenInfo']['status'], pd.NA
+    if is_request_start_response_accepted(message):
+        return message['status'], message['transactionId']
+    if is_request_start_response_rejected(message):
+        return message['status'], pd.NA
+    return None
+
+def build_response_index(original_df: pd.DataFrame) -> dict[str, tuple[list[np.datetime64], list[tuple[str, str]]]]: 
+    # message_ID -> (sorted timestamps, response info) holding only the rows that are usable responses, 
+    # built once per device so every lookup is a binary search instead of a scan of the whole frame
+    responses = {}
+    for message_ID, timestamp, message in zip(original_df['message_ID'], original_df['timestamp'].to_numpy(), 
+                                              original_df['message']): 
+        if pd.isna(message_ID) or pd.isna(timestamp): 
             continue
-        message = row['message'][message_structure.RESPONSE_INTERIOR_MESSAGE_INDEX]
-        if is_valid_non_request_response(message):
-            return message['idTokenInfo']['status'], pd.NA, row['timestamp']
-        if is_request_start_response_accepted(message):
-            return message['status'], message['transactionId'], row['timestamp']
-        if is_request_start_response_rejected(message):
-            return message['status'], pd.NA, row['timestamp']
-    return 'Unknown', pd.NA, pd.NA
+        info = response_info(message)
+        if info is None: 
+            continue
+        responses.setdefault(message_ID, []).append((timestamp, info))
+    response_index = {}
+    for message_ID, message_responses in responses.items(): 
+        message_responses.sort(key=lambda response: response[0])
+        response_index[message_ID] = ([timestamp for timestamp, _ in message_responses], 
+                                      [info for _, info in message_responses])
+    return response_index
+       
+def get_response(message_ID: int, timestamp: np.datetime64, response_index: dict) -> tuple[str, str, np.datetime64]:
+    if pd.isna(message_ID) or message_ID not in response_index: 
+        return 'Unknown', pd.NA, pd.NA
+    response_timestamps, response_infos = response_index[message_ID]
+    # skipping all responses with timestamps before the message will make it so
+    # the transaction IDs for Request Starts pair correctly (i.e. chronologically)
+    response_position = bisect.bisect_left(response_timestamps, timestamp)
+    if response_position == len(response_timestamps): 
+        return 'Unknown', pd.NA, pd.NA
+    status, transaction_ID = response_infos[response_position]
+    return status, transaction_ID, response_timestamps[response_position]
         
-def get_message_info(message: dict, original_df: pd.DataFrame, 
-                                      message_ID: int, timestamp: str,) -> tuple[str, str, str]: 
-    if message[message_structure.EVENT_TYPE_INDEX] == event_type.AUTHORIZE_RESPONSE or \
-       message[message_structure.EVENT_TYPE_INDEX] == event_type.REQUEST_START_TRANSACTION_RESPONSE: 
-        return get_response(message_ID, timestamp, original_df)
-    if 'transactionInfo' in message[message_structure.INTERIOR_MESSAGE_INDEX].keys():
-        if 'stoppedReason' in message[message_structure.INTERIOR_MESSAGE_INDEX]['transactionInfo'].keys(): 
-            return 'Ended', message[message_structure.INTERIOR_MESSAGE_INDEX]['transactionInfo']['transactionId'], pd.NA
-        if message[message_structure.INTERIOR_MESSAGE_INDEX]['eventType'] == 'Started': 
-            return 'Started', message[message_structure.INTERIOR_MESSAGE_INDEX]['transactionInfo']['transactionId'], pd.NA      
-    if message[message_structure.EVENT_TYPE_INDEX] == event_type.STATUS_NOTIFICATION_REQUEST:
-        return message[message_structure.INTERIOR_MESSAGE_INDEX]['connectorStatus'], pd.NA, pd.NA
-    if message[message_structure.INTERIOR_MESSAGE_INDEX]['eventType'] == 'Updated' and \
-        'transactionInfo' in message[message_structure.INTERIOR_MESSAGE_INDEX].keys(): 
-        if 'chargingState' not in message[message_structure.INTERIOR_MESSAGE_INDEX]['transactionInfo']:
-            return 'remove', pd.NA, pd.NA
-        return message[message_structure.INTERIOR_MESSAGE_INDEX]['transactionInfo']['chargingState'], \
-               message[message_structure.INTERIOR_MESSAGE_INDEX]['transactionInfo']['transactionId'], \
-               pd.NA
-    return message[message_structure.INTERIOR_MESSAGE_INDEX]['eventType'], pd.NA, pd.NA
-
-def get_event_type(message: dict) -> str:
-    return message[message_structure.EVENT_TYPE_INDEX]
-
-def get_general_attribute(message: dict, attribute: str) -> str: 
-    if attribute in message[message_structure.INTERIOR_MESSAGE_INDEX].keys(): 
-        return message[message_structure.INTERIOR_MESSAGE_INDEX][attribute]
-    return pd.NA
-
-def get_authorized_start_message_info(message:dict, message_ID: str, timestamp: str, event_code: str, original_df: pd.DataFrame) -> str: 
-    if event_code == 'Ended': 
-        return message[message_structure.INTERIOR_MESSAGE_INDEX]['transactionInfo']['stoppedReason'], pd.NA
-    trigger_reason = get_general_attribute(message, 'triggerReason')
-    response_timestamp = pd.NA
-    if event_code == 'Started' and trigger_reason == 'Authorized':
-        trigger_reason, _, response_timestamp = get_response(message_ID, timestamp, original_df)
-        if trigger_reason == 'Unknown':
-            trigger_reason = 'Rejected'
-    return trigger_reason, response_timestamp
-
 def get_message_ID(message: list) -> str: 
     if type(message) is not list: 
         return pd.NA
     else: 
         return message[message_structure.MESSAGE_ID_INDEX]
 
+def interior_message(message: list) -> dict: 
+    if len(message) < message_structure.INTERIOR_MESSAGE_INDEX + 1: 
+        return {}
+    if type(message[message_structure.INTERIOR_MESSAGE_INDEX]) is not dict: 
+        return {}
+    return message[message_structure.INTERIOR_MESSAGE_INDEX]
+
 def get_ID_token(message: list) -> str: 
     if type(message) is not list: 
         return pd.NA 
-    if len(message) < message_structure.INTERIOR_MESSAGE_INDEX + 1:
-        return pd.NA
-    interior_message = message[message_structure.INTERIOR_MESSAGE_INDEX]
-    if 'idToken'not in interior_message.keys(): 
+    # CALLERRORs carry a description string where a CALL has its payload
+    interior = interior_message(message)
+    if 'idToken' not in interior.keys() or type(interior['idToken']) is not dict: 
         return pd.NA
-    if 'idToken' not in interior_message['idToken'].keys():
+    if 'idToken' not in interior['idToken'].keys():
         return pd.NA
-    return interior_message['idToken']['idToken']
-
-def add_status_event(df_attributes: tuple, row: pd.Series, original_df: pd.DataFrame) -> tuple[list, list]:
-    device_IDs, ID_tokens, transaction_IDs, event_types, event_codes, trigger_reasons, \
-        timestamps, response_timestamps = df_attributes
-    message = row['message']
-    message_ID = row['message_ID']
-    device_IDs.append(row['device_ID'])
-    ID_tokens.append(row['ID_token'])
-    event_types.append(get_event_type(message))
-    event_code, transaction_ID, response_timestamp = get_message_info(message, original_df,
-                                                                      message_ID, row['timestamp'])
-    # always add a response timestamp even if it's pd.NA
-    response_timestamps.append(response_timestamp)
-    event_codes.append(event_code)
-    transaction_IDs.append(transaction_ID)
-    trigger_reason, response_timestamp = get_authorized_start_message_info(message, message_ID, row['timestamp'], \
-                                                                            event_code, original_df)
-    # modify final value if the second response timestamp isn't pd.NA
-    if not pd.isna(response_timestamp) and pd.isna(response_timestamps[-1]): 
-        response_timestamps[-1] = response_timestamp   
-    trigger_reasons.append(trigger_reason)
-    timestamps.append(row['timestamp'])
-    return device_IDs, ID_tokens, transaction_IDs, event_types, \
-            event_codes, trigger_reasons, timestamps, response_timestamps
+    return interior['idToken']['idToken']
+
+def attribute_column(dicts: list[dict], attribute: str) -> np.ndarray: 
+    # missing attributes are None so the columns can be compared elementwise
+    column = np.empty(len(dicts), dtype=object)
+    column[:] = [attributes.get(attribute) for attributes in dicts]
+    return column
+
+def presence_column(dicts: list[dict], attribute: str) -> np.ndarray: 
+    return np.array([attribute in attributes for attributes in dicts], dtype=bool)
+
+def extract_event_columns(relevant_df: pd.DataFrame) -> dict[str, np.ndarray]: 
+    # every field the event rules read, pulled out of the decoded messages in one pass per field
+    messages = relevant_df['message'].tolist()
+    interiors = [interior_message(message) for message in messages]
+    transaction_infos = [interior['transactionInfo'] if type(interior.get('transactionInfo')) is dict else {} 
+                         for interior in interiors]
+    actions = np.empty(len(messages), dtype=object)
+    actions[:] = [message[message_structure.EVENT_TYPE_INDEX] for message in messages]
+    return {'action': actions, 
+            'event_type': attribute_column(interiors, 'eventType'), 
+            'trigger_reason': attribute_column(interiors, 'triggerReason'), 
+            'connector_status': attribute_column(interiors, 'connectorStatus'), 
+            'has_transaction_info': presence_column(interiors, 'transactionInfo'), 
+            'has_stopped_reason': presence_column(transaction_infos, 'stoppedReason'), 
+            'has_charging_state': presence_column(transaction_infos, 'chargingState'), 
+            'stopped_reason': attribute_column(transaction_infos, 'stoppedReason'), 
+            'charging_state': attribute_column(transaction_infos, 'chargingState'), 
+            'transaction_ID': attribute_column(transaction_infos, 'transactionId')}
+
+def lookup_responses(message_IDs: np.ndarray, timestamps: np.ndarray, 
+                     response_index: dict) -> tuple[np.ndarray, np.ndarray, np.ndarray]: 
+    statuses = np.empty(len(message_IDs), dtype=object)
+    transaction_IDs = np.empty(len(message_IDs), dtype=object)
+    response_timestamps = np.empty(len(message_IDs), dtype=object)
+    for position, (message_ID, timestamp) in enumerate(zip(message_IDs, timestamps)): 
+        statuses[position], transaction_IDs[position], response_timestamps[position] = \
+            get_response(message_ID, timestamp, response_index)
+    return statuses, transaction_IDs, response_timestamps
+
+def event_codes_and_transaction_IDs(columns: dict[str, np.ndarray], message_IDs: np.ndarray, timestamps: np.ndarray, 
+                                    response_index: dict) -> tuple[np.ndarray, np.ndarray, np.ndarray]: 
+    # the rules, first match wins: an Authorize or RequestStartTransaction response takes its status and 
+    # transaction ID from the response index; a transaction event with a stopped reason is Ended and one of 
+    # eventType Started is Started, both with their transaction ID; a StatusNotification is its connector status; 
+    # an Updated transaction event is its charging state with its transaction ID, or 'remove' without one; 
+    # anything else is its eventType
+    size = len(message_IDs)
+    event_codes = columns['event_type'].copy()
+    transaction_IDs = np.full(size, None, dtype=object)
+    response_timestamps = np.full(size, None, dtype=object)
+    is_response_event = (columns['action'] == event_type.AUTHORIZE_RESPONSE) | \
+                        (columns['action'] == event_type.REQUEST_START_TRANSACTION_RESPONSE)
+    is_ended = ~is_response_event & columns['has_transaction_info'] & columns['has_stopped_reason']
+    is_started = ~is_response_event & columns['has_transaction_info'] & ~columns['has_stopped_reason'] & \
+                 (columns['event_type'] == code.STARTED)
+    is_undecided = ~(is_response_event | is_ended | is_started)
+    is_status_notification = is_undecided & (columns['action'] == event_type.STATUS_NOTIFICATION_REQUEST)
+    is_updated = is_undecided & ~is_status_notification & (columns['event_type'] == 'Updated') & \
+                 columns['has_transaction_info']
+    is_charging_state = is_updated & columns['has_charging_state']
+    event_codes[is_ended] = code.ENDED
+    event_codes[is_started] = code.STARTED
+    event_codes[is_status_notification] = columns['connector_status'][is_status_notification]
+    event_codes[is_updated & ~columns['has_charging_state']] = 'remove'
+    event_codes[is_charging_state] = columns['charging_state'][is_charging_state]
+    has_transaction_ID = is_ended | is_started | is_charging_state
+    transaction_IDs[has_transaction_ID] = columns['transaction_ID'][has_transaction_ID]
+    event_codes[is_response_event], transaction_IDs[is_response_event], response_timestamps[is_response_event] = \
+        lookup_responses(message_IDs[is_response_event], timestamps[is_response_event], response_index)
+    return event_codes, transaction_IDs, response_timestamps
+
+def trigger_reasons_and_response_timestamps(columns: dict[str, np.ndarray], event_codes: np.ndarray, 
+                                            message_IDs: np.ndarray, timestamps: np.ndarray, 
+                                            response_timestamps: np.ndarray, 
+                                            response_index: dict) -> tuple[np.ndarray, np.ndarray]: 
+    # an Ended event's trigger reason is its stopped reason. A Started event triggered by Authorized takes the 
+    # status of its response instead (Rejected when there is none) and that response's timestamp
+    trigger_reasons = columns['trigger_reason'].copy()
+    is_ended = event_codes == code.ENDED
+    trigger_reasons[is_ended] = columns['stopped_reason'][is_ended]
+    is_authorized_start = ~is_ended & (event_codes == code.STARTED) & (trigger_reasons == 'Authorized')
+    statuses, _, authorized_response_timestamps = lookup_responses(message_IDs[is_authorized_start], 
+                                                                   timestamps[is_authorized_start], response_index)
+    statuses[statuses == 'Unknown'] = code.REJECTED
+    trigger_reasons[is_authorized_start] = statuses
+    response_timestamps = response_timestamps.copy()
+    # the authorized start's response timestamp only fills in a missing one
+    for position, response_timestamp in zip(np.flatnonzero(is_authorized_start), authorized_response_timestamps): 
+        if pd.isna(response_timestamps[position]): 
+            response_timestamps[position] = response_timestamp
+    return trigger_reasons, response_timestamps
+
+def missing_as_NA(column: np.ndarray) -> list: 
+    return [pd.NA if value is None else value for value in column]
+
+def missing_as_NaT(column: np.ndarray) -> np.ndarray: 
+    return np.array([np.datetime64('NaT') if pd.isna(value) else value for value in column], dtype='datetime64[ns]')
+
+def create_formatted_dataframe(relevant_df: pd.DataFrame, response_index: dict) -> pd.DataFrame: 
+    columns = extract_event_columns(relevant_df)
+    message_IDs = relevant_df['message_ID'].to_numpy(dtype=object)
+    timestamps = relevant_df['timestamp'].to_numpy(dtype='datetime64[ns]')
+    event_codes, transaction_IDs, response_timestamps = event_codes_and_transaction_IDs(columns, message_IDs, timestamps, 
+                                                                                       response_index)
+    trigger_reasons, response_timestamps = trigger_reasons_and_response_timestamps(columns, event_codes, message_IDs, 
+                                                                                   timestamps, response_timestamps, 
+                                                                                   response_index)
+    formatted_df = pd.DataFrame(data={'device_ID': relevant_df['device_ID'].tolist(), 
+                                      'ID_token': relevant_df['ID_token'].tolist(), 
+                                      'transaction_ID': missing_as_NA(transaction_IDs), 
+                                      'event_type': missing_as_NA(columns['action']), 
+                                      'event_code': missing_as_NA(event_codes), 
+                                      'trigger_reason': missing_as_NA(trigger_reasons), 
+                                      'timestamp': timestamps, 
+                                      'response_timestamp': missing_as_NaT(response_timestamps)})
+    return formatted_df
 
 def surrounding_events_have_same_ID(df: pd.DataFrame) -> bool: 
     if df.iloc[0]['connector_ID'] == df.iloc[2]['connector_ID']:
@@ -239,96 +327,208 @@ def assign_transaction_IDs_temporally(index: int, formatted_data_df: pd.DataFram
         return transaction_ID
     return pd.NA
 
-def assign_transaction_IDs_credentially(index: int, formatted_data_df: pd.DataFrame) -> str: 
-    row = formatted_data_df.loc[index]
-    if pd.isna(row['ID_token']):
-        return -1
-    if row['event_type'] == event_type.REQUEST_START_TRANSACTION_RESPONSE: 
-        return row['transaction_ID']
-    df_with_token_ID = formatted_data_df[formatted_data_df['ID_token'] == row['ID_token']]
-    df_with_token_ID = df_with_token_ID.sort_values(by=['timestamp'])
-    no_events_before_timestamp_df = df_with_token_ID[df_with_token_ID['timestamp'] > row['timestamp']]
-    for _, matching_row in no_events_before_timestamp_df.iterrows(): 
-        time_df = pd.concat([row, matching_row], axis=1).T
-        time_diff_seconds = time_ops.events_time_diff_seconds(time_df.iloc[0]['timestamp'], time_df.iloc[1]['timestamp'])
-        if (time_diff_seconds < AUTHORIZE_TIME_THRESHOLD_SECONDS) and matching_row['event_code'] == 'Started': 
-            return matching_row['transaction_ID']
-    only_events_before_timestamp_df = df_with_token_ID[df_with_token_ID['timestamp'] < row['timestamp']]
-    for _, matching_row in only_events_before_timestamp_df.iterrows(): 
-        time_df = pd.concat([row, matching_row], axis=1).T
-        time_diff_seconds = time_ops.events_time_diff_seconds(time_df.iloc[0]['timestamp'], time_df.iloc[1]['timestamp'])
-        if (time_diff_seconds < AUTHORIZE_TIME_THRESHOLD_SECONDS) and \
-            matching_row['event_code'] == 'Started': 
-            return -2
-    return -1
+def match_authorizes_to_starts(authorize_timestamps: np.ndarray, start_timestamps: np.ndarray, 
+                               start_transaction_IDs: np.ndarray) -> list: 
+    # all arrays belong to one ID token and the start arrays are sorted by timestamp. The first start after 
+    # an authorize is the closest one ahead of it, so only that one has to be checked against the threshold;
+    # the same goes for the last start before it when looking backwards
+    next_start_positions = np.searchsorted(start_timestamps, authorize_timestamps, side='right')
+    previous_start_positions = np.searchsorted(start_timestamps, authorize_timestamps, side='left') - 1
+    has_next_start = next_start_positions < len(start_timestamps)
+    has_previous_start = previous_start_positions >= 0
+    next_start_positions = np.minimum(next_start_positions, len(start_timestamps) - 1)
+    previous_start_positions = np.maximum(previous_start_positions, 0)
+    next_start_in_threshold = has_next_start & \
+        (time_ops.events_time_diffs_seconds(authorize_timestamps, start_timestamps[next_start_positions]) < 
+         AUTHORIZE_TIME_THRESHOLD_SECONDS)
+    previous_start_in_threshold = has_previous_start & \
+        (time_ops.events_time_diffs_seconds(start_timestamps[previous_start_positions], authorize_timestamps) < 
+         AUTHORIZE_TIME_THRESHOLD_SECONDS)
+    return [start_transaction_IDs[next_start_position] if next_start else (-2 if previous_start else -1) 
+            for next_start_position, next_start, previous_start in zip(next_start_positions, next_start_in_threshold, 
+                                                                       previous_start_in_threshold)]
 
-def get_transaction_IDs_for_authorizes(formatted_data_df: pd.Series) -> pd.Series: 
+def assign_transaction_IDs_credentially(formatted_data_df: pd.DataFrame) -> pd.Series: 
+    # transaction ID of the Started event with the same ID token within the threshold after each Authorize, 
+    # -2 if there is only one within the threshold before it and -1 if there is none (or no ID token)
     authorize_df = formatted_data_df[formatted_data_df['event_type'] == event_type.AUTHORIZE_RESPONSE]
-    formatted_data_df['authorize_transaction_ID'] = authorize_df.index.to_series().apply(assign_transaction_IDs_credentially, 
-                                                                        args=(formatted_data_df,))
+    authorize_transaction_IDs = dict.fromkeys(authorize_df.index, -1)
+    authorize_df = authorize_df[~pd.isna(authorize_df['ID_token'])]
+    starts_df = formatted_data_df[(formatted_data_df['event_code'] == code.STARTED) & 
+                                  ~pd.isna(formatted_data_df['ID_token'])]
+    if authorize_df.empty or starts_df.empty: 
+        return pd.Series(authorize_transaction_IDs, dtype=None if authorize_transaction_IDs else object)
+    starts_df = starts_df.sort_values(by=['timestamp'], kind='stable')
+    starts_by_token = starts_df.groupby('ID_token', sort=False)
+    for ID_token, token_authorize_df in authorize_df.groupby('ID_token', sort=False): 
+        if ID_token not in starts_by_token.groups: 
+            continue
+        token_starts_df = starts_by_token.get_group(ID_token)
+        matched_transaction_IDs = match_authorizes_to_starts(token_authorize_df['timestamp'].to_numpy(), 
+                                                             token_starts_df['timestamp'].to_numpy(), 
+                                                             token_starts_df['transaction_ID'].to_numpy())
+        authorize_transaction_IDs.update(zip(token_authorize_df.index, matched_transaction_IDs))
+    # dtype is inferred from the values, as the per-row apply this replaces did
+    return pd.Series(authorize_transaction_IDs, dtype=None if authorize_transaction_IDs else object)
+
+def get_transaction_IDs_for_authorizes(formatted_data_df: pd.Series) -> pd.Series: 
+    formatted_data_df['authorize_transaction_ID'] = assign_transaction_IDs_credentially(formatted_data_df)
     formatted_data_df.loc[formatted_data_df['event_type'] == event_type.AUTHORIZE_RESPONSE, 'transaction_ID'] = \
         formatted_data_df[formatted_data_df['event_type'] == event_type.AUTHORIZE_RESPONSE]['authorize_transaction_ID']
     formatted_data_df = formatted_data_df.drop(['authorize_transaction_ID'], axis=1)
     return formatted_data_df
 
-def initialize_formatted_data() -> tuple:
-    device_IDs = []
-    ID_tokens = []
-    transaction_IDs = []
-    event_types = []
-    event_codes = []
-    trigger_reasons = []
-    timestamps = []
-    response_timestamps = []
-    return device_IDs, ID_tokens, transaction_IDs, event_types, event_codes, \
-            trigger_reasons, timestamps, response_timestamps
-
-def create_formatted_dataframe(formatted_data: tuple): 
-    device_IDs, ID_tokens, transaction_IDs, event_types, \
-        event_codes, trigger_reasons, timestamps, response_timestamps = formatted_data
-    formatted_df = pd.DataFrame(data={'device_ID': device_IDs, 'ID_token': ID_tokens, 
-                                      'transaction_ID': transaction_IDs, 
-                                      'event_type': event_types, 'event_code': event_codes, 
-                                      'trigger_reason': trigger_reasons, 'timestamp': timestamps, 
-                                      'response_timestamp': response_timestamps})
-    return formatted_df
-
-def format_data(df: pd.DataFrame) -> pd.DataFrame:
-    formatted_attributes = initialize_formatted_data()
-    for _, row in df.iterrows():
-        if has_relevant_event(row['message']):
-            add_status_event(formatted_attributes, row, df)
-    formatted_df = create_formatted_dataframe(formatted_attributes)
+def format_data(df: pd.DataFrame, keep_row_index: bool = False) -> pd.DataFrame:
+    # keep_row_index labels every formatted row with the index of the raw row it came from
+    response_index = build_response_index(df)
+    relevant_df = df[[has_relevant_event(message) for message in df['message']]]
+    formatted_df = create_formatted_dataframe(relevant_df, response_index)
+    formatted_df.index = relevant_df.index
     formatted_df = formatted_df[formatted_df['event_code'] != 'remove']
-    formatted_df = formatted_df.sort_values(by=['timestamp'])
-    formatted_df = formatted_df.reset_index(drop=True)
+    formatted_df = formatted_df.sort_values(by=['timestamp'], kind='stable')
+    if not keep_row_index: 
+        formatted_df = formatted_df.reset_index(drop=True)
     formatted_df = get_transaction_IDs_for_authorizes(formatted_df)
     formatted_df = formatted_df[formatted_df['transaction_ID'] != -2]
     return formatted_df 
 
-def read_as_json(s: str) -> dict:
+MALFORMED_JSON_WARNING = "Warning - Potentially malformed OCPP JSON. Verify that OCPP has properly delimited message values"
+
+def read_as_json(s: str, decoder: json_ops.JSONDecoder | None = None, project: bool = False) -> dict:
     if pd.isna(s): 
         return s
+    if decoder is None: 
+        decoder = json_ops.JSONDecoder()
     try: 
-        string_json = json.loads(str(s))
+        if project: 
+            string_json = message_projection.loads_projected(str(s), decoder)
+        else: 
+            string_json = decoder.loads(str(s))
     except ValueError: 
-        warnings.warn("Warning - Potentially malformed OCPP JSON. Verify that OCPP has properly delimited message values", UserWarning)
+        warnings.warn(MALFORMED_JSON_WARNING, UserWarning)
         return pd.NA
     return string_json #TODO Change this to just return the string_json(only the message is expected from external) json.loads(string_json['msg'])
 
+def read_messages_as_json(messages: pd.Series, decoder: json_ops.JSONDecoder, project: bool = False) -> pd.Series: 
+    # one decoder is shared by the whole column instead of being looked up for every cell
+    decoded_messages = np.empty(len(messages), dtype=object)
+    decoded_messages[:] = [read_as_json(message, decoder, project) for message in messages.tolist()]
+    return pd.Series(decoded_messages, index=messages.index, name=messages.name)
+
+def device_log_sources(input_format: str, split_log_dir: str, cleaned_dataset_dir: str) -> list[str]: 
+    # a parquet dataset is already partitioned by device, so its partitions take the place of the split logs
+    if input_format == 'parquet': 
+        return [device_partition_dir for _, device_partition_dir in parquet_ops.device_partitions(cleaned_dataset_dir)]
+    return [os.path.join(split_log_dir, split_log) for split_log in os.listdir(split_log_dir)]
+
+def read_device_log(source: str, input_format: str) -> pd.DataFrame: 
+    if input_format == 'parquet': 
+        return parquet_ops.read_partition(source)
+    return pd.read_csv(source)
+
+def parse_device_log(raw_df: pd.DataFrame, decoder: json_ops.JSONDecoder, project: bool = False, 
+                     keep_row_index: bool = False, source_timestamps: bool = False) -> pd.DataFrame: 
+    # timestamps are parsed once here, every later comparison and difference works on datetime64 values. 
+    # With source_timestamps they are put back as the text they were logged as once the device is parsed
+    timestamp_text = raw_df['timestamp']
+    raw_df['timestamp'] = time_ops.parse_timestamps(timestamp_text)
+    raw_df['message'] = read_messages_as_json(raw_df['message'], decoder, project)
+    raw_df['message_ID'] = raw_df['message'].apply(get_message_ID)
+    raw_df['ID_token'] = raw_df['message'].apply(get_ID_token)
+    formatted_df = format_data(raw_df, keep_row_index)
+    if source_timestamps: 
+        lookup = time_ops.source_text_lookup(timestamp_text, raw_df['timestamp'])
+        for column in ['timestamp', 'response_timestamp']: 
+            formatted_df[column] = time_ops.as_source_text(formatted_df[column], lookup)
+    return formatted_df
+
+def parse_device_source(source: str, input_format: str, json_backend: str, project: bool = False) -> pd.DataFrame: 
+    # the decoder is created in the process that uses it, only the backend name is sent to the workers
+    return parse_device_log(read_device_log(source, input_format), json_ops.get_decoder(json_backend), project, 
+                            source_timestamps=input_format == 'csv')
+
+def parse_device_sources(sources: list[str], input_format: str, json_backend: str, project: bool = False, 
+                         workers: int = 1) -> Iterator[pd.DataFrame]: 
+    # every device is parsed on its own, so the devices are spread over the pool and their results are 
+    # yielded in source order as they become available, whichever worker finishes first. The csv output keeps 
+    # the timestamps as they were logged, the parquet output stores them as timestamps
+    if workers < 1: 
+        raise ValueError(f"Number of workers ({workers}) must be at least 1")
+    if workers == 1: 
+        decoder = json_ops.get_decoder(json_backend)
+        for source in sources: 
+            yield parse_device_log(read_device_log(source, input_format), decoder, project, 
+                                   source_timestamps=input_format == 'csv')
+        return
+    # only a bounded number of devices are in flight, so parsed devices waiting on an earlier, slower device 
+    # do not pile up in memory
+    pending_sources = deque(sources)
+    max_pending_devices = 2 * workers
+    pending_devices = deque()
+    with ProcessPoolExecutor(max_workers=workers) as executor: 
+        while pending_sources or pending_devices: 
+            while pending_sources and len(pending_devices) < max_pending_devices: 
+                pending_devices.append(executor.submit(parse_device_source, pending_sources.popleft(), input_format, 
+                                                       json_backend, project))
+            yield pending_devices.popleft().result()
+
+def parse_changed_device_sources(sources: list[str], input_format: str, json_backend: str, cache_dir: str, 
+                                 project: bool = False, workers: int = 1) -> Iterator[pd.DataFrame]: 
+    # only the devices whose logs changed since they were cached are parsed, each one is cached as soon as it 
+    # is done, and every device's parsed data is then read back from the cache in source order
+    parsed_device_cache = device_cache.DeviceCache(cache_dir, input_format)
+    parsed_device_cache.prune(sources)
+    changed_sources = [source for source in sources if not parsed_device_cache.is_current(source)]
+    print(f"{len(sources) - len(changed_sources)} of {len(sources)} devices are unchanged and read from the cache")
+    for source, new_df in zip(changed_sources, tqdm(parse_device_sources(changed_sources, input_format, json_backend, 
+                                                                         project, workers), 
+                                                    total=len(changed_sources))): 
+        parsed_device_cache.store(source, new_df)
+    parsed_device_cache.compact()
+    for source in sources: 
+        yield parsed_device_cache.load(source)
+
 if __name__ == "__main__": 
+    arg_parser = argparse.ArgumentParser(prog='interim-kpi-parser')
+    arg_parser.add_argument('--json_backend', choices=json_ops.JSON_BACKENDS, default='auto', 
+                            help='JSON decoder for the OCPP messages, auto uses orjson or pysimdjson when installed and the standard library otherwise')
+    arg_parser.add_argument('--project', action='store_true', 
+                            help='only decode the OCPP fields the KPIs use and skip decoding messages of unrelated actions')
+    arg_parser.add_argument('--format', choices=FORMATS, default='csv', 
+                            help='read the split csv logs and write a csv file, or read the parquet dataset written by '
+                                 'reader.py --format parquet one device partition at a time and write a parquet file')
+    arg_parser.add_argument('--workers', '-w', type=int, default=1, 
+                            help='number of processes used to parse the device logs (each device is parsed by one process)')
+    arg_parser.add_argument('--incremental', action='store_true', 
+                            help='cache every device\'s parsed data and only parse the devices whose logs changed since the '
+                                 'last incremental run (an interrupted run resumes from the last device it finished)')
+    arg_parser.add_argument('--partition_by_date', action='store_true', 
+                            help='write a directory with one partition of the given format per event date, which lets '
+                                 'calculator.py only read the dates its window needs')
+    arg_parser.add_argument('--flush_rows', type=int, default=message_writers.DEFAULT_FLUSH_ROWS, 
+                            help='number of parsed rows buffered before they are appended to the output')
+    args = arg_parser.parse_args()
+    # fails early on a backend that is not installed, before any worker is started
+    json_ops.get_decoder(args.json_backend)
     raw_log_dir = KPI_CALC_REPO_PATH + "/interim-kpi-calculator/data/split_logs"
+    cleaned_dataset_dir = KPI_CALC_REPO_PATH + "/interim-kpi-calculator/data/cleaned_logs/cleaned_format.parquet"
     formatted_log_dir = KPI_CALC_REPO_PATH + "/interim-kpi-calculator/data/parsed_logs"
+    cache_dir = KPI_CALC_REPO_PATH + "/interim-kpi-calculator/data/parsed_device_cache"
     if not os.path.exists(formatted_log_dir): 
         os.mkdir(formatted_log_dir)
-    concatenating_dfs = []
+    output_file_path = os.path.join(formatted_log_dir, "parsed_messages_" + str(datetime.today().strftime('%Y_%m_%d')))
+    if not args.partition_by_date: 
+        output_file_path += '.' + args.format
     print('------Assembling Formatted Data------')
-    for raw_log in tqdm(os.listdir(raw_log_dir)):
-        raw_df = pd.read_csv(os.path.join(raw_log_dir, raw_log))
-        raw_df['message'] = raw_df['message'].apply(read_as_json)
-        raw_df['message_ID'] = raw_df['message'].apply(get_message_ID)
-        raw_df['ID_token'] = raw_df['message'].apply(get_ID_token)
-        new_df = format_data(raw_df)
-        concatenating_dfs.append(new_df)
-    new_df = pd.concat(concatenating_dfs)
-    new_df.to_csv(os.path.join(formatted_log_dir, "parsed_messages_" + str(datetime.today().strftime('%Y_%m_%d')) + '.csv'), index=False)
\ No newline at end of file
+    sources = device_log_sources(args.format, raw_log_dir, cleaned_dataset_dir)
+    if args.incremental: 
+        parsed_dfs = parse_changed_device_sources(sources, args.format, args.json_backend, cache_dir, args.project, 
+                                                  args.workers)
+    else: 
+        parsed_dfs = tqdm(parse_device_sources(sources, args.format, args.json_backend, args.project, args.workers), 
+                          total=len(sources))
+    # every device is appended to the output as it is parsed, nothing is collected for one final write
+    with message_writers.create_parsed_message_writer(output_file_path, args.format, args.flush_rows, 
+                                                      args.partition_by_date) as parsed_message_writer: 
+        for new_df in parsed_dfs:
+            parsed_message_writer.write(new_df)
@@ -1,63 +1,113 @@
 # Copyright 2025, Battelle Energy Alliance, LLC, ALL RIGHTS RESERVED
 
 import os
+import shutil
+import argparse
+import tempfile
+
+from concurrent.futures import ProcessPoolExecutor
 
 from kpi_calculator.log_parser.ocpp_2_0_1 import standard, parser
+from kpi_calculator.utils import parquet_ops
 
 KPI_CALC_REPO_PATH = 'insert/path/to/repo/here'
 
 
-def read_log(file_path: str, number_sample_lines: int) -> list[str]: 
-    lines = []
-    with open(file_path, 'r', encoding='utf-8') as infile: 
-        for line_number, line in enumerate(infile): 
-            if line_number == number_sample_lines: 
-                break
-            lines.append(line)
-        return lines   
-
-def identify_standard(sample_lines: list[str]) -> str:
-    standard_error = 'Standard is ambiguous and cannot be inferred from the data provided'
-    verbose = standard.is_standard(sample_lines, 'verbose')
-    explicit = standard.is_standard(sample_lines, 'explicit')
-    if verbose and explicit: 
-        raise IOError(standard_error) 
-    if explicit:
-        return explicit
-    if verbose: 
-        return verbose
-    raise IOError(standard_error)
-
-def set_standard(sample_lines: list[str], preselected_standard: str) -> str: 
-    line_standard = preselected_standard
-    if line_standard is not None and line_standard != 'explicit' and line_standard != 'verbose': 
-        raise ValueError(f"Preselected standard ({preselected_standard}) is not a supported standard")
-    if line_standard is None: 
-        line_standard = identify_standard(sample_lines)
-    return line_standard 
-
-def initialize_parser(file_path: str, preselected_standard: str, number_sample_lines: int) -> parser.LogParser:
-    sample_lines = read_log(file_path, number_sample_lines)
-    line_standard = set_standard(sample_lines, preselected_standard) 
-    log_parser = parser.LogParser(line_standard)       
-    return log_parser
-
 def create_log(output_file_path: str) -> None: 
     if os.path.exists(output_file_path): 
         os.remove(output_file_path)
     with open(output_file_path, 'a+', encoding='utf-8') as outfile: 
         outfile.write('device_ID,message,timestamp\n')
 
-def parse_logs(log_dir_path: str, output_file_path: str, preselected_standard: str = None, number_sample_lines: int = 100): 
+def create_output(output_file_path: str, output_format: str) -> None: 
+    if output_format == 'parquet': 
+        parquet_ops.create_dataset(output_file_path)
+        return
+    create_log(output_file_path)
+
+def parse_log_shard(log_file_path: str, shard_file_path: str, device_ID: int, line_standard: str | None, 
+                    flush_size: int, number_sample_lines: int, filter_actions: bool, output_format: str = 'csv') -> str: 
+    with parser.LogParser(line_standard, flush_size, number_sample_lines=number_sample_lines, 
+                          filter_actions=filter_actions, output_format=output_format) as log_parser: 
+        log_parser.parse_log(log_file_path, shard_file_path, device_ID)
+    return shard_file_path
+
+def merge_shards(shard_file_paths: list[str], output_file_path: str) -> None: 
+    with open(output_file_path, 'ab') as outfile: 
+        for shard_file_path in shard_file_paths: 
+            with open(shard_file_path, 'rb') as shard_file: 
+                shutil.copyfileobj(shard_file, outfile)
+
+def parse_logs_in_parallel(log_dir_path: str, log_file_paths: list[str], output_file_path: str, 
+                           line_standard: str | None, flush_size: int, number_sample_lines: int, filter_actions: bool, 
+                           workers: int, output_format: str = 'csv') -> None: 
+    # device IDs are fixed by directory order before any work is handed out and the shards are merged 
+    # back in that order, so the output does not depend on how the pool schedules the files
+    if output_format == 'parquet': 
+        # every device has its own partition, so the workers write straight into the dataset
+        with ProcessPoolExecutor(max_workers=workers) as executor: 
+            partition_futures = [executor.submit(parse_log_shard, os.path.join(log_dir_path, log_file_path), 
+                                                 output_file_path, device_ID, line_standard, flush_size, 
+                                                 number_sample_lines, filter_actions, output_format)
+                                 for device_ID, log_file_path in enumerate(log_file_paths)]
+            for partition_future in partition_futures: 
+                partition_future.result()
+        return
+    with tempfile.TemporaryDirectory(dir=os.path.dirname(os.path.abspath(output_file_path))) as shard_dir: 
+        with ProcessPoolExecutor(max_workers=workers) as executor: 
+            shard_futures = [executor.submit(parse_log_shard, os.path.join(log_dir_path, log_file_path), 
+                                             os.path.join(shard_dir, str(device_ID) + '.csv'), device_ID, 
+                                             line_standard, flush_size, number_sample_lines, filter_actions)
+                             for device_ID, log_file_path in enumerate(log_file_paths)]
+            shard_file_paths = [shard_future.result() for shard_future in shard_futures]
+        merge_shards(shard_file_paths, output_file_path)
+
+def parse_logs(log_dir_path: str, output_file_path: str, preselected_standard: str = None, number_sample_lines: int = 100, 
+               flush_size: int = parser.DEFAULT_FLUSH_SIZE, workers: int = 1, scan_workers: int = 1, 
+               chunk_size_bytes: int = parser.DEFAULT_CHUNK_SIZE_BYTES, filter_actions: bool = False, 
+               output_format: str = 'csv'): 
+    if workers < 1: 
+        raise ValueError(f"Number of workers ({workers}) must be at least 1")
+    if output_format not in parser.OUTPUT_FORMATS: 
+        raise ValueError(f"Output format ({output_format}) is not one of {parser.OUTPUT_FORMATS}")
     if not os.path.exists(log_dir_path):
         os.mkdir(log_dir_path)
-    sample_log_path = os.listdir(log_dir_path)[0]
-    log_parser = initialize_parser(os.path.join(log_dir_path, sample_log_path), preselected_standard, number_sample_lines)
-    create_log(output_file_path)
-    for device_ID, log_file_path in enumerate(os.listdir(log_dir_path)): 
-        log_parser.parse_log(os.path.join(log_dir_path, log_file_path), output_file_path, device_ID)
+    if preselected_standard is not None: 
+        standard.registered_standard(preselected_standard)
+    log_file_paths = os.listdir(log_dir_path)
+    create_output(output_file_path, output_format)
+    # without a preselected standard every file has its standard inferred from its own sample lines
+    if workers > 1: 
+        parse_logs_in_parallel(log_dir_path, log_file_paths, output_file_path, preselected_standard, flush_size, 
+                               number_sample_lines, filter_actions, workers, output_format)
+        return
+    with parser.LogParser(preselected_standard, flush_size, scan_workers, chunk_size_bytes, 
+                          number_sample_lines=number_sample_lines, filter_actions=filter_actions, 
+                          output_format=output_format) as log_parser: 
+        for device_ID, log_file_path in enumerate(log_file_paths): 
+            log_parser.parse_log(os.path.join(log_dir_path, log_file_path), output_file_path, device_ID)
         
 if __name__ == "__main__": 
+    arg_parser = argparse.ArgumentParser(prog='interim-kpi-reader')
+    arg_parser.add_argument('--workers', '-w', type=int, default=1, 
+                            help='number of processes used to parse the raw log files (each file is parsed by one process)')
+    arg_parser.add_argument('--standard', help='registered log standard to use for every file instead of inferring it per file (e.g. explicit or verbose)')
+    arg_parser.add_argument('--flush_size', type=int, default=parser.DEFAULT_FLUSH_SIZE, 
+                            help='number of parsed lines buffered before they are written to the cleaned log')
+    arg_parser.add_argument('--scan_workers', type=int, default=1, 
+                            help='number of processes used to scan a single large log file in byte ranges '
+                                 '(used when files are parsed one at a time)')
+    arg_parser.add_argument('--chunk_size_bytes', type=int, default=parser.DEFAULT_CHUNK_SIZE_BYTES, 
+                            help='approximate size of the byte ranges a large log file is split into')
+    arg_parser.add_argument('--filter_actions', action='store_true', 
+                            help='only keep the CALLs and CALLRESULTs that can affect the KPIs')
+    arg_parser.add_argument('--format', choices=parser.OUTPUT_FORMATS, default='csv', 
+                            help='write the cleaned log as a csv file or as a parquet dataset partitioned by device_ID '
+                                 '(the parquet dataset is read by parse_messages.py directly, without splitting)')
+    args = arg_parser.parse_args()
+
     log_dir_path = KPI_CALC_REPO_PATH+'/interim-kpi-calculator/data/raw_ocpp_logs'
-    output_file_path = KPI_CALC_REPO_PATH + '/interim-kpi-calculator/data/cleaned_logs/cleaned_format.csv'
-    parse_logs(log_dir_path, output_file_path)
\ No newline at end of file
+    output_file_path = KPI_CALC_REPO_PATH + '/interim-kpi-calculator/data/cleaned_logs/cleaned_format.' + args.format
+    parse_logs(log_dir_path, output_file_path, args.standard, flush_size=args.flush_size, workers=args.workers, 
+               scan_workers=args.scan_workers, chunk_size_bytes=args.chunk_size_bytes, filter_actions=args.filter_actions, 
+               output_format=args.format)
@@ -1,21 +1,44 @@
 # Copyright 2025, Battelle Energy Alliance, LLC, ALL RIGHTS RESERVED
 
 import os
+import argparse
 import pandas as pd
 
+from kpi_calculator.utils import file_ops
+
 KPI_CALC_REPO_PATH = 'insert/path/to/repo/here'
 
+DEFAULT_CHUNK_SIZE = 100000
+
+def split_log(log_file_path: str, output_dir: str, file_handle_pool: file_ops.FileHandlePool, 
+              chunk_size: int = DEFAULT_CHUNK_SIZE) -> None: 
+    # every value is kept as the text it was written as, so the split files hold the same values as the cleaned log
+    for chunk_df in pd.read_csv(log_file_path, dtype=str, chunksize=chunk_size): 
+        for device_ID, single_device_logs in chunk_df.groupby('device_ID', sort=False): 
+            output_file_path = os.path.join(output_dir, str(device_ID) + '.csv')
+            write_header = not file_handle_pool.was_opened(output_file_path)
+            single_device_logs.to_csv(file_handle_pool.handle(output_file_path), header=write_header, index=False)
+
+def split_logs(raw_log_dir: str, output_dir: str, chunk_size: int = DEFAULT_CHUNK_SIZE, 
+               max_open_files: int = file_ops.DEFAULT_MAX_OPEN_FILES) -> None: 
+    # the cleaned logs are streamed in chunks of rows and every chunk is appended to the device files it 
+    # contains, so memory only depends on the chunk size and the number of open files, not on the dataset
+    with file_ops.FileHandlePool(max_open_files) as file_handle_pool: 
+        for raw_log in os.listdir(raw_log_dir):
+            # a parquet dataset (reader.py --format parquet) is a directory and is never split
+            if not os.path.isfile(os.path.join(raw_log_dir, raw_log)): 
+                continue
+            split_log(os.path.join(raw_log_dir, raw_log), output_dir, file_handle_pool, chunk_size)
+
 if __name__ == "__main__": 
+    arg_parser = argparse.ArgumentParser(prog='interim-kpi-splitter')
+    arg_parser.add_argument('--chunk_size', type=int, default=DEFAULT_CHUNK_SIZE, 
+                            help='number of cleaned log rows read at a time')
+    arg_parser.add_argument('--max_open_files', type=int, default=file_ops.DEFAULT_MAX_OPEN_FILES, 
+                            help='number of device files kept open at once, the least recently written one is closed first')
+    args = arg_parser.parse_args()
     raw_log_dir = KPI_CALC_REPO_PATH + "/interim-kpi-calculator/data/cleaned_logs"
     output_dir = KPI_CALC_REPO_PATH + "/interim-kpi-calculator/data/split_logs"
     if not os.path.exists(output_dir): 
         os.mkdir(output_dir)
-    dfs = []
-    for raw_log in os.listdir(raw_log_dir):
-        df = pd.read_csv(os.path.join(raw_log_dir, raw_log))
-        dfs.append(df)
-    new_df = pd.concat(dfs)
-    unique_device_IDs = new_df['device_ID'].unique().tolist()
-    for device_ID in unique_device_IDs: 
-        single_device_logs = new_df[new_df['device_ID'] == device_ID]
-        single_device_logs.to_csv(os.path.join(output_dir, str(device_ID) + '.csv'), index=False)
\ No newline at end of file
+    split_logs(raw_log_dir, output_dir, args.chunk_size, args.max_open_files)
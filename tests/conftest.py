@@ -0,0 +1,52 @@
+# Copyright 2025, Battelle Energy Alliance, LLC, ALL RIGHTS RESERVED
+
+import os
+import sys
+import shutil
+
+import pytest
+
+# the scripts are imported from the repository root, the way they are run
+REPO_PATH = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_PATH)
+
+import ocpp_logs
+
+
+@pytest.fixture
+def example_log_dir(tmp_path):
+    log_dir_path = tmp_path / 'raw_ocpp_logs'
+    shutil.copytree(os.path.join(ocpp_logs.EXAMPLE_DATA_DIR, 'raw_ocpp_logs'), log_dir_path)
+    return str(log_dir_path)
+
+@pytest.fixture(scope='session')
+def synthetic_log_dir(tmp_path_factory):
+    log_dir_path = str(tmp_path_factory.mktemp('synthetic') / 'raw_ocpp_logs')
+    ocpp_logs.write_synthetic_logs(log_dir_path)
+    return log_dir_path
+
+@pytest.fixture(scope='session')
+def synthetic_pipeline_dir(synthetic_log_dir, tmp_path_factory):
+    # the cleaned, split and parsed logs of the synthetic logs
+    work_dir = str(tmp_path_factory.mktemp('synthetic_pipeline'))
+    ocpp_logs.run_pipeline(synthetic_log_dir, work_dir)
+    return work_dir
+
+@pytest.fixture(scope='session')
+def synthetic_parsed_file(synthetic_pipeline_dir):
+    return os.path.join(synthetic_pipeline_dir, ocpp_logs.PARSED_FILE_NAME)
+
+@pytest.fixture
+def synthetic_df(synthetic_parsed_file):
+    return ocpp_logs.load_deduplicated(synthetic_parsed_file)
+
+@pytest.fixture
+def window(monkeypatch):
+    # KPICalculator reads its window from calculator.py's module level range
+    import calculator
+
+    def set_window(window_start: str = '', window_end: str = '') -> None:
+        monkeypatch.setattr(calculator, 'START_RANGE', window_start)
+        monkeypatch.setattr(calculator, 'END_RANGE', window_end)
+    set_window()
+    return set_window
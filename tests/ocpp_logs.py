@@ -0,0 +1,193 @@
+# Copyright 2025, Battelle Energy Alliance, LLC, ALL RIGHTS RESERVED
+
+from __future__ import annotations
+
+import os
+import json
+import uuid
+import random
+
+from datetime import datetime, timedelta
+
+import pandas as pd
+
+import reader
+import calculator
+import parse_messages
+import split_data_into_charger_files
+
+from kpi_calculator.utils import message_writers
+
+# small raw OCPP logs in both registered standards, with every kind of session the KPIs tell apart, the noise
+# the parser has to skip and an ID token shared between sessions, generated the same way for a given seed
+ID_TOKENS = ['TOKA', 'TOKB', 'TOKC', 'VALID']
+SESSION_KINDS = ['post_plugin', 'pre_plugin', 'cached_auth', 'request_start', 'orphan_authorize',
+                 'orphan_request_start', 'rejected_request_start', 'late_authorize']
+STOPPED_REASONS = ['EVDisconnected', 'Local', 'Remote', 'StoppedByEV', 'EnergyLimitReached', 'Other', 'PowerLoss']
+START_TIME = datetime(2024, 5, 1, 0, 0, 1)
+# even devices log in the verbose standard and odd ones in the explicit standard
+LOG_STANDARDS = ['verbose', 'explicit']
+# the example log shipped in data/raw_ocpp_logs, with the outputs of every stage next to it
+EXAMPLE_DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data')
+PARSED_FILE_NAME = 'parsed_messages.csv'
+
+
+class SyntheticLog:
+
+    def __init__(self, log_standard: str, seed: int, start_time: datetime = START_TIME):
+        self._log_standard = log_standard
+        self._random = random.Random(seed)
+        self._time = start_time
+        self.lines = ['Test Case Name : synthetic\n'] if log_standard == 'explicit' else []
+
+    def _advance(self, low_seconds: float = 0.05, high_seconds: float = 20) -> None:
+        self._time += timedelta(seconds=self._random.uniform(low_seconds, high_seconds))
+
+    def _date(self) -> str:
+        milliseconds = '%03d' % (self._time.microsecond // 1000)
+        if self._log_standard == 'explicit':
+            return '[' + self._time.strftime('%Y-%m-%dT%H:%M:%S') + ':' + milliseconds + ']'
+        return self._time.strftime('%Y-%m-%dT%H:%M:%S.') + milliseconds + 'Z'
+
+    def _line(self, text: str, incoming: bool) -> None:
+        if self._log_standard == 'explicit':
+            self.lines.append(f"{self._date()} {'[msg-in]' if incoming else '[msg-out]'} {text}\n")
+            return
+        self.lines.append(f"{self._date()} \x1b[1;32m INFO module.cpp:42 {'>>>' if incoming else '<<<'} {text}\n")
+
+    def _noise_line(self) -> None:
+        if self._log_standard == 'explicit':
+            self.lines.append(f"{self._date()} [info] something happened\n")
+            return
+        self.lines.append(f"{self._date()} \x1b[1;32m INFO other.cpp:12 heartbeat ok\n")
+
+    def call(self, action: str, payload: dict, incoming: bool = True) -> str:
+        self._advance()
+        message_ID = str(uuid.UUID(int=self._random.getrandbits(128)))
+        self._line(json.dumps([2, message_ID, action, payload]), incoming)
+        return message_ID
+
+    def call_result(self, message_ID: str, payload: dict, incoming: bool = False) -> None:
+        self._advance(0.01, 2)
+        self._line(json.dumps([3, message_ID, payload]), incoming)
+
+    def _status(self, connector_status: str) -> None:
+        message_ID = self.call('StatusNotification', {'timestamp': self._time.isoformat(), 'connectorStatus': connector_status,
+                                                      'evseId': 1, 'connectorId': 1})
+        self.call_result(message_ID, {})
+
+    def _transaction_event(self, event: str, trigger_reason: str, transaction_info: dict,
+                           ID_token: str | None = None) -> str:
+        payload = {'eventType': event, 'timestamp': self._time.isoformat(), 'triggerReason': trigger_reason,
+                   'seqNo': 0, 'transactionInfo': transaction_info}
+        if ID_token is not None:
+            payload['idToken'] = {'idToken': ID_token, 'type': 'ISO14443'}
+        return self.call('TransactionEvent', payload)
+
+    def _authorize(self, ID_token: str, status: str = 'Accepted') -> None:
+        message_ID = self.call('Authorize', {'idToken': {'idToken': ID_token, 'type': 'ISO14443'}})
+        self.call_result(message_ID, {'idTokenInfo': {'status': status}})
+
+    def _request_start(self, ID_token: str, result: dict | None) -> None:
+        message_ID = self.call('RequestStartTransaction', {'idToken': {'idToken': ID_token, 'type': 'Central'},
+                                                           'remoteStartId': 1}, incoming=False)
+        if result is not None:
+            self.call_result(message_ID, result, incoming=True)
+
+    def noise(self) -> None:
+        choice = self._random.random()
+        if choice < 0.4:
+            message_ID = self.call('Heartbeat', {})
+            self.call_result(message_ID, {'currentTime': self._time.isoformat()})
+        elif choice < 0.7:
+            message_ID = self.call('MeterValues', {'evseId': 1, 'meterValue': [{'timestamp': self._time.isoformat(),
+                                                                                'sampledValue': [{'value': 7.5}]}]})
+            self.call_result(message_ID, {})
+        else:
+            self._advance()
+            self._noise_line()
+
+    def session(self, kind: str) -> None:
+        transaction_ID = str(uuid.UUID(int=self._random.getrandbits(128)))
+        ID_token = self._random.choice(ID_TOKENS)
+        if kind == 'orphan_authorize':
+            self._authorize(ID_token, self._random.choice(['Accepted', 'Invalid']))
+            return
+        if kind == 'orphan_request_start':
+            self._request_start(ID_token, None)
+            return
+        if kind == 'rejected_request_start':
+            self._request_start(ID_token, {'status': 'Rejected', 'statusInfo': {'reasonCode': 'SessionStartRejected'}})
+            return
+        if kind == 'pre_plugin':
+            self._authorize(ID_token)
+            self._advance(1, 200)
+        if kind == 'request_start':
+            self._request_start(ID_token, {'status': 'Accepted', 'transactionId': transaction_ID})
+        self._status('Occupied')
+        if kind == 'cached_auth':
+            message_ID = self._transaction_event('Started', 'Authorized', {'transactionId': transaction_ID}, ID_token)
+            self.call_result(message_ID, {'idTokenInfo': {'status': self._random.choice(['Accepted', 'Blocked'])}})
+        else:
+            with_token = kind in ['pre_plugin', 'request_start', 'late_authorize']
+            message_ID = self._transaction_event('Started', 'CablePluggedIn', {'transactionId': transaction_ID},
+                                                 ID_token if with_token else None)
+            self.call_result(message_ID, {})
+        if kind == 'late_authorize':
+            # an Authorize shortly after the Started event it belongs to
+            self._authorize(ID_token)
+        if self._random.random() < 0.85:
+            self._transaction_event('Updated', 'ChargingStateChanged', {'transactionId': transaction_ID,
+                                                                        'chargingState': 'Charging'})
+        for _ in range(self._random.randint(0, 3)):
+            self.noise()
+        if self._random.random() < 0.9:
+            self._advance(10, 3000)
+            stopped_reason = self._random.choice(STOPPED_REASONS)
+            self._transaction_event('Ended', stopped_reason, {'transactionId': transaction_ID,
+                                                              'stoppedReason': stopped_reason})
+        self._status('Available')
+
+    def run(self, sessions: int) -> list[str]:
+        for _ in range(sessions):
+            for _ in range(self._random.randint(0, 2)):
+                self.noise()
+            self.session(self._random.choice(SESSION_KINDS))
+            self._advance(60, 4 * 3600)
+        return self.lines
+
+def log_file_name(device: int) -> str:
+    return f"charger_{device:03d}.log"
+
+def write_synthetic_logs(log_dir_path: str, devices: int = 4, sessions: int = 30, seed: int = 0) -> None:
+    os.makedirs(log_dir_path, exist_ok=True)
+    for device in range(devices):
+        synthetic_log = SyntheticLog(LOG_STANDARDS[device % 2], seed * 1000 + device,
+                                     START_TIME + timedelta(minutes=17 * device))
+        with open(os.path.join(log_dir_path, log_file_name(device)), 'w', encoding='utf-8') as outfile:
+            outfile.writelines(synthetic_log.run(sessions))
+
+def run_pipeline(raw_log_dir: str, work_dir: str, **reader_options) -> str:
+    # reader.py, split_data_into_charger_files.py and parse_messages.py with their default options, returns the
+    # parsed csv file calculator.py reads
+    cleaned_log_dir = os.path.join(work_dir, 'cleaned_logs')
+    split_log_dir = os.path.join(work_dir, 'split_logs')
+    for directory in [cleaned_log_dir, split_log_dir]:
+        os.makedirs(directory, exist_ok=True)
+    reader.parse_logs(raw_log_dir, os.path.join(cleaned_log_dir, 'cleaned_format.csv'), **reader_options)
+    split_data_into_charger_files.split_logs(cleaned_log_dir, split_log_dir)
+    parsed_file_path = os.path.join(work_dir, PARSED_FILE_NAME)
+    sources = sorted(parse_messages.device_log_sources('csv', split_log_dir, ''))
+    with message_writers.create_parsed_message_writer(parsed_file_path, 'csv') as parsed_message_writer:
+        for parsed_df in parse_messages.parse_device_sources(sources, 'csv', 'stdlib'):
+            parsed_message_writer.write(parsed_df)
+    return parsed_file_path
+
+def load_deduplicated(parsed_file_path: str) -> pd.DataFrame:
+    # what calculator.py calculates from
+    df = calculator.load_parsed_data(parsed_file_path)
+    return df.drop_duplicates(subset=calculator.DUPLICATE_COLUMNS, keep='first')
+
+def equation_values(interim_KPIs: calculator.InterimKPIs) -> dict:
+    return {equation_num: (equation.numerator, equation.denominator)
+            for equation_num, equation in interim_KPIs.equations.items() if equation_num != 9}
@@ -0,0 +1,177 @@
+# Copyright 2025, Battelle Energy Alliance, LLC, ALL RIGHTS RESERVED
+
+import os
+
+import pytest
+import numpy as np
+import pandas as pd
+
+import calculator
+import ocpp_logs
+
+from kpi_calculator.log_parser.ocpp_2_0_1 import transaction_parser
+from kpi_calculator.utils import message_writers, time_ops
+
+# windows that exclude their boundary days, which cut through the synthetic transactions from May 1 to May 4
+DATE_WINDOWS = [('2024-05-01', '2024-05-03'), ('2024-05-02', '2024-05-04')]
+# windows that cut through the synthetic transactions, which run from May 1 to May 4
+WINDOWS = [('2024-05-01T00:00:00', '2024-05-01T09:30:00'), ('2024-05-01T09:30:00', '2024-05-02T00:00:00'),
+           ('2024-05-02T00:00:00', '2024-05-02T17:45:00'), ('2024-05-02T17:45:00', '2024-05-06T00:00:00')]
+PERCENTILES = [10, 25, 50, 75]
+
+
+def tabulated_KPIs(df: pd.DataFrame, percentile_backend: str = 'exact') -> calculator.InterimKPIs:
+    KPI_calculator = calculator.KPICalculator(df, percentile_backend)
+    KPI_calculator.tabulate_orphan_authorizes()
+    KPI_calculator.tabulate_orphan_request_starts()
+    KPI_calculator.tabulate_transactional_values()
+    return KPI_calculator._interim_KPIs
+
+def looped_KPIs(df: pd.DataFrame) -> calculator.InterimKPIs:
+    # the per-transaction loop summarize_transactions and add_transaction_summaries replace
+    windowed_df = calculator.create_windowed_df(df, calculator.START_RANGE, calculator.END_RANGE)
+    overlapped_windowed_df = calculator.create_overlapped_window(df, 'transaction_ID', calculator.START_RANGE,
+                                                                 calculator.END_RANGE, [-1])
+    interim_KPIs = calculator.InterimKPIs()
+    authorizes_df = transaction_parser.filter_authorizes(windowed_df)
+    interim_KPIs.add_authorizes(len(authorizes_df[authorizes_df['transaction_ID'].isin([-1, -98, -99])]))
+    request_starts_df = transaction_parser.filter_request_starts(windowed_df)
+    interim_KPIs.add_request_starts(len(request_starts_df[pd.isna(request_starts_df['transaction_ID'])]))
+    for transaction_ID in overlapped_windowed_df['transaction_ID'].unique().tolist():
+        transaction_df = overlapped_windowed_df[overlapped_windowed_df['transaction_ID'] == transaction_ID]
+        transaction_authorizes = len(transaction_parser.filter_authorizes_no_double_count(transaction_df))
+        transaction_request_starts = len(transaction_parser.filter_request_starts(transaction_df))
+        power_delivery_attempt = transaction_parser.power_delivery_attempt(transaction_df)
+        valid_start = transaction_parser.valid_start(transaction_df)
+        valid_stop = transaction_parser.valid_stop(transaction_df)
+        if transaction_parser.valid_auth_start(transaction_df):
+            interim_KPIs.add_start(True, 'cached_auth')
+            interim_KPIs.add_power_delivery_attempt(power_delivery_attempt, 'cached_auth')
+            interim_KPIs.add_valid_stop(valid_stop, 'cached_auth', power_delivery_attempt)
+        elif transaction_request_starts != 0:
+            interim_KPIs.add_authorizes(transaction_authorizes)
+            interim_KPIs.add_request_starts(transaction_request_starts)
+            interim_KPIs.add_power_delivery_attempt(power_delivery_attempt, 'request_start')
+            interim_KPIs.add_valid_stop(valid_stop, 'request_start', power_delivery_attempt)
+        elif transaction_authorizes != 0:
+            interim_KPIs.add_authorizes(transaction_authorizes)
+            interim_KPIs.add_power_delivery_attempt(power_delivery_attempt, 'pre_plugin')
+            interim_KPIs.add_valid_stop(valid_stop, 'pre_plugin', power_delivery_attempt)
+        elif valid_start:
+            interim_KPIs.add_start(valid_start, 'post_plugin')
+            interim_KPIs.add_power_delivery_attempt(power_delivery_attempt, 'post_plugin')
+            interim_KPIs.add_valid_stop(valid_stop, 'post_plugin', power_delivery_attempt)
+        interim_KPIs.add_charge_start_time(transaction_df)
+    return interim_KPIs
+
+def KPI_values(interim_KPIs: calculator.InterimKPIs) -> tuple:
+    return ocpp_logs.equation_values(interim_KPIs), sorted(interim_KPIs.charge_start_times())
+
+def test_example_KPIs_match_the_shipped_workbook(tmp_path, window):
+    window('2024-05-01', '2024-05-30')
+    df = ocpp_logs.load_deduplicated(os.path.join(ocpp_logs.EXAMPLE_DATA_DIR, 'parsed_logs',
+                                                  'parsed_messages_2025_05_19.csv'))
+    KPI_calculator = calculator.KPICalculator(df)
+    KPI_calculator.tabulate_orphan_authorizes()
+    KPI_calculator.tabulate_orphan_request_starts()
+    KPI_calculator.tabulate_transactional_values()
+    KPI_calculator.print_KPIs(str(tmp_path / 'dataset_KPIs.xlsx'))
+    KPI_sheets = pd.read_excel(tmp_path / 'dataset_KPIs.xlsx', sheet_name=None, header=None)
+    shipped_KPI_sheets = pd.read_excel(os.path.join(ocpp_logs.EXAMPLE_DATA_DIR, 'KPIs', 'dataset_KPIs_2025-05-19.xlsx'),
+                                       sheet_name=None, header=None)
+    assert list(KPI_sheets) == list(shipped_KPI_sheets)
+    for sheet_name, shipped_KPI_sheet in shipped_KPI_sheets.items():
+        pd.testing.assert_frame_equal(KPI_sheets[sheet_name], shipped_KPI_sheet)
+
+def test_transaction_summaries_match_per_transaction_predicates(synthetic_df):
+    transaction_df = synthetic_df[~synthetic_df['transaction_ID'].isin([-1])]
+    summaries = transaction_parser.summarize_transactions(transaction_df)
+    assert summaries.index.tolist() == transaction_df['transaction_ID'].dropna().unique().tolist()
+    for transaction_ID, summary in summaries.iterrows():
+        rows = transaction_df[transaction_df['transaction_ID'] == transaction_ID]
+        assert summary['valid_stop'] == transaction_parser.valid_stop(rows)
+        assert summary['valid_start'] == transaction_parser.valid_start(rows)
+        assert summary['valid_auth_start'] == transaction_parser.valid_auth_start(rows)
+        assert summary['power_delivery_attempt'] == transaction_parser.power_delivery_attempt(rows)
+        assert summary['authorizes'] == len(transaction_parser.filter_authorizes_no_double_count(rows))
+        assert summary['request_starts'] == len(transaction_parser.filter_request_starts(rows))
+        start_timestamp, end_timestamp = transaction_parser.before_auth_timestamps(rows)
+        if start_timestamp is None:
+            start_timestamp, end_timestamp = transaction_parser.after_auth_timestamps(rows)
+        if start_timestamp is None:
+            assert np.isnan(summary['charge_start_time'])
+        else:
+            assert summary['charge_start_time'] == time_ops.events_time_diff_seconds(start_timestamp, end_timestamp)
+
+@pytest.mark.parametrize('window_bounds', [('', '')] + DATE_WINDOWS + WINDOWS)
+def test_KPIs_match_per_transaction_loop(synthetic_df, window, window_bounds):
+    window(*window_bounds)
+    assert KPI_values(tabulated_KPIs(synthetic_df)) == KPI_values(looped_KPIs(synthetic_df))
+
+def test_windows_from_one_load_match_separate_runs(synthetic_df, window):
+    multi_window_KPI_calculator = calculator.MultiWindowKPICalculator(synthetic_df, [calculator.window_bounds(*window_bounds)
+                                                                                     for window_bounds in WINDOWS])
+    multi_window_KPI_calculator.tabulate()
+    for window_bounds, interim_KPIs in zip(WINDOWS, multi_window_KPI_calculator.interim_KPIs):
+        window(*window_bounds)
+        assert KPI_values(interim_KPIs) == KPI_values(tabulated_KPIs(synthetic_df))
+
+def test_date_partitioned_store_gives_the_same_KPIs(synthetic_parsed_file, synthetic_df, tmp_path, window):
+    store_dir = str(tmp_path / 'parsed_messages')
+    with message_writers.create_parsed_message_writer(store_dir, 'csv', partition_by_date=True) as parsed_message_writer:
+        parsed_message_writer.write(calculator.load_parsed_data(synthetic_parsed_file))
+    for window_bounds in WINDOWS:
+        window(*window_bounds)
+        partition_df = calculator.load_parsed_data(store_dir, *window_bounds)
+        partition_df = partition_df.drop_duplicates(subset=calculator.DUPLICATE_COLUMNS, keep='first')
+        assert len(partition_df) < len(synthetic_df)
+        assert KPI_values(tabulated_KPIs(partition_df)) == KPI_values(tabulated_KPIs(synthetic_df))
+
+def test_device_breakdown_matches_runs_per_device(synthetic_df, window):
+    KPI_calculator = calculator.KPICalculator(synthetic_df)
+    breakdown_df = KPI_calculator.tabulate_breakdown()
+    for device_ID, device_df in synthetic_df.groupby('device_ID'):
+        device_KPIs = tabulated_KPIs(device_df)
+        device_breakdown_df = breakdown_df[breakdown_df['group'] == device_ID]
+        for statistic, position in [('numerator', 0), ('denominator', 1)]:
+            statistic_df = device_breakdown_df[device_breakdown_df['statistic'] == statistic]
+            assert dict(zip(statistic_df['equation'], statistic_df['value'])) == \
+                   {equation_num: values[position] for equation_num, values in ocpp_logs.equation_values(device_KPIs).items()}
+        total_samples = device_breakdown_df.loc[device_breakdown_df['statistic'] == 'total_samples', 'value'].tolist()
+        assert total_samples == [device_KPIs.num_charge_start_time_samples()]
+
+@pytest.mark.parametrize('percentile_backend', ['exact', 'kll'])
+def test_rollup_of_consecutive_windows_matches_one_run(synthetic_df, tmp_path, window, percentile_backend):
+    # each window is calculated from the data logged up to its end, the way a daily run sees it
+    rollup_state_path = str(tmp_path / 'rollup.json')
+    for window_start, window_end in WINDOWS:
+        window(window_start, window_end)
+        KPI_calculator = calculator.KPICalculator(synthetic_df[synthetic_df['timestamp'] < pd.Timestamp(window_end)],
+                                                  percentile_backend)
+        KPI_calculator.tabulate_orphan_authorizes()
+        KPI_calculator.tabulate_orphan_request_starts()
+        KPI_calculator.tabulate_transactional_values()
+        KPI_calculator.roll_up(rollup_state_path)
+    window(WINDOWS[0][0], WINDOWS[-1][1])
+    whole_window_KPIs = tabulated_KPIs(synthetic_df, percentile_backend)
+    rollup_KPIs = calculator.InterimKPIs.load(rollup_state_path)
+    assert ocpp_logs.equation_values(rollup_KPIs) == ocpp_logs.equation_values(whole_window_KPIs)
+    assert rollup_KPIs.num_charge_start_time_samples() == whole_window_KPIs.num_charge_start_time_samples()
+    if percentile_backend == 'exact':
+        assert rollup_KPIs.charge_start_time_percentiles(PERCENTILES) == \
+               whole_window_KPIs.charge_start_time_percentiles(PERCENTILES)
+    # only the transactions that could still change are kept
+    assert len(rollup_KPIs.transaction_summaries) < synthetic_df['transaction_ID'].nunique()
+
+def test_rollup_rejects_windows_before_settled_transactions(synthetic_df, window):
+    window_KPIs = []
+    for window_bounds in WINDOWS:
+        window(*window_bounds)
+        window_KPIs.append(tabulated_KPIs(synthetic_df))
+    rollup_KPIs = calculator.InterimKPIs()
+    rollup_KPIs.merge(window_KPIs[2])
+    with pytest.raises(ValueError):
+        rollup_KPIs.merge(window_KPIs[2])
+    rollup_KPIs.merge(window_KPIs[3])
+    with pytest.raises(ValueError):
+        rollup_KPIs.merge(window_KPIs[0])
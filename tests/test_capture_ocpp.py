@@ -0,0 +1,96 @@
+# Copyright 2025, Battelle Energy Alliance, LLC, ALL RIGHTS RESERVED
+
+import os
+import socket
+import asyncio
+import threading
+
+import pytest
+import pandas as pd
+
+import calculator
+import follow_logs
+import parse_messages
+import split_data_into_charger_files
+import ocpp_logs
+
+from kpi_calculator.capture import simulator
+from kpi_calculator.utils import message_writers
+
+pytest.importorskip('websockets')
+
+import capture_ocpp
+
+STATIONS = 2
+SESSIONS = 3
+
+
+def free_port() -> int:
+    with socket.socket() as local_socket:
+        local_socket.bind((capture_ocpp.SIMULATION_HOST, 0))
+        return local_socket.getsockname()[1]
+
+def parsed_capture(cleaned_log_dir: str, work_dir: str) -> pd.DataFrame:
+    # the cleaned log through split_data_into_charger_files.py and parse_messages.py, as calculator.py loads it
+    split_log_dir = os.path.join(work_dir, 'split_logs')
+    os.makedirs(split_log_dir)
+    split_data_into_charger_files.split_logs(cleaned_log_dir, split_log_dir)
+    parsed_file_path = os.path.join(work_dir, ocpp_logs.PARSED_FILE_NAME)
+    sources = sorted(parse_messages.device_log_sources('csv', split_log_dir, ''))
+    with message_writers.create_parsed_message_writer(parsed_file_path, 'csv') as parsed_message_writer:
+        for parsed_df in parse_messages.parse_device_sources(sources, 'csv', 'stdlib'):
+            parsed_message_writer.write(parsed_df)
+    return ocpp_logs.load_deduplicated(parsed_file_path)
+
+def batch_KPIs(df: pd.DataFrame) -> calculator.InterimKPIs:
+    KPI_calculator = calculator.KPICalculator(df, 'exact')
+    KPI_calculator.tabulate_orphan_authorizes()
+    KPI_calculator.tabulate_orphan_request_starts()
+    KPI_calculator.tabulate_transactional_values()
+    return KPI_calculator._interim_KPIs
+
+def test_simulated_capture_gives_the_live_and_batch_KPIs(tmp_path, window):
+    # one capture written to the cleaned log and counted live at the same time
+    cleaned_log_dir = tmp_path / 'cleaned_logs'
+    cleaned_log_dir.mkdir()
+    cleaned_log_sink = capture_ocpp.CleanedLogSink(str(cleaned_log_dir / 'cleaned_format.csv'),
+                                                   capture_ocpp.StationMap(str(tmp_path / 'station_map.csv')))
+    tracker = follow_logs.LiveKPITracker('exact', json_backend='stdlib')
+    live_KPI_sink = capture_ocpp.LiveKPISink(tracker, str(tmp_path / 'live_KPIs.xlsx'),
+                                             capture_ocpp.StationMap(str(tmp_path / 'live_station_map.csv')),
+                                             report_seconds=float('inf'))
+
+    def write_batch(records: list) -> None:
+        cleaned_log_sink.write_batch(records)
+        live_KPI_sink.write_batch(records)
+    asyncio.run(capture_ocpp.simulate_capture(free_port(), write_batch, stations=STATIONS, sessions=SESSIONS))
+    cleaned_log_sink.close()
+    live_KPI_sink.close(finish=True)
+
+    station_map_df = pd.read_csv(tmp_path / 'station_map.csv')
+    assert sorted(station_map_df['device_ID']) == list(range(STATIONS))
+    df = parsed_capture(str(cleaned_log_dir), str(tmp_path))
+    interim_KPIs = batch_KPIs(df)
+    assert (ocpp_logs.equation_values(tracker.interim_KPIs), sorted(tracker.interim_KPIs.charge_start_times())) == \
+           (ocpp_logs.equation_values(interim_KPIs), sorted(interim_KPIs.charge_start_times()))
+    # every simulated session is a transaction, and every Authorize is bound to the session it belongs to
+    assert df.loc[df['event_code'] == 'Started', 'transaction_ID'].nunique() == STATIONS * SESSIONS
+    assert interim_KPIs.equations[10].denominator == STATIONS * SESSIONS
+    assert calculator.orphan_authorizes(df) == 0
+    assert os.path.exists(tmp_path / 'live_KPIs.xlsx')
+
+def test_write_failing_after_the_stations_are_done_stops_the_capture(monkeypatch):
+    # the first batch is held until the simulated stations are done, then fails while the queue drains
+    stations_done = threading.Event()
+    simulate = simulator.simulate
+
+    async def simulate_then_release(*args, **kwargs) -> None:
+        await simulate(*args, **kwargs)
+        asyncio.get_running_loop().call_later(0.1, stations_done.set)
+    monkeypatch.setattr(simulator, 'simulate', simulate_then_release)
+
+    def write_batch(records: list) -> None:
+        stations_done.wait()
+        raise OSError('disk full')
+    with pytest.raises(OSError, match='disk full'):
+        asyncio.run(asyncio.wait_for(capture_ocpp.simulate_capture(free_port(), write_batch), timeout=30))
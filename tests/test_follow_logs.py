@@ -0,0 +1,67 @@
+# Copyright 2025, Battelle Energy Alliance, LLC, ALL RIGHTS RESERVED
+
+import os
+import re
+import shutil
+
+import pytest
+import pandas as pd
+
+import calculator
+import follow_logs
+import ocpp_logs
+
+
+class TracedKPITracker(follow_logs.LiveKPITracker):
+
+    def __init__(self, *args, **kwargs):
+        # the KPIs and the messages in flight after every poll
+        super().__init__(*args, **kwargs)
+        self.trace = []
+
+    def update(self, catching_up_device_IDs: set[int] | None = None) -> None:
+        super().update(catching_up_device_IDs)
+        self.trace.append((ocpp_logs.equation_values(self.interim_KPIs), self.in_flight_messages()))
+
+def batch_KPI_values(parsed_file_path: str) -> tuple:
+    KPI_calculator = calculator.KPICalculator(ocpp_logs.load_deduplicated(parsed_file_path), 'exact')
+    KPI_calculator.tabulate_orphan_authorizes()
+    KPI_calculator.tabulate_orphan_request_starts()
+    KPI_calculator.tabulate_transactional_values()
+    return ocpp_logs.equation_values(KPI_calculator._interim_KPIs), sorted(KPI_calculator._interim_KPIs.charge_start_times())
+
+def followed_once(log_dir_path: str, output_xlsx_file: str, max_lines: int,
+                  transaction_timeout: pd.Timedelta = pd.Timedelta(hours=follow_logs.DEFAULT_TRANSACTION_TIMEOUT_HOURS)
+                  ) -> TracedKPITracker:
+    tracker = TracedKPITracker('exact', transaction_timeout=transaction_timeout, json_backend='stdlib')
+    follow_logs.follow_logs(log_dir_path, output_xlsx_file, tracker, poll_seconds=0, report_seconds=float('inf'),
+                            max_lines=max_lines, once=True)
+    return tracker
+
+@pytest.mark.parametrize('max_lines', [50, 100000])
+def test_follow_once_matches_batch_KPIs(synthetic_log_dir, synthetic_parsed_file, tmp_path, window, max_lines):
+    # read a few lines of each log at a time or each log at once, the counted KPIs are those of one batch run
+    output_xlsx_file = str(tmp_path / 'live_KPIs.xlsx')
+    tracker = followed_once(synthetic_log_dir, output_xlsx_file, max_lines)
+    assert (ocpp_logs.equation_values(tracker.interim_KPIs), sorted(tracker.interim_KPIs.charge_start_times())) == \
+           batch_KPI_values(synthetic_parsed_file)
+    assert tracker.in_flight_messages() == 0
+    assert os.path.exists(output_xlsx_file)
+
+@pytest.mark.parametrize('transaction_timeout', [pd.Timedelta(minutes=1), pd.Timedelta(hours=1)])
+def test_devices_are_only_updated_when_they_can_change(synthetic_log_dir, tmp_path, monkeypatch, transaction_timeout):
+    gated_tracker = followed_once(synthetic_log_dir, str(tmp_path / 'gated.xlsx'), 20, transaction_timeout)
+    monkeypatch.setattr(follow_logs.LiveDevice, 'needs_update', lambda device, clock: device.changed or len(device) > 0)
+    updated_tracker = followed_once(synthetic_log_dir, str(tmp_path / 'updated.xlsx'), 20, transaction_timeout)
+    assert gated_tracker.trace == updated_tracker.trace
+    assert sorted(gated_tracker.interim_KPIs.charge_start_times()) == sorted(updated_tracker.interim_KPIs.charge_start_times())
+
+def test_log_of_unknown_standard_is_skipped(synthetic_log_dir, synthetic_parsed_file, tmp_path, window):
+    log_dir_path = tmp_path / 'raw_ocpp_logs'
+    shutil.copytree(synthetic_log_dir, log_dir_path)
+    (log_dir_path / 'unknown.log').write_text(''.join(f"line {line_number} of no known standard\n"
+                                                      for line_number in range(200)))
+    with pytest.warns(UserWarning, match=re.escape(follow_logs.UNKNOWN_STANDARD_WARNING)):
+        tracker = followed_once(str(log_dir_path), str(tmp_path / 'live_KPIs.xlsx'), 50)
+    assert (ocpp_logs.equation_values(tracker.interim_KPIs), sorted(tracker.interim_KPIs.charge_start_times())) == \
+           batch_KPI_values(synthetic_parsed_file)
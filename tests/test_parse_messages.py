@@ -0,0 +1,181 @@
+# Copyright 2025, Battelle Energy Alliance, LLC, ALL RIGHTS RESERVED
+
+import os
+import shutil
+
+import pytest
+import pandas as pd
+
+import parse_messages
+import ocpp_logs
+
+from kpi_calculator.log_parser.ocpp_2_0_1 import message as message_structure
+from kpi_calculator.log_parser.ocpp_2_0_1.status_event import type as event_type
+from kpi_calculator.utils import json_ops, message_writers, time_ops
+
+
+def split_log_sources(pipeline_dir: str) -> list[str]:
+    split_log_dir = os.path.join(pipeline_dir, 'split_logs')
+    return [os.path.join(split_log_dir, split_log) for split_log in sorted(os.listdir(split_log_dir))]
+
+def prepared_device_log(source: str) -> pd.DataFrame:
+    # a split log as format_data gets it
+    raw_df = pd.read_csv(source)
+    raw_df['timestamp'] = time_ops.parse_timestamps(raw_df['timestamp'])
+    raw_df['message'] = parse_messages.read_messages_as_json(raw_df['message'], json_ops.get_decoder('stdlib'))
+    raw_df['message_ID'] = raw_df['message'].apply(parse_messages.get_message_ID)
+    raw_df['ID_token'] = raw_df['message'].apply(parse_messages.get_ID_token)
+    return raw_df
+
+def unauthorized_formatted_data(raw_df: pd.DataFrame) -> pd.DataFrame:
+    # format_data up to the matching of Authorizes to transactions
+    response_index = parse_messages.build_response_index(raw_df)
+    relevant_df = raw_df[[parse_messages.has_relevant_event(message) for message in raw_df['message']]]
+    formatted_df = parse_messages.create_formatted_dataframe(relevant_df, response_index)
+    formatted_df = formatted_df[formatted_df['event_code'] != 'remove']
+    return formatted_df.sort_values(by=['timestamp'], kind='stable').reset_index(drop=True)
+
+def scanned_response(message_ID: str, timestamp, original_df: pd.DataFrame) -> tuple:
+    # the scan of every row with the message ID that build_response_index and get_response replace
+    df_with_message_ID = original_df[original_df['message_ID'] == message_ID]
+    df_with_message_ID = df_with_message_ID.sort_values(by=['timestamp'], kind='stable')
+    no_events_before_timestamp_df = df_with_message_ID[df_with_message_ID['timestamp'] >= timestamp]
+    for _, row in no_events_before_timestamp_df.iterrows():
+        if not parse_messages.formatted_as_response(row['message']):
+            continue
+        message = row['message'][message_structure.RESPONSE_INTERIOR_MESSAGE_INDEX]
+        if parse_messages.is_valid_non_request_response(message):
+            return message['idTokenInfo']['status'], pd.NA, row['timestamp']
+        if parse_messages.is_request_start_response_accepted(message):
+            return message['status'], message['transactionId'], row['timestamp']
+        if parse_messages.is_request_start_response_rejected(message):
+            return message['status'], pd.NA, row['timestamp']
+    return 'Unknown', pd.NA, pd.NA
+
+def scanned_authorize_transaction_ID(index: int, formatted_data_df: pd.DataFrame):
+    # the per-Authorize scan of every row with the same ID token that match_authorizes_to_starts replaces
+    row = formatted_data_df.loc[index]
+    if pd.isna(row['ID_token']):
+        return -1
+    df_with_token_ID = formatted_data_df[formatted_data_df['ID_token'] == row['ID_token']]
+    df_with_token_ID = df_with_token_ID.sort_values(by=['timestamp'])
+    for _, matching_row in df_with_token_ID[df_with_token_ID['timestamp'] > row['timestamp']].iterrows():
+        time_diff_seconds = time_ops.events_time_diff_seconds(row['timestamp'], matching_row['timestamp'])
+        if time_diff_seconds < parse_messages.AUTHORIZE_TIME_THRESHOLD_SECONDS and matching_row['event_code'] == 'Started':
+            return matching_row['transaction_ID']
+    for _, matching_row in df_with_token_ID[df_with_token_ID['timestamp'] < row['timestamp']].iterrows():
+        time_diff_seconds = time_ops.events_time_diff_seconds(row['timestamp'], matching_row['timestamp'])
+        if time_diff_seconds < parse_messages.AUTHORIZE_TIME_THRESHOLD_SECONDS and matching_row['event_code'] == 'Started':
+            return -2
+    return -1
+
+def parsed_file(sources: list[str], output_file_path: str, json_backend: str = 'stdlib', project: bool = False,
+                workers: int = 1, flush_rows: int = message_writers.DEFAULT_FLUSH_ROWS) -> bytes:
+    with message_writers.create_parsed_message_writer(output_file_path, 'csv', flush_rows) as parsed_message_writer:
+        for parsed_df in parse_messages.parse_device_sources(sources, 'csv', json_backend, project, workers):
+            parsed_message_writer.write(parsed_df)
+    with open(output_file_path, 'rb') as infile:
+        return infile.read()
+
+def comparable(values: tuple) -> tuple:
+    return tuple(None if pd.isna(value) else value for value in values)
+
+def scanned_authorize_transaction_IDs(formatted_data_df: pd.DataFrame) -> dict:
+    authorize_index = formatted_data_df.index[formatted_data_df['event_type'] == event_type.AUTHORIZE_RESPONSE]
+    return {index: scanned_authorize_transaction_ID(index, formatted_data_df) for index in authorize_index}
+
+def test_example_split_log_gives_the_shipped_parsed_log(tmp_path):
+    with open(os.path.join(ocpp_logs.EXAMPLE_DATA_DIR, 'parsed_logs', 'parsed_messages_2025_05_19.csv'), 'rb') as infile:
+        assert parsed_file([os.path.join(ocpp_logs.EXAMPLE_DATA_DIR, 'split_logs', '0.csv')],
+                           str(tmp_path / 'parsed_messages.csv')) == infile.read()
+
+def test_parsed_csv_keeps_the_logged_timestamp_text(synthetic_pipeline_dir, synthetic_parsed_file):
+    split_timestamps = set(pd.concat([pd.read_csv(source, dtype=str)['timestamp']
+                                      for source in split_log_sources(synthetic_pipeline_dir)]))
+    parsed_df = pd.read_csv(synthetic_parsed_file, dtype=str)
+    assert set(parsed_df['timestamp']) <= split_timestamps
+    assert set(parsed_df['response_timestamp'].dropna()) <= split_timestamps
+
+def test_response_index_matches_scan(synthetic_pipeline_dir):
+    statuses = set()
+    for source in split_log_sources(synthetic_pipeline_dir):
+        raw_df = prepared_device_log(source)
+        response_index = parse_messages.build_response_index(raw_df)
+        timestamps = raw_df['timestamp'].to_numpy()
+        for position, message_ID in enumerate(raw_df['message_ID']):
+            # looked up from the time the message was logged and from the times of the rows logged around it,
+            # so responses are found at, after and before the time looked up from
+            for timestamp in timestamps[max(position - 1, 0):position + 2]:
+                response = parse_messages.get_response(message_ID, timestamp, response_index)
+                assert comparable(response) == comparable(scanned_response(message_ID, timestamp, raw_df))
+                statuses.add(response[0])
+    assert {'Accepted', 'Rejected', 'Unknown'} <= statuses
+
+def test_authorize_matching_matches_scan(synthetic_pipeline_dir):
+    outcomes = set()
+    for source in split_log_sources(synthetic_pipeline_dir):
+        formatted_df = unauthorized_formatted_data(prepared_device_log(source))
+        transaction_IDs = parse_messages.assign_transaction_IDs_credentially(formatted_df).to_dict()
+        assert transaction_IDs == scanned_authorize_transaction_IDs(formatted_df)
+        outcomes.update(transaction_ID if transaction_ID in [-1, -2] else 'matched' for transaction_ID in transaction_IDs.values())
+    # the synthetic logs have Authorizes bound to a later start, to an earlier one and to none
+    assert outcomes == {'matched', -1, -2}
+
+def test_authorize_matching_threshold_edges():
+    # a start exactly at the threshold is not matched, one at the same time as the Authorize is neither before
+    # nor after it, and an Authorize without an ID token is never matched
+    authorize_time = pd.Timestamp('2024-05-01T10:00:00')
+    threshold = pd.Timedelta(seconds=parse_messages.AUTHORIZE_TIME_THRESHOLD_SECONDS)
+    formatted_df = pd.DataFrame({
+        'ID_token': ['A', 'A', 'B', 'B', 'C', 'C', 'C', pd.NA],
+        'transaction_ID': [pd.NA, 'a', pd.NA, 'b', pd.NA, 'c1', 'c2', pd.NA],
+        'event_type': [event_type.AUTHORIZE_RESPONSE, 'TransactionEvent', event_type.AUTHORIZE_RESPONSE,
+                       'TransactionEvent', event_type.AUTHORIZE_RESPONSE, 'TransactionEvent', 'TransactionEvent',
+                       event_type.AUTHORIZE_RESPONSE],
+        'event_code': ['Accepted', 'Started', 'Accepted', 'Started', 'Accepted', 'Started', 'Started', 'Accepted'],
+        'timestamp': [authorize_time, authorize_time + threshold, authorize_time, authorize_time,
+                      authorize_time, authorize_time - pd.Timedelta(seconds=1), authorize_time + pd.Timedelta(seconds=1),
+                      authorize_time]})
+    formatted_df = formatted_df.sort_values(by=['timestamp'], kind='stable').reset_index(drop=True)
+    transaction_IDs = parse_messages.assign_transaction_IDs_credentially(formatted_df).to_dict()
+    assert transaction_IDs == scanned_authorize_transaction_IDs(formatted_df)
+    assert sorted(map(str, transaction_IDs.values())) == ['-1', '-1', '-1', 'c2']
+
+def test_worker_pool_gives_the_same_parsed_log(synthetic_pipeline_dir, tmp_path):
+    # more devices than the pool keeps in flight, so devices are submitted as earlier ones are yielded
+    sources = split_log_sources(synthetic_pipeline_dir) * 3
+    assert parsed_file(sources, str(tmp_path / 'pooled.csv'), workers=2) == \
+           parsed_file(sources, str(tmp_path / 'parsed_messages.csv'))
+
+def test_flushed_writes_give_the_same_parsed_log(synthetic_pipeline_dir, tmp_path):
+    # devices written in several flushes, and several devices held before one flush
+    sources = split_log_sources(synthetic_pipeline_dir)
+    parsed_log = parsed_file(sources, str(tmp_path / 'parsed_messages.csv'))
+    assert parsed_file(sources, str(tmp_path / 'flushed.csv'), flush_rows=1) == parsed_log
+    assert parsed_file(sources, str(tmp_path / 'held.csv'), flush_rows=10 ** 6) == parsed_log
+
+@pytest.mark.parametrize('json_backend, project', [('stdlib', True), ('orjson', False), ('orjson', True),
+                                                   ('simdjson', False), ('simdjson', True)])
+def test_json_backends_give_the_same_parsed_log(synthetic_pipeline_dir, tmp_path, json_backend, project):
+    if json_backend != 'stdlib':
+        pytest.importorskip(json_backend)
+    sources = split_log_sources(synthetic_pipeline_dir)
+    assert parsed_file(sources, str(tmp_path / 'decoded.csv'), json_backend, project) == \
+           parsed_file(sources, str(tmp_path / 'parsed_messages.csv'))
+
+def test_incremental_parsing_only_parses_changed_devices(synthetic_pipeline_dir, tmp_path, capsys):
+    split_log_dir = tmp_path / 'split_logs'
+    shutil.copytree(os.path.join(synthetic_pipeline_dir, 'split_logs'), split_log_dir)
+    sources = sorted(parse_messages.device_log_sources('csv', str(split_log_dir), ''))
+    cache_dir = str(tmp_path / 'parsed_device_cache')
+    expected_dfs = list(parse_messages.parse_device_sources(sources, 'csv', 'stdlib'))
+    for _ in range(2):
+        parsed_dfs = list(parse_messages.parse_changed_device_sources(sources, 'csv', 'stdlib', cache_dir))
+    assert '4 of 4 devices are unchanged' in capsys.readouterr().out
+    # a device whose log grew is parsed again, the others come from the cache
+    with open(sources[0], 'a', encoding='utf-8') as outfile:
+        outfile.write('0,"[2, ""late"", ""Heartbeat"", {}]",2024-06-01T00:00:00\n')
+    parsed_dfs = list(parse_messages.parse_changed_device_sources(sources, 'csv', 'stdlib', cache_dir))
+    assert '3 of 4 devices are unchanged' in capsys.readouterr().out
+    for parsed_df, expected_df in zip(parsed_dfs, expected_dfs):
+        pd.testing.assert_frame_equal(parsed_df.reset_index(drop=True), expected_df.reset_index(drop=True))
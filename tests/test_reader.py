@@ -0,0 +1,104 @@
+# Copyright 2025, Battelle Energy Alliance, LLC, ALL RIGHTS RESERVED
+
+import io
+import os
+import gzip
+import shutil
+
+import pytest
+import pandas as pd
+
+import reader
+import ocpp_logs
+
+
+def read_bytes(file_path: str) -> bytes:
+    with open(file_path, 'rb') as infile:
+        return infile.read()
+
+def cleaned_log(log_dir_path: str, output_file_path: str, **options) -> bytes:
+    reader.parse_logs(log_dir_path, output_file_path, **options)
+    return read_bytes(output_file_path)
+
+def test_example_log_gives_the_shipped_cleaned_log(example_log_dir, tmp_path):
+    assert cleaned_log(example_log_dir, str(tmp_path / 'cleaned_format.csv')) == \
+           read_bytes(os.path.join(ocpp_logs.EXAMPLE_DATA_DIR, 'cleaned_logs', 'cleaned_format.csv'))
+
+@pytest.mark.parametrize('flush_size', [1, 7])
+def test_flush_size_does_not_change_the_cleaned_log(synthetic_log_dir, tmp_path, flush_size):
+    assert cleaned_log(synthetic_log_dir, str(tmp_path / 'flushed.csv'), flush_size=flush_size) == \
+           cleaned_log(synthetic_log_dir, str(tmp_path / 'cleaned_format.csv'))
+
+def test_worker_pool_gives_the_same_cleaned_log(synthetic_log_dir, tmp_path):
+    assert cleaned_log(synthetic_log_dir, str(tmp_path / 'pooled.csv'), workers=3) == \
+           cleaned_log(synthetic_log_dir, str(tmp_path / 'cleaned_format.csv'))
+
+def test_workers_must_be_positive(synthetic_log_dir, tmp_path):
+    with pytest.raises(ValueError):
+        reader.parse_logs(synthetic_log_dir, str(tmp_path / 'cleaned_format.csv'), workers=0)
+
+def test_byte_range_scan_gives_the_same_cleaned_log(synthetic_log_dir, tmp_path):
+    # chunks far smaller than a log, so every log is cut into many newline aligned ranges
+    assert cleaned_log(synthetic_log_dir, str(tmp_path / 'scanned.csv'), scan_workers=2, chunk_size_bytes=2048) == \
+           cleaned_log(synthetic_log_dir, str(tmp_path / 'cleaned_format.csv'))
+
+@pytest.mark.parametrize('extension', ['.gz', '.zst'])
+def test_compressed_log_gives_the_same_cleaned_log(synthetic_log_dir, tmp_path, extension):
+    log_file_name = sorted(os.listdir(synthetic_log_dir))[0]
+    plain_dir = tmp_path / 'plain'
+    compressed_dir = tmp_path / 'compressed'
+    plain_dir.mkdir()
+    compressed_dir.mkdir()
+    shutil.copy(os.path.join(synthetic_log_dir, log_file_name), plain_dir / log_file_name)
+    log_bytes = read_bytes(os.path.join(synthetic_log_dir, log_file_name))
+    if extension == '.gz':
+        compressed_bytes = gzip.compress(log_bytes)
+    else:
+        compressed_bytes = pytest.importorskip('zstandard').ZstdCompressor().compress(log_bytes)
+    (compressed_dir / (log_file_name + extension)).write_bytes(compressed_bytes)
+    assert cleaned_log(str(compressed_dir), str(tmp_path / 'compressed.csv')) == \
+           cleaned_log(str(plain_dir), str(tmp_path / 'plain.csv'))
+
+def test_each_log_is_parsed_in_its_own_standard(synthetic_log_dir, tmp_path):
+    # the logs mix both registered standards, and each one is cleaned as if its standard had been preselected
+    cleaned_df = pd.read_csv(io.BytesIO(cleaned_log(synthetic_log_dir, str(tmp_path / 'cleaned_format.csv'))), dtype=str)
+    log_file_names = os.listdir(synthetic_log_dir)
+    log_standards = {ocpp_logs.log_file_name(device): ocpp_logs.LOG_STANDARDS[device % 2]
+                     for device in range(len(log_file_names))}
+    assert cleaned_df['device_ID'].nunique() == len(log_file_names)
+    for device_ID, log_file_name in enumerate(log_file_names):
+        log_dir_path = tmp_path / log_file_name
+        log_dir_path.mkdir()
+        shutil.copy(os.path.join(synthetic_log_dir, log_file_name), log_dir_path / log_file_name)
+        device_df = pd.read_csv(io.BytesIO(cleaned_log(str(log_dir_path), str(tmp_path / (log_file_name + '.csv')),
+                                                       preselected_standard=log_standards[log_file_name])), dtype=str)
+        expected_df = cleaned_df[cleaned_df['device_ID'] == str(device_ID)].drop(columns='device_ID')
+        pd.testing.assert_frame_equal(device_df.drop(columns='device_ID'), expected_df.reset_index(drop=True))
+
+def test_parquet_output_holds_the_cleaned_log(synthetic_log_dir, tmp_path):
+    pytest.importorskip('pyarrow')
+    from kpi_calculator.utils import parquet_ops
+    dataset_dir = str(tmp_path / 'cleaned_format.parquet')
+    reader.parse_logs(synthetic_log_dir, dataset_dir, output_format='parquet')
+    reader.parse_logs(synthetic_log_dir, str(tmp_path / 'cleaned_format.csv'))
+    csv_df = pd.read_csv(tmp_path / 'cleaned_format.csv', dtype=str)
+    parquet_df = pd.concat([parquet_ops.read_partition(device_partition_dir).astype(str)
+                            for _, device_partition_dir in parquet_ops.device_partitions(dataset_dir)])
+    assert sorted(map(tuple, parquet_df[list(csv_df.columns)].to_numpy())) == sorted(map(tuple, csv_df.to_numpy()))
+
+def test_action_filter_keeps_the_KPIs(synthetic_log_dir, tmp_path, window):
+    # only messages that cannot change a KPI are dropped at ingest
+    import calculator
+    KPIs = []
+    for filter_actions in [False, True]:
+        work_dir = tmp_path / str(filter_actions)
+        parsed_file_path = ocpp_logs.run_pipeline(synthetic_log_dir, str(work_dir), filter_actions=filter_actions)
+        KPI_calculator = calculator.KPICalculator(ocpp_logs.load_deduplicated(parsed_file_path))
+        KPI_calculator.tabulate_orphan_authorizes()
+        KPI_calculator.tabulate_orphan_request_starts()
+        KPI_calculator.tabulate_transactional_values()
+        KPIs.append((ocpp_logs.equation_values(KPI_calculator._interim_KPIs),
+                     KPI_calculator._interim_KPIs.charge_start_time_percentiles([10, 25, 50, 75])))
+    assert os.path.getsize(tmp_path / 'True' / 'cleaned_logs' / 'cleaned_format.csv') < \
+           os.path.getsize(tmp_path / 'False' / 'cleaned_logs' / 'cleaned_format.csv')
+    assert KPIs[0] == KPIs[1]
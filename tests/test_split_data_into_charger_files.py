@@ -0,0 +1,30 @@
+# Copyright 2025, Battelle Energy Alliance, LLC, ALL RIGHTS RESERVED
+
+import os
+import shutil
+
+import split_data_into_charger_files
+import ocpp_logs
+
+
+def split_files(cleaned_log_dir: str, output_dir: str, **options) -> dict[str, bytes]:
+    os.makedirs(output_dir)
+    split_data_into_charger_files.split_logs(cleaned_log_dir, output_dir, **options)
+    split_file_contents = {}
+    for split_file_name in os.listdir(output_dir):
+        with open(os.path.join(output_dir, split_file_name), 'rb') as infile:
+            split_file_contents[split_file_name] = infile.read()
+    return split_file_contents
+
+def test_example_cleaned_log_gives_the_shipped_split_log(tmp_path):
+    cleaned_log_dir = tmp_path / 'cleaned_logs'
+    shutil.copytree(os.path.join(ocpp_logs.EXAMPLE_DATA_DIR, 'cleaned_logs'), cleaned_log_dir)
+    with open(os.path.join(ocpp_logs.EXAMPLE_DATA_DIR, 'split_logs', '0.csv'), 'rb') as infile:
+        assert split_files(str(cleaned_log_dir), str(tmp_path / 'split_logs')) == {'0.csv': infile.read()}
+
+def test_chunks_and_evicted_handles_give_the_same_split_logs(synthetic_pipeline_dir, tmp_path):
+    # rows of a device read in several chunks, with its file closed and reopened between them
+    cleaned_log_dir = os.path.join(synthetic_pipeline_dir, 'cleaned_logs')
+    split_logs = split_files(cleaned_log_dir, str(tmp_path / 'split_logs'))
+    assert len(split_logs) == 4
+    assert split_files(cleaned_log_dir, str(tmp_path / 'chunked'), chunk_size=7, max_open_files=1) == split_logs
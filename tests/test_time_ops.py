@@ -0,0 +1,30 @@
+# Copyright 2025, Battelle Energy Alliance, LLC, ALL RIGHTS RESERVED
+
+import pytest
+import numpy as np
+import pandas as pd
+
+from kpi_calculator.utils import time_ops
+
+
+def test_log_timestamps_parse_to_naive_UTC():
+    timestamps = time_ops.parse_timestamps(['2024-05-01T10:00:00.123Z', '2024-05-01T10:00:00:123',
+                                            '2024-05-01 12:00:00+02:00', '2024-05-01T05:30:00-0430',
+                                            '10:00:00', 'not a timestamp', None, '2024-05-01T10:00:00.123Z'])
+    assert timestamps.tolist()[:5] == [pd.Timestamp('2024-05-01T10:00:00.123'), pd.Timestamp('2024-05-01T10:00:00.123'),
+                                       pd.Timestamp('2024-05-01T10:00:00'), pd.Timestamp('2024-05-01T10:00:00'),
+                                       pd.Timestamp(time_ops.TIME_ONLY_DATE + 'T10:00:00')]
+    assert timestamps.isna().tolist()[5:] == [True, True, False]
+    assert timestamps.iloc[7] == timestamps.iloc[0]
+    # a column that is already parsed is left as it is
+    assert time_ops.parse_timestamps(timestamps) is timestamps
+
+def test_time_diffs_are_unsigned_seconds():
+    start_timestamps = time_ops.parse_timestamps(['2024-05-01T10:00:00.250Z', '2024-05-01T10:00:09Z'])
+    end_timestamps = time_ops.parse_timestamps(['2024-05-01T10:00:01.750Z', '2024-05-01T10:00:00Z'])
+    # the array version goes through epoch seconds, so it is only exact to about a microsecond
+    assert time_ops.events_time_diffs_seconds(start_timestamps.to_numpy(), end_timestamps.to_numpy()).tolist() == \
+           pytest.approx([1.5, 9.0], abs=1e-6)
+    assert time_ops.events_time_diff_seconds('2024-05-01T10:00:09Z', end_timestamps.iloc[1]) == 9.0
+    assert np.isnan(time_ops.events_time_diffs_seconds(np.array(['NaT'], dtype='datetime64[ns]'),
+                                                       end_timestamps.to_numpy()[:1])[0])